@@ -0,0 +1,82 @@
+# amortization.py
+"""
+Repayment schedules for a fixed-EMI loan, built on underwriting.annuity_factor.
+amortization_rows() yields one month at a time for streaming; amortization_table()
+computes the whole tenure as NumPy columns in closed form.
+"""
+from typing import Any, Dict, Iterator
+
+import numpy as np
+
+from underwriting import annuity_factor, DEFAULT_ANNUAL_RATE, DEFAULT_YEARS
+
+SCHEDULE_FIELDS = ("month", "emi", "interest", "principal", "balance")
+
+
+def amortization_rows(
+    principal: float, annual_rate: float = DEFAULT_ANNUAL_RATE, years: float = DEFAULT_YEARS
+) -> Iterator[Dict[str, Any]]:
+    """Yield {month, emi, interest, principal, balance} per month; the last payment clears any rounding residue"""
+    r = annual_rate / 12.0
+    months = int(round(years * 12))
+    emi = principal * annuity_factor(annual_rate, years)
+    balance = principal
+
+    for month in range(1, months + 1):
+        interest = balance * r
+        repaid = balance if month == months else emi - interest
+        balance -= repaid
+        yield {
+            "month": month,
+            "emi": round(interest + repaid, 2),
+            "interest": round(interest, 2),
+            "principal": round(repaid, 2),
+            "balance": round(max(balance, 0.0), 2),
+        }
+
+
+def amortization_table(
+    principal: float, annual_rate: float = DEFAULT_ANNUAL_RATE, years: float = DEFAULT_YEARS
+) -> Dict[str, np.ndarray]:
+    """
+    The whole schedule as arrays keyed by SCHEDULE_FIELDS. Uses the closed form
+    balance_k = P(1+r)^k - EMI((1+r)^k - 1)/r, so no month depends on the previous one.
+    """
+    r = annual_rate / 12.0
+    months = int(round(years * 12))
+    emi = principal * annuity_factor(annual_rate, years)
+    k = np.arange(months + 1, dtype=np.float64)
+
+    if r == 0:
+        balance = principal - emi * k
+    else:
+        growth = np.power(1.0 + r, k)
+        balance = principal * growth - emi * (growth - 1.0) / r
+    balance = np.maximum(balance, 0.0)
+
+    interest = balance[:-1] * r
+    repaid = balance[:-1] - balance[1:]
+    return {
+        "month": k[1:].astype(np.int64),
+        "emi": interest + repaid,
+        "interest": interest,
+        "principal": repaid,
+        "balance": balance[1:],
+    }
+
+
+def schedule_summary(
+    principal: float, annual_rate: float = DEFAULT_ANNUAL_RATE, years: float = DEFAULT_YEARS
+) -> Dict[str, Any]:
+    """Headline terms plus the balance at the end of each year, for sanction letters"""
+    table = amortization_table(principal, annual_rate, years)
+    months = len(table["month"])
+    return {
+        "principal": round(principal, 2),
+        "annual_rate": annual_rate,
+        "tenure_months": months,
+        "emi": round(principal * annuity_factor(annual_rate, years), 2),
+        "total_interest": round(float(table["interest"].sum()), 2),
+        "total_payable": round(float(table["emi"].sum()), 2),
+        "yearly_balance": [round(float(b), 2) for b in table["balance"][11::12]],
+    }
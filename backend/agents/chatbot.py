@@ -0,0 +1,200 @@
+# agents/chatbot.py
+"""
+Conversational loan application assistant.
+Builds the prompt for the /chatbot endpoints and pulls the
+"COLLECTED: field: value" marker out of model replies.
+"""
+from ..util.log import get_logger
+
+logger = get_logger("chatbot")
+
+COLLECTED_MARKER = "COLLECTED:"
+
+
+def format_conversation(history):
+    if not history or len(history) == 0:
+        return "No previous conversation"
+    
+    formatted = []
+    # Only last 2 messages to minimize API calls
+    for msg in history[-2:]:
+        sender = "User" if msg.get('sender') == 'user' else "Assistant"
+        formatted.append(f"{sender}: {msg.get('text', '')}")
+    
+    return "\n".join(formatted)
+
+
+def build_chatbot_context(message: str, conversation_history: list, collected_data: dict) -> str:
+    return f"""
+You are a helpful AI loan application assistant for OpenCred, a digital lending platform. Your role is to ease the entire loan application process and minimize the time customers spend on paperwork.
+
+INTRODUCTION (if this is the first interaction):
+- Introduce yourself as OpenCred's AI loan assistant
+- Explain that you'll guide them through a simple, automated loan application process
+- Mention that this will save them time compared to traditional bank visits
+- Ask about their loan needs and reassure them that the process is secure and fast
+
+PERSONALITY & APPROACH:
+- Be warm, professional, and genuinely helpful
+- Show enthusiasm about helping them achieve their financial goals
+- Be persuasive about the benefits of digital lending (speed, convenience, transparency)
+- Address concerns proactively but never be pushy or forceful
+- Use encouraging language and celebrate small wins during the process
+- If they seem hesitant, gently explain how you can help and the advantages
+
+INFORMATION TO COLLECT (in natural conversation flow):
+1. Full Name (accept any format)
+2. Email Address 
+3. Phone Number
+4. PAN Number (accept ANY format - no validation needed)
+5. Complete Address (accept any address format)
+6. Employment Type (Salaried/Self-Employed/Business Owner)
+7. Monthly Income (in rupees)
+8. Loan Amount Needed (in rupees)
+9. Loan Purpose (be supportive of their goals)
+10. Loan Tenure (12/24/36/48/60 months)
+11. Document Confirmation (ONLY ask this AFTER collecting ALL above information)
+
+Already collected: {collected_data}
+
+Conversation so far:
+{format_conversation(conversation_history)}
+
+User's message: {message}
+
+RESPONSE GUIDELINES:
+1. If collecting information, respond with: "COLLECTED: field_name: value" followed by encouraging next steps
+2. For PAN: Accept ANY format without validation
+3. For document confirmation (ONLY ask after collecting ALL 10 pieces of information above):
+   - Ask: "Great! Now I need to confirm - do you have all 4 required documents ready? (PAN Card, Aadhaar Card, Bank Statement for last 3 months, Salary Slips for last 3 months)"
+   - If YES: respond EXACTLY with "COLLECTED: documentsConfirmed: yes" followed by "Perfect! I'll redirect you to the document upload page now."
+   - If NO: Explain why each document is needed and encourage them to gather documents first
+   - NEVER provide links or URLs. The system will handle the redirect automatically.
+4. Answer questions thoroughly and relate back to how it helps their application
+5. Be conversational - use their name when you have it
+6. Show progress ("Great! We're halfway through" etc.)
+7. Extract numbers from natural language (e.g., "50000 rupees" → 50000)
+8. If they express doubts, address them with benefits: speed, security, transparency, no branch visits needed
+
+CRITICAL: NEVER mention links, URLs, placeholders, or external pages. When documents are confirmed, just say you'll redirect them and the system will handle it automatically.
+
+Remember: You're here to make their loan journey smooth and stress-free. Be their trusted guide through this important financial decision.
+"""
+
+
+def build_chatbot_messages(message: str, conversation_history: list, collected_data: dict) -> list:
+    """System prompt, the last two turns and the new user message"""
+    messages = [{"role": "system", "content": build_chatbot_context(message, conversation_history, collected_data)}]
+    
+    # Add conversation history (last 2 messages to save tokens)
+    recent_history = conversation_history[-2:] if len(conversation_history) > 2 else conversation_history
+    for hist_msg in recent_history:
+        role = "user" if hist_msg.get("sender") == "user" else "assistant"
+        messages.append({"role": role, "content": hist_msg.get("text", "")})
+    
+    # Add current message
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+def parse_collected(response_text: str):
+    """
+    Split a model reply into (display_text, collected_field, collected_value).
+    The COLLECTED line is removed from the text shown to the user.
+    """
+    collected_field = None
+    collected_value = None
+    
+    if COLLECTED_MARKER in response_text:
+        try:
+            parts = response_text.split(COLLECTED_MARKER, 1)[1].split("\n", 1)
+            if len(parts) > 0:
+                field_value = parts[0].strip()
+                if ":" in field_value:
+                    collected_field, collected_value = field_value.split(":", 1)
+                    collected_field = collected_field.strip()
+                    collected_value = collected_value.strip()
+                    logger.debug("Collected field", extra={"field": collected_field})
+                    # Remove the COLLECTED line from response
+                    response_text = parts[1].strip() if len(parts) > 1 else "Got it! What's next?"
+        except Exception as e:
+            logger.warning("Could not parse COLLECTED line", extra={"error": str(e)})
+    
+    return response_text.strip(), collected_field, collected_value
+
+
+class CollectedLineFilter:
+    """
+    Incremental counterpart of parse_collected for streamed replies.
+    feed() takes raw model text chunks and returns the text that is safe to
+    show the user; a complete COLLECTED line is held back and exposed via
+    take_collected() instead. finish() flushes whatever is left at the end.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_marker = False
+        self._done = False  # only the first COLLECTED line is structured, like parse_collected
+        self._collected = None
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        out = []
+
+        while self._buffer:
+            if self._in_marker:
+                newline = self._buffer.find("\n")
+                if newline < 0:
+                    break
+                self._set_collected(self._buffer[:newline])
+                self._buffer = self._buffer[newline + 1:].lstrip("\n")
+                self._in_marker = False
+                continue
+
+            if self._done:
+                out.append(self._buffer)
+                self._buffer = ""
+                break
+
+            index = self._buffer.find(COLLECTED_MARKER)
+            if index >= 0:
+                out.append(self._buffer[:index])
+                self._buffer = self._buffer[index + len(COLLECTED_MARKER):]
+                self._in_marker = True
+                continue
+
+            # Hold back a tail that could be the start of a split marker
+            keep = self._partial_marker_length(self._buffer)
+            out.append(self._buffer[:len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+
+        return "".join(out)
+
+    def finish(self) -> str:
+        rest = self._buffer
+        self._buffer = ""
+        if self._in_marker:
+            self._in_marker = False
+            self._set_collected(rest)
+            return ""
+        return rest
+
+    def take_collected(self):
+        """Return (field, value) once per detected COLLECTED line, else None"""
+        collected, self._collected = self._collected, None
+        return collected
+
+    def _set_collected(self, field_value: str):
+        self._done = True
+        field_value = field_value.strip()
+        if ":" in field_value:
+            field, value = field_value.split(":", 1)
+            self._collected = (field.strip(), value.strip())
+
+    @staticmethod
+    def _partial_marker_length(text: str) -> int:
+        for size in range(min(len(COLLECTED_MARKER) - 1, len(text)), 0, -1):
+            if COLLECTED_MARKER.startswith(text[-size:]):
+                return size
+        return 0
@@ -1,16 +1,38 @@
 # agents/explanation.py
+import os
+from typing import Optional
+
 from ..util.llm import chat_with_grok
+from ..util.log import get_logger
+from .templates import render_explanation
+
+# The prompt addresses the customer by placeholder so identical decisions for
+# different customers share one cached LLM reply; the name is filled in after.
+NAME_PLACEHOLDER = "{{customer_name}}"
+
+logger = get_logger("explain")
 
-def generate_explanation(loan_data: dict, status: str, math_details: str):
+def use_llm_explanations() -> bool:
+    """EXPLANATION_MODE=llm forces every explanation through the model; default is templates first"""
+    return os.getenv("EXPLANATION_MODE", "template").lower() == "llm"
+
+def generate_explanation(loan_data: dict, status: str, math_details: str, kyc_passed: Optional[bool] = None):
+    
+    # Fast path: routine outcomes render from a precompiled template
+    if not use_llm_explanations():
+        rendered = render_explanation(loan_data['name'], status, math_details, kyc_passed)
+        if rendered is not None:
+            return rendered
     
     prompt = f"""
         You are a bank loan officer writing to a customer.
 
-        Customer Name: {loan_data['name']}
+        Customer Name: {NAME_PLACEHOLDER}
         Loan Status: {status}
         Analysis Details: {math_details}
 
-        Write a professional 2-sentence message to {loan_data['name']}.
+        Write a professional 2-sentence message to {NAME_PLACEHOLDER}.
+        Refer to the customer only as {NAME_PLACEHOLDER}, exactly as written.
 
         INSTRUCTIONS:
         1. If 'pre_approved': Congratulate them warmly and mention next steps.
@@ -26,8 +48,8 @@ def generate_explanation(loan_data: dict, status: str, math_details: str):
             {"role": "system", "content": "You are a helpful bank loan officer."},
             {"role": "user", "content": prompt}
         ]
-        response = chat_with_grok(messages, model="google/gemini-2.5-flash")
-        return response.strip()
-    except Exception as e:
-        print(f"ERROR {e}")
+        response = chat_with_grok(messages, model="google/gemini-2.5-flash", cache=True, prompt_type="explanation")
+        return response.replace(NAME_PLACEHOLDER, loan_data['name']).strip()
+    except Exception:
+        logger.exception("Explanation failed", extra={"status": status})
         return f"Application is {status}."
\ No newline at end of file
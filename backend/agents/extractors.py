@@ -0,0 +1,241 @@
+# agents/extractors.py
+"""
+Deterministic field extraction for the chatbot.
+Plain answers such as an email, phone number, PAN, "5 lakh" or "36 months"
+are recognised locally so the turn can be answered without an LLM call.
+Anything ambiguous returns None and goes to the model as before.
+"""
+import os
+import re
+from typing import Optional
+
+# Order in which the chatbot collects application fields
+FIELD_ORDER = [
+    "fullName", "email", "phone", "pan", "address", "employmentType",
+    "income", "amount", "purpose", "tenure", "documentsConfirmed",
+]
+
+ALLOWED_TENURES = {12, 24, 36, 48, 60}
+
+# Optional lead-in like "my email is", "it's", "its"
+_LEAD_IN = r"(?:(?:my|the)\s+[a-z ]{2,30}?\s+(?:is|would be|will be)\s+|it'?s\s+|i\s+need\s+|i\s+earn\s+|about\s+|around\s+)?"
+_TRAIL = r"\s*[.!]?\s*"
+
+EMAIL_PATTERN = re.compile(_LEAD_IN + r"([\w.+-]+@[\w-]+(?:\.[\w-]+)+)" + _TRAIL, re.IGNORECASE)
+PHONE_PATTERN = re.compile(_LEAD_IN + r"(?:\+?91[\s-]?|0)?([6-9]\d{4}[\s-]?\d{5})" + _TRAIL, re.IGNORECASE)
+PAN_PATTERN = re.compile(_LEAD_IN + r"([A-Z]{5}[0-9]{4}[A-Z])" + _TRAIL, re.IGNORECASE)
+# Only explicit introductions; "I am ..." is far more often "I am looking for a loan" than a name
+NAME_PATTERN = re.compile(
+    r"(?:my\s+(?:full\s+)?name\s+is|this\s+is|name\s*:)\s+([a-z][a-z.'-]*(?:\s+[a-z][a-z.'-]*){0,3})" + _TRAIL,
+    re.IGNORECASE,
+)
+# Words that show the "name" is really the start of a sentence ("this is not my loan")
+NOT_NAME_WORDS = {
+    "a", "an", "the", "for", "to", "of", "in", "on", "at", "with", "about", "regarding",
+    "my", "your", "me", "i", "it", "is", "am", "and", "or", "but", "so",
+    "not", "no", "yes", "sure", "just", "here", "there", "fine", "good", "okay", "ok", "ready",
+    "looking", "interested", "applying", "planning", "trying", "wondering", "asking", "calling",
+    "going", "thinking", "checking", "need", "want", "help",
+    "salaried", "self", "employed", "unemployed", "business", "owner", "working",
+    "loan", "home", "car", "personal", "education",
+}
+
+AMOUNT_PATTERN = re.compile(
+    _LEAD_IN
+    + r"(?:₹|rs\.?|inr)?\s*"
+    + r"(\d{1,3}(?:,\d{2,3})+|\d+(?:\.\d+)?)"
+    + r"\s*(lakhs?|lacs?|l|crores?|cr|k|thousand)?"
+    + r"\s*(?:₹|rs\.?|inr|rupees|/-)?"
+    + r"(?:\s*(?:per\s+month|a\s+month|monthly|pm|p\.m\.))?"
+    + _TRAIL,
+    re.IGNORECASE,
+)
+TENURE_PATTERN = re.compile(_LEAD_IN + r"(\d{1,3})\s*(months?|mos?|years?|yrs?)?" + _TRAIL, re.IGNORECASE)
+
+# Sanity bounds in rupees; anything outside is left to the LLM to clarify
+INCOME_RANGE = (1_000, 10_000_000)
+AMOUNT_RANGE = (10_000, 100_000_000)
+
+MULTIPLIERS = {
+    "lakh": 100000, "lakhs": 100000, "lac": 100000, "lacs": 100000, "l": 100000,
+    "crore": 10000000, "crores": 10000000, "cr": 10000000,
+    "k": 1000, "thousand": 1000,
+}
+
+EMPLOYMENT_TYPES = {
+    "salaried": "Salaried",
+    "salaried employee": "Salaried",
+    "self employed": "Self-Employed",
+    "self-employed": "Self-Employed",
+    "business": "Business Owner",
+    "business owner": "Business Owner",
+}
+
+AFFIRMATIVE = {"yes", "y", "yeah", "yep", "yes i do", "yes i have", "yes i have them", "i have them", "i do", "sure", "ready"}
+
+NEXT_QUESTIONS = {
+    "fullName": "Could you please tell me your full name?",
+    "email": "What's the best email address to reach you at?",
+    "phone": "What's your mobile number?",
+    "pan": "Could you share your PAN number?",
+    "address": "What's your complete residential address?",
+    "employmentType": "Are you Salaried, Self-Employed, or a Business Owner?",
+    "income": "What's your monthly income in rupees?",
+    "amount": "How much would you like to borrow (in rupees)?",
+    "purpose": "What will you be using the loan for?",
+    "tenure": "Over how many months would you like to repay? (12, 24, 36, 48 or 60)",
+    "documentsConfirmed": (
+        "Now I need to confirm - do you have all 4 required documents ready? "
+        "(PAN Card, Aadhaar Card, Bank Statement for last 3 months, Salary Slips for last 3 months)"
+    ),
+}
+
+
+def parse_indian_amount(text: str) -> Optional[int]:
+    """'5,00,000', '5 lakh', '1.2 crore', '50k', 'Rs 50000/-' -> rupees; None if not a plain amount"""
+    match = AMOUNT_PATTERN.fullmatch(text.strip())
+    if not match:
+        return None
+    number, unit = match.group(1), match.group(2)
+    value = float(number.replace(",", ""))
+    if unit:
+        value *= MULTIPLIERS[unit.lower()]
+    return int(round(value)) if value > 0 else None
+
+
+def parse_tenure_months(text: str) -> Optional[int]:
+    match = TENURE_PATTERN.fullmatch(text.strip())
+    if not match:
+        return None
+    months = int(match.group(1))
+    unit = (match.group(2) or "").lower()
+    if unit.startswith("y"):
+        months *= 12
+    return months if months in ALLOWED_TENURES else None
+
+
+def _extract_email(text):
+    match = EMAIL_PATTERN.fullmatch(text)
+    return match.group(1) if match else None
+
+
+def _extract_phone(text):
+    match = PHONE_PATTERN.fullmatch(text)
+    return re.sub(r"[\s-]", "", match.group(1)) if match else None
+
+
+def _extract_pan(text):
+    match = PAN_PATTERN.fullmatch(text)
+    return match.group(1).upper() if match else None
+
+
+def _extract_name(text):
+    match = NAME_PATTERN.fullmatch(text)
+    if not match:
+        return None
+    words = match.group(1).rstrip(".").split()
+    if any(word.lower().strip(".'-") in NOT_NAME_WORDS for word in words):
+        return None
+    return " ".join(words).title()
+
+
+def _extract_employment(text):
+    return EMPLOYMENT_TYPES.get(re.sub(r"[^a-z -]", "", text.lower()).strip())
+
+
+def _amount_in(text, bounds):
+    amount = parse_indian_amount(text)
+    return str(amount) if amount and bounds[0] <= amount <= bounds[1] else None
+
+
+def _extract_income(text):
+    return _amount_in(text, INCOME_RANGE)
+
+
+def _extract_amount(text):
+    return _amount_in(text, AMOUNT_RANGE)
+
+
+def _extract_tenure(text):
+    months = parse_tenure_months(text)
+    return str(months) if months else None
+
+
+def _extract_documents(text):
+    return "yes" if re.sub(r"[^a-z ]", "", text.lower()).strip() in AFFIRMATIVE else None
+
+
+EXTRACTORS = {
+    "fullName": _extract_name,
+    "email": _extract_email,
+    "phone": _extract_phone,
+    "pan": _extract_pan,
+    "employmentType": _extract_employment,
+    "income": _extract_income,
+    "amount": _extract_amount,
+    "tenure": _extract_tenure,
+    "documentsConfirmed": _extract_documents,
+}
+
+# Formats distinctive enough to accept even when a different field was expected
+UNAMBIGUOUS_FIELDS = ("email", "pan")
+
+
+def next_missing_field(collected_data: dict) -> Optional[str]:
+    for field in FIELD_ORDER:
+        if not str(collected_data.get(field) or "").strip():
+            return field
+    return None
+
+
+def extract_field(message: str, collected_data: dict):
+    """Return (field, value) when the message is confidently a plain answer, else None"""
+    text = message.strip()
+    if not text or len(text) > 120:
+        return None
+
+    expected = next_missing_field(collected_data)
+    extractor = EXTRACTORS.get(expected)
+    if extractor:
+        value = extractor(text)
+        if value:
+            return expected, value
+
+    for field in UNAMBIGUOUS_FIELDS:
+        if field != expected and not collected_data.get(field):
+            value = EXTRACTORS[field](text)
+            if value:
+                return field, value
+
+    return None
+
+
+def local_extraction_enabled() -> bool:
+    """CHATBOT_LOCAL_EXTRACTION=0 sends every turn to the LLM"""
+    return os.getenv("CHATBOT_LOCAL_EXTRACTION", "1") != "0"
+
+
+def local_reply(message: str, collected_data: dict):
+    """
+    Answer a chatbot turn without the LLM.
+    Returns (response_text, collected_field, collected_value) or None.
+    """
+    extracted = extract_field(message, collected_data)
+    if extracted is None:
+        return None
+
+    field, value = extracted
+    if field == "documentsConfirmed":
+        return "Perfect! I'll redirect you to the document upload page now.", field, value
+
+    updated = dict(collected_data, **{field: value})
+    next_field = next_missing_field(updated)
+    if next_field is None:
+        return None
+
+    name = (updated.get("fullName") or "").split(" ")[0]
+    thanks = f"Thanks, {name}!" if name else "Thank you!"
+    done = sum(1 for f in FIELD_ORDER if str(updated.get(f) or "").strip())
+    progress = " We're halfway through." if done == len(FIELD_ORDER) // 2 else ""
+
+    return f"{thanks}{progress} {NEXT_QUESTIONS[next_field]}", field, value
@@ -1,13 +1,11 @@
 # agents/manager.py
-from ..util.llm import get_gemini_model
+from ..util.llm import FALLBACK_REPLY, chat_with_grok, achat_with_grok
+from ..util.log import get_logger
 
-def generate_manager_response(loan_data: dict, user_message: str, chat_history: list = None):
-    """
-    Manager Agent - Provides personalized responses to user queries
-    Uses Gemini to generate contextual, helpful responses
-    """
-    model = get_gemini_model()
-    
+logger = get_logger("manager")
+
+def build_manager_prompt(loan_data: dict, user_message: str, chat_history: list = None) -> str:
+    """Build the manager agent prompt from loan data and recent chat"""
     # Build context from loan data
     context = f"""
     You are a helpful and empathetic loan manager reviewing a loan application.
@@ -35,13 +33,33 @@ def generate_manager_response(loan_data: dict, user_message: str, chat_history:
     
     Generate a helpful response:
     """
+    return context
+
+MANAGER_FALLBACK = "Thank you for your message. I'm reviewing your application carefully and will get back to you shortly."
+
+def generate_manager_response(loan_data: dict, user_message: str, chat_history: list = None):
+    """
+    Manager Agent - Provides personalized responses to user queries
+    Uses Gemini to generate contextual, helpful responses
+    """
+    messages = [{"role": "user", "content": build_manager_prompt(loan_data, user_message, chat_history)}]
     
-    try:
-        response = model.generate_content(context)
-        return response.text.strip()
-    except Exception as e:
-        print(f"Manager Agent Error: {e}")
-        return "Thank you for your message. I'm reviewing your application carefully and will get back to you shortly."
+    response = chat_with_grok(messages, model="google/gemini-2.5-flash", prompt_type="manager_chat")
+    return manager_reply(response)
+
+async def agenerate_manager_response(loan_data: dict, user_message: str, chat_history: list = None):
+    """Awaitable generate_manager_response for async endpoints"""
+    messages = [{"role": "user", "content": build_manager_prompt(loan_data, user_message, chat_history)}]
+    
+    response = await achat_with_grok(messages, model="google/gemini-2.5-flash", prompt_type="manager_chat")
+    return manager_reply(response)
+
+def manager_reply(response: str) -> str:
+    # The LLM helpers don't raise; they answer FALLBACK_REPLY when the call failed
+    if response == FALLBACK_REPLY:
+        logger.warning("Manager reply failed; sending the holding message")
+        return MANAGER_FALLBACK
+    return response.strip()
 
 def format_chat_history(chat_history: list) -> str:
     """Format chat history for context"""
@@ -60,8 +78,6 @@ def analyze_for_approval_decision(loan_data: dict, chat_context: str):
     Analyzes chat conversation and additional information to make approval decision
     This is called when manager decides to approve/reject based on conversation
     """
-    model = get_gemini_model()
-    
     prompt = f"""
     You are a senior loan manager making a final decision on a loan application.
     
@@ -83,15 +99,14 @@ def analyze_for_approval_decision(loan_data: dict, chat_context: str):
     EXPLANATION: [Your explanation]
     """
     
-    try:
-        response = model.generate_content(prompt)
-        return parse_decision_response(response.text)
-    except Exception as e:
-        print(f"Decision Analysis Error: {e}")
+    response = chat_with_grok([{"role": "user", "content": prompt}], model="google/gemini-2.5-flash", prompt_type="approval_analysis")
+    if response == FALLBACK_REPLY:
+        logger.warning("Decision analysis failed")
         return {
             "decision": "manual_review",
             "explanation": "Additional review required."
         }
+    return parse_decision_response(response)
 
 def parse_decision_response(response_text: str) -> dict:
     """Parse the AI response into structured decision"""
@@ -0,0 +1,111 @@
+# agents/templates.py
+"""
+Precompiled customer explanations for routine underwriting outcomes.
+Keyed by (status, ratio band, KYC result) so the common cases render locally
+instead of waiting on the LLM.
+"""
+import re
+from string import Template
+from typing import Optional
+
+MATH_PATTERN = re.compile(r"Ratio:\s*([\d.]+)\s*\(Threshold:\s*([\d.]+)\)")
+
+# Ratio = monthly income / EMI, banded relative to the approval threshold
+BAND_SHORTFALL = "shortfall"      # income below the EMI itself
+BAND_STRETCHED = "stretched"      # covers the EMI but well under the threshold
+BAND_NEAR = "near_threshold"      # within 25% of the threshold
+BAND_CLEAR = "clear"              # at or above the threshold
+
+KYC_VERIFIED = "verified"
+KYC_UNVERIFIED = "unverified"
+
+_RAW_TEMPLATES = {
+    ("manual_review", BAND_SHORTFALL, KYC_VERIFIED): (
+        "Dear $name, thank you for your application; the monthly repayment for this amount would be higher than "
+        "your current monthly income, so a loan officer will review it personally. We may suggest a smaller amount "
+        "or a longer tenure, and we will be in touch shortly."
+    ),
+    ("manual_review", BAND_STRETCHED, KYC_VERIFIED): (
+        "Dear $name, thank you for your application; the monthly repayment would take up a large share of your "
+        "income, so we are reviewing it personally before making a decision. A loan officer will contact you soon "
+        "to discuss options such as adjusting the amount or tenure."
+    ),
+    ("manual_review", BAND_NEAR, KYC_VERIFIED): (
+        "Dear $name, thank you for your application; your income comes close to our standard repayment guideline "
+        "for this amount, so a loan officer is reviewing it personally. We expect to get back to you shortly with "
+        "a decision or a tailored offer."
+    ),
+    ("manual_review", BAND_CLEAR, KYC_UNVERIFIED): (
+        "Dear $name, thank you for your application; your finances look good, but we could not verify the PAN "
+        "details provided. A loan officer will review your identity documents and contact you shortly to complete "
+        "the process."
+    ),
+    ("manual_review", BAND_NEAR, KYC_UNVERIFIED): (
+        "Dear $name, thank you for your application; we could not verify your PAN against the document provided, "
+        "and your income is close to our repayment guideline for this amount. A loan officer will review both "
+        "personally and contact you shortly."
+    ),
+    ("manual_review", BAND_STRETCHED, KYC_UNVERIFIED): (
+        "Dear $name, thank you for your application; we could not verify your PAN against the document provided, "
+        "and the monthly repayment would take up a large share of your income. A loan officer will review your "
+        "application personally and contact you to discuss options."
+    ),
+    ("manual_review", BAND_SHORTFALL, KYC_UNVERIFIED): (
+        "Dear $name, thank you for your application; we could not verify your PAN against the document provided, "
+        "and the monthly repayment would exceed your current monthly income. A loan officer will review your "
+        "application personally and may suggest a smaller amount."
+    ),
+    ("rejected", BAND_SHORTFALL, KYC_VERIFIED): (
+        "Dear $name, thank you for applying; unfortunately we cannot approve this loan because the monthly "
+        "repayment would exceed your current monthly income. You are welcome to reapply for a smaller amount that "
+        "fits more comfortably within your budget."
+    ),
+    ("rejected", BAND_STRETCHED, KYC_VERIFIED): (
+        "Dear $name, thank you for applying; unfortunately we cannot approve this loan because the monthly "
+        "repayment would take up too large a share of your income. You are welcome to reapply for a smaller "
+        "amount or a longer tenure."
+    ),
+    ("pre_approved", BAND_CLEAR, KYC_VERIFIED): (
+        "Congratulations $name, your loan application has been pre-approved! Our team will now prepare your "
+        "sanction letter and contact you with the next steps for disbursement."
+    ),
+}
+
+# Compile once at import; rendering is a single substitute() call
+TEMPLATES = {key: Template(text) for key, text in _RAW_TEMPLATES.items()}
+
+
+def parse_math_details(math_details: str):
+    """Pull (ratio, threshold) out of run_underwriting's summary string"""
+    match = MATH_PATTERN.search(math_details or "")
+    if not match:
+        return None
+    return float(match.group(1)), float(match.group(2))
+
+
+def ratio_band(ratio: float, threshold: float) -> str:
+    if ratio >= threshold:
+        return BAND_CLEAR
+    if ratio >= threshold * 0.75:
+        return BAND_NEAR
+    if ratio >= 1.0:
+        return BAND_STRETCHED
+    return BAND_SHORTFALL
+
+
+def render_explanation(name: str, status: str, math_details: str, kyc_passed: Optional[bool] = True) -> Optional[str]:
+    """
+    Render the customer explanation from a template.
+    Returns None when no template covers the case, so the caller can fall back to the LLM.
+    """
+    parsed = parse_math_details(math_details)
+    if parsed is None:
+        return None
+
+    ratio, threshold = parsed
+    kyc = KYC_UNVERIFIED if kyc_passed is False else KYC_VERIFIED
+    template = TEMPLATES.get((status, ratio_band(ratio, threshold), kyc))
+    if template is None:
+        return None
+
+    return template.substitute(name=name)
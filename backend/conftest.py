@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Set before main / backend.util.llm are imported: no network, no files in the repo
+os.environ.setdefault("OPENROUTER_URL", "http://127.0.0.1:9/v1/chat/completions")
+os.environ.setdefault("LLM_MAX_RETRIES", "0")
+os.environ.setdefault("LOAN_STORE", "memory")
+os.environ.setdefault("PIPELINE_QUEUE_DB", "")
+os.environ.setdefault("KYC_UPLOAD_DIR", tempfile.mkdtemp(prefix="kyc-uploads-"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
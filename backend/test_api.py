@@ -0,0 +1,48 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from backend.util.job_queue import QueueFullError
+
+APPLICATION = {"name": "Arjun Kumar", "pan": "ABCDE1234F", "income": 75000, "amount": 500000, "purpose": "Home"}
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def wait_for_pipeline(client, loan_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        record = client.get(f"/loans/{loan_id}").json()
+        if record.get("pipeline_state") == "finished":
+            return record
+        time.sleep(0.05)
+    raise AssertionError(f"pipeline for {loan_id} did not finish")
+
+
+def test_create_loan_responds_with_the_submitted_record_only(client):
+    response = client.post("/loans", json=APPLICATION)
+    assert response.status_code == 200
+    body = response.json()
+    assert [entry["step"] for entry in body["timeline"]] == ["Submitted"]
+    assert body["timeline"][0]["version"] == 1
+
+    record = wait_for_pipeline(client, body["loan_id"])
+    assert record["status"] == "pending_manager_approval"
+    assert record["timeline"][0] == body["timeline"][0]
+
+
+def test_full_queue_returns_429_and_keeps_nothing(client, monkeypatch):
+    def full(*args, **kwargs):
+        raise QueueFullError("Pipeline queue is full")
+
+    monkeypatch.setattr(main.pipeline_queue, "submit", full)
+    before = main.loan_store.count()
+    response = client.post("/loans", json=APPLICATION)
+    assert response.status_code == 429
+    assert main.loan_store.count() == before
@@ -0,0 +1,87 @@
+import pytest
+
+from backend.util.cassette import Cassette, CassetteMiss
+from backend.util.llm import LLMClient
+
+MESSAGES = [{"role": "user", "content": "Write a sanction letter"}]
+MODEL = "google/gemini-2.5-flash"
+
+
+class FakeResponse:
+    status_code = 200
+    ok = True
+
+    def __init__(self, reply):
+        self._reply = reply
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {
+            "choices": [{"message": {"content": self._reply}}],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 34},
+        }
+
+
+def test_replay_needs_an_existing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Cassette(str(tmp_path / "missing.sqlite3"), "replay")
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "tape.sqlite3"), "off")
+
+
+def test_replay_returns_recordings_in_order_and_wraps_around(tmp_path):
+    path = str(tmp_path / "tape.sqlite3")
+    recorder = Cassette(path, "record")
+    recorder.record("key", MODEL, "letter", "first", 0.25, {"prompt_tokens": 1, "completion_tokens": 2})
+    recorder.record("key", MODEL, "letter", "second", 0.5)
+    recorder.close()
+
+    player = Cassette(path, "replay")
+    assert [player.replay("key")[0] for _ in range(3)] == ["first", "second", "first"]
+    assert player.replay("key")[1] == 0.0
+
+    with pytest.raises(CassetteMiss):
+        player.replay("other")
+    stats = player.stats()
+    assert (stats["recordings"], stats["requests"], stats["hits"], stats["misses"]) == (2, 1, 4, 1)
+    player.close()
+
+
+def test_replay_latency_modes(tmp_path):
+    path = str(tmp_path / "tape.sqlite3")
+    recorder = Cassette(path, "record")
+    recorder.record("key", MODEL, "letter", "reply", 0.25)
+    recorder.close()
+
+    assert Cassette(path, "replay", latency="recorded").replay("key")[1] == 0.25
+    assert Cassette(path, "replay", latency="0.1").replay("key")[1] == 0.1
+
+
+def test_rerecording_in_a_new_process_replaces_old_replies(tmp_path):
+    path = str(tmp_path / "tape.sqlite3")
+    first = Cassette(path, "record")
+    first.record("key", MODEL, "letter", "old", 0.1)
+    first.close()
+    second = Cassette(path, "record")
+    second.record("key", MODEL, "letter", "new", 0.1)
+    second.close()
+
+    player = Cassette(path, "replay")
+    assert [player.replay("key")[0] for _ in range(2)] == ["new", "new"]
+
+
+def test_client_records_then_replays_without_the_network(tmp_path, monkeypatch):
+    path = str(tmp_path / "tape.sqlite3")
+    recording = LLMClient(url="http://127.0.0.1:9/v1/chat/completions", max_retries=0, cassette=Cassette(path, "record"))
+    monkeypatch.setattr(recording.session, "post", lambda *args, **kwargs: FakeResponse("Dear Applicant"))
+    assert recording.chat(MESSAGES, model=MODEL, prompt_type="letter") == "Dear Applicant"
+    recording.cassette.close()
+
+    # Nothing listens on port 9; a replayed call must not try it
+    replaying = LLMClient(url="http://127.0.0.1:9/v1/chat/completions", max_retries=0, cassette=Cassette(path, "replay"))
+    assert replaying.chat(MESSAGES, model=MODEL, prompt_type="letter") == "Dear Applicant"
+    with pytest.raises(CassetteMiss):
+        replaying.chat([{"role": "user", "content": "Something else"}], model=MODEL)
+    assert replaying.cassette.stats()["hits"] == 1
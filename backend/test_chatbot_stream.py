@@ -0,0 +1,95 @@
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from backend.agents.chatbot import CollectedLineFilter
+from backend.util import llm
+from backend.util.llm import FALLBACK_REPLY
+
+
+def run_filter(chunks):
+    line_filter = CollectedLineFilter()
+    shown, collected = [], []
+    for chunk in chunks:
+        shown.append(line_filter.feed(chunk))
+        collected.append(line_filter.take_collected())
+    shown.append(line_filter.finish())
+    collected.append(line_filter.take_collected())
+    return "".join(shown), [item for item in collected if item]
+
+
+def test_filter_holds_back_a_collected_line_split_across_chunks():
+    shown, collected = run_filter(["COLL", "ECTED: fullName: Priya", " Sharma\nNice to ", "meet you!"])
+    assert shown == "Nice to meet you!"
+    assert collected == [("fullName", "Priya Sharma")]
+
+
+def test_filter_passes_plain_text_and_a_partial_marker_at_the_end():
+    assert run_filter(["Hello ", "there. COLL"]) == ("Hello there. COLL", [])
+
+
+def test_filter_reads_an_unterminated_collected_line_at_the_end():
+    assert run_filter(["Great!\n", "COLLECTED: amount: 500000"]) == ("Great!\n", [("amount", "500000")])
+
+
+def test_filter_structures_only_the_first_collected_line():
+    shown, collected = run_filter(["COLLECTED: pan: ABCDE1234F\nThanks.\nCOLLECTED: x: y\n"])
+    assert collected == [("pan", "ABCDE1234F")]
+    assert shown == "Thanks.\nCOLLECTED: x: y\n"
+
+
+class FakeStreamClient:
+    def __init__(self, deltas, error=None):
+        self.deltas = deltas
+        self.error = error
+
+    async def stream_chat(self, messages, **kwargs):
+        for delta in self.deltas:
+            yield delta
+        if self.error:
+            raise self.error
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("CHATBOT_LOCAL_EXTRACTION", "0")
+    with TestClient(main.app) as client:
+        yield client
+
+
+def stream(client, monkeypatch, fake):
+    monkeypatch.setattr(llm, "get_async_llm_client", lambda: fake)
+    response = client.post("/chatbot/stream", json={"message": "My name is Priya Sharma"})
+    assert response.status_code == 200
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        name, data = block.split("\n", 1)
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_emits_tokens_collected_and_done(client, monkeypatch):
+    events = stream(client, monkeypatch, FakeStreamClient(["COLLECTED: fullName: Priya Sharma\n", "Nice to ", "meet you!"]))
+    names = [name for name, _ in events]
+    assert names[0] == "collected" and names[-1] == "done"
+    assert events[0][1] == {"field": "fullName", "value": "Priya Sharma"}
+    assert "".join(data["text"] for name, data in events if name == "token") == "Nice to meet you!"
+    done = events[-1][1]
+    assert done["response"] == "Nice to meet you!"
+    assert done["collected_field"] == "fullName"
+    assert done["session_id"]
+
+
+def test_failure_before_any_text_streams_the_fallback(client, monkeypatch):
+    events = stream(client, monkeypatch, FakeStreamClient([], error=httpx.ConnectError("refused")))
+    assert events[-1][0] == "done"
+    assert events[-1][1]["response"] == FALLBACK_REPLY
+
+
+def test_failure_mid_stream_ends_with_an_error_event(client, monkeypatch):
+    events = stream(client, monkeypatch, FakeStreamClient(["Nice to "], error=httpx.ReadError("reset")))
+    assert [name for name, _ in events] == ["token", "error"]
+    assert FALLBACK_REPLY not in json.dumps(events)
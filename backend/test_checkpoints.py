@@ -0,0 +1,76 @@
+import copy
+import threading
+
+import pytest
+
+import main
+import pipeline
+from backend.util.job_queue import PipelineJobQueue
+from backend.util.loan_store import InMemoryLoanStore, SQLiteLoanStore
+from models import LoanRequest
+
+APPLICATION = LoanRequest(name="Arjun Kumar", pan="ABCDE1234F", income=75000, amount=500000, purpose="Home")
+
+
+def test_recovered_job_gets_its_last_checkpoint(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first = PipelineJobQueue(handler=lambda *args: None, db_path=path)
+    first.submit("loan-1", {"record": {"checkpoints": {}}})
+    first.checkpoint("loan-1", {"record": {"checkpoints": {"kyc": {"pan_valid": True}}}})
+
+    seen = []
+    done = threading.Event()
+
+    def handler(job_id, payload, checkpoint):
+        seen.append((job_id, payload))
+        done.set()
+
+    # A new queue on the same file stands in for the restarted process
+    second = PipelineJobQueue(handler=handler, workers=1, db_path=path)
+    second.start()
+    assert done.wait(5)
+    second.stop()
+    assert seen == [("loan-1", {"record": {"checkpoints": {"kyc": {"pan_valid": True}}}})]
+
+
+def test_pipeline_resumes_without_repeating_finished_stages(monkeypatch):
+    def not_again(*args, **kwargs):
+        raise AssertionError("finished stage ran again")
+
+    monkeypatch.setattr(pipeline, "verify_kyc", not_again)
+    monkeypatch.setattr(pipeline, "chat_with_grok", lambda *args, **kwargs: "Sanction letter")
+    record = pipeline.create_empty_loan_record(APPLICATION, "loan-2")
+    record["checkpoints"] = {"kyc": {"pan_valid": True, "document_checked": False}}
+
+    pipeline.run_pipeline(record)
+    assert record["status"] == "pending_manager_approval"
+    assert record["sanction_letter"] == "Sanction letter"
+    assert any(entry["step"] == "Pipeline Resumed" for entry in record["timeline"])
+
+
+def test_memory_store_checkpoints_into_the_job_queue(monkeypatch):
+    monkeypatch.setattr(main, "loan_store", InMemoryLoanStore())
+    monkeypatch.setattr(pipeline, "chat_with_grok", lambda *args, **kwargs: "Sanction letter")
+    record = pipeline.create_empty_loan_record(APPLICATION, "loan-3")
+
+    payloads = []
+    main.process_loan_job("loan-3", {"record": record}, lambda payload: payloads.append(copy.deepcopy(payload)))
+    stages = [set(payload["record"]["checkpoints"]) for payload in payloads]
+    assert stages[0] < stages[-1]
+    assert {"kyc", "underwriting", "sanction_letter", "decision", "finalize"} <= stages[-1]
+
+
+@pytest.mark.parametrize("make_store", [InMemoryLoanStore, lambda: SQLiteLoanStore(":memory:")])
+def test_unfinished_only_returns_queued_or_running_pipelines(make_store):
+    store = make_store()
+    for loan_id, status, state in [
+        ("a", "submitted", "queued"),
+        ("b", "kyc_completed", "running"),
+        ("c", "manual_review", "finished"),
+        ("d", "pending_manager_approval", "finished"),
+    ]:
+        store.put(loan_id, {"status": status, "pipeline_state": state, "data": {}, "timeline": [{"step": "Submitted", "time": loan_id}]})
+    assert sorted(loan_id for loan_id, _ in store.unfinished()) == ["a", "b"]
+
+    store.put("b", {"status": "manual_review", "pipeline_state": "finished", "data": {}, "timeline": [{"step": "Submitted", "time": "b"}]})
+    assert [loan_id for loan_id, _ in store.unfinished()] == ["a"]
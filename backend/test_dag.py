@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.util.dag import Stage, run_graph
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def test_independent_stages_run_in_parallel(executor):
+    def slow(results, cancelled):
+        time.sleep(0.2)
+        return 1
+
+    started = time.perf_counter()
+    runs = run_graph(
+        [Stage("a", slow), Stage("b", slow), Stage("c", lambda r, c: r["a"] + r["b"], deps=("a", "b"))],
+        executor,
+    )
+    assert time.perf_counter() - started < 0.35
+    assert runs["c"].state == "finished" and runs["c"].result == 2
+
+
+def test_guard_skips_stage(executor):
+    runs = run_graph(
+        [Stage("a", lambda r, c: "rejected"), Stage("b", lambda r, c: 1, deps=("a",), guard=lambda r: r["a"] == "ok")],
+        executor,
+    )
+    assert runs["b"].state == "skipped"
+
+
+def test_invalidation_sets_cancel_event_of_running_stage(executor):
+    letter_started = threading.Event()
+    letter_done = threading.Event()
+    seen = {}
+
+    def letter(results, cancelled):
+        letter_started.set()
+        seen["cancelled"] = cancelled.wait(2)
+        letter_done.set()
+        return "letter"
+
+    def kyc(results, cancelled):
+        letter_started.wait(2)
+        return {"pan_valid": False}
+
+    runs = run_graph(
+        [
+            Stage("kyc", kyc),
+            Stage("letter", letter, invalidated_by={"kyc": lambda result: not result["pan_valid"]}),
+        ],
+        executor,
+    )
+    # A cancelled stage is not waited for; it only sees its event
+    assert letter_done.wait(2)
+    assert seen["cancelled"] is True
+    assert runs["letter"].state == "cancelled"
+    assert runs["letter"].result is None
+
+
+def test_completed_stages_are_not_rerun(executor):
+    calls = []
+    runs = run_graph(
+        [Stage("a", lambda r, c: calls.append("a")), Stage("b", lambda r, c: r["a"] * 2, deps=("a",))],
+        executor,
+        completed={"a": 21},
+    )
+    assert calls == []
+    assert runs["b"].result == 42
+
+
+def test_stage_error_is_raised(executor):
+    def boom(results, cancelled):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        run_graph([Stage("a", boom)], executor)
+
+
+def test_cycle_is_rejected(executor):
+    with pytest.raises(ValueError):
+        run_graph([Stage("a", lambda r, c: 1, deps=("b",)), Stage("b", lambda r, c: 1, deps=("a",))], executor)
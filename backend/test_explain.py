@@ -0,0 +1,57 @@
+import pytest
+
+from backend.agents import explain
+from backend.agents.templates import render_explanation
+
+LOAN = {"name": "Priya Sharma"}
+
+
+def math(ratio, threshold=3.0):
+    return f"Income: 75000, EMI: 16607, Ratio: {ratio:.2f} (Threshold: {threshold})"
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Records prompts sent to the model; the reply addresses the customer by placeholder"""
+    calls = []
+
+    def chat(messages, **kwargs):
+        calls.append(messages)
+        return f"Dear {explain.NAME_PLACEHOLDER}, we will be in touch."
+
+    monkeypatch.setattr(explain, "chat_with_grok", chat)
+    return calls
+
+
+@pytest.mark.parametrize("status, ratio, kyc_passed, opening", [
+    ("pre_approved", 4.5, True, "Congratulations Priya Sharma"),
+    ("manual_review", 2.5, True, "Dear Priya Sharma"),
+    ("manual_review", 1.5, True, "Dear Priya Sharma"),
+    ("manual_review", 0.8, True, "Dear Priya Sharma"),
+    ("manual_review", 4.5, False, "Dear Priya Sharma"),
+    ("rejected", 0.8, True, "Dear Priya Sharma"),
+])
+def test_routine_outcomes_render_from_templates(llm_calls, status, ratio, kyc_passed, opening):
+    text = explain.generate_explanation(LOAN, status, math(ratio), kyc_passed)
+    assert text.startswith(opening)
+    assert text == render_explanation("Priya Sharma", status, math(ratio), kyc_passed)
+    assert llm_calls == []
+
+
+@pytest.mark.parametrize("status, details", [
+    ("pre_approved", "Ratio unavailable"),        # summary without a ratio
+    ("rejected", math(4.5)),                      # no template for a rejection that clears the threshold
+    ("pre_approved", math(2.0)),                  # no template for an approval under the threshold
+])
+def test_uncovered_cases_fall_back_to_the_llm(llm_calls, status, details):
+    assert render_explanation("Priya Sharma", status, details) is None
+    assert explain.generate_explanation(LOAN, status, details, True) == "Dear Priya Sharma, we will be in touch."
+    assert len(llm_calls) == 1
+    # The prompt never carries the name, so the reply can be shared across customers
+    assert "Priya" not in str(llm_calls[0])
+
+
+def test_llm_mode_skips_the_templates(llm_calls, monkeypatch):
+    monkeypatch.setenv("EXPLANATION_MODE", "llm")
+    explain.generate_explanation(LOAN, "pre_approved", math(4.5), True)
+    assert len(llm_calls) == 1
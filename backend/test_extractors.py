@@ -0,0 +1,69 @@
+import pytest
+
+from backend.agents.extractors import extract_field, local_reply, parse_indian_amount, parse_tenure_months
+
+BEFORE_INCOME = {
+    "fullName": "Arjun Kumar", "email": "arjun@example.com", "phone": "9876543210", "pan": "ABCDE1234F",
+    "address": "12 MG Road, Pune", "employmentType": "Salaried",
+}
+
+
+@pytest.mark.parametrize("message, name", [
+    ("My name is Arjun Kumar", "Arjun Kumar"),
+    ("my full name is priya sharma.", "Priya Sharma"),
+    ("This is Ravi", "Ravi"),
+    ("Name: Anita D'Souza", "Anita D'Souza"),
+])
+def test_explicit_introductions_give_a_name(message, name):
+    assert extract_field(message, {}) == ("fullName", name)
+
+
+@pytest.mark.parametrize("message", [
+    "I am looking for a home loan",
+    "I'm not sure",
+    "I am salaried",
+    "I am interested in a personal loan",
+    "This is not my loan",
+    "this is about my application",
+    "Arjun",
+    "about 5 lakh",
+    "50000 rupees",
+])
+def test_sentences_are_not_taken_as_a_name(message):
+    assert local_reply(message, {}) is None
+
+
+@pytest.mark.parametrize("text, rupees", [
+    ("5 lakh", 500000),
+    ("about 5 lakh", 500000),
+    ("1,20,000", 120000),
+    ("50000 rupees", 50000),
+    ("Rs 50000/-", 50000),
+    ("1.2 crore", 12000000),
+    ("50k", 50000),
+])
+def test_indian_amounts(text, rupees):
+    assert parse_indian_amount(text) == rupees
+
+
+def test_income_is_bounded():
+    assert extract_field("75,000 per month", BEFORE_INCOME) == ("income", "75000")
+    assert extract_field("2", BEFORE_INCOME) is None
+    assert extract_field("50 crore", BEFORE_INCOME) is None
+
+
+def test_loan_amount_is_bounded():
+    collected = dict(BEFORE_INCOME, income="75000")
+    assert extract_field("5 lakh", collected) == ("amount", "500000")
+    assert extract_field("500", collected) is None
+
+
+def test_unambiguous_fields_are_taken_out_of_order():
+    assert extract_field("it's arjun@example.com", {}) == ("email", "arjun@example.com")
+    assert extract_field("abcde1234f", {"fullName": "Arjun"}) == ("pan", "ABCDE1234F")
+
+
+def test_tenure():
+    assert parse_tenure_months("3 years") == 36
+    assert parse_tenure_months("36 months") == 36
+    assert parse_tenure_months("30 months") is None
@@ -0,0 +1,77 @@
+import os
+import threading
+
+import pytest
+
+from backend.util import events
+from backend.util.events import EventBus, publish_event
+from backend.util.job_queue import PipelineJobQueue, QueueFullError
+
+
+def publishing_handler(job_id, payload, checkpoint):
+    publish_event({"loan_id": job_id}, "status", status="kyc_completed")
+    return os.getpid()
+
+
+class RecordingBus(EventBus):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def deliver(self, loan_id, event):
+        self.events.append(event)
+
+
+def test_process_mode_spawns_workers_and_relays_their_events(monkeypatch):
+    bus = RecordingBus()
+    monkeypatch.setattr(events, "_bus", bus)
+    results = {}
+    done = threading.Event()
+
+    def on_result(job_id, result):
+        results[job_id] = result
+        done.set()
+
+    queue = PipelineJobQueue(publishing_handler, workers=1, mode="process", on_result=on_result)
+    queue.start()
+    try:
+        queue.submit("loan-1", {})
+        assert done.wait(60)
+    finally:
+        queue.stop()
+
+    assert results["loan-1"] != os.getpid()
+    assert queue._processes._mp_context.get_start_method() == "spawn"
+    assert [event["type"] for event in bus.events] == ["status"]
+    assert bus.events[0]["loan_id"] == "loan-1"
+
+
+def test_thread_mode_serves_higher_lanes_first():
+    order = []
+    gate = threading.Event()
+    finished = threading.Semaphore(0)
+
+    def handler(job_id, payload, checkpoint):
+        gate.wait()
+        order.append(job_id)
+        finished.release()
+
+    queue = PipelineJobQueue(handler, workers=1, max_depth=3)
+    queue.start()
+    try:
+        queue.submit("blocker", {})
+        # Wait until the worker holds "blocker" so the rest stay queued
+        while queue.depth():
+            pass
+        queue.submit("low", {}, priority="low")
+        queue.submit("normal", {})
+        queue.submit("high", {}, priority="high")
+        with pytest.raises(QueueFullError):
+            queue.submit("overflow", {})
+        gate.set()
+        for _ in range(4):
+            assert finished.acquire(timeout=10)
+    finally:
+        queue.stop()
+
+    assert order == ["blocker", "high", "normal", "low"]
@@ -0,0 +1,47 @@
+import pytest
+
+from backend.util import documents
+from kyc import verify_kyc
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(documents, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+def loan_with(document_id, name="Arjun Kumar", pan="ABCDE1234F"):
+    return {"loan_id": "test", "data": {"name": name, "pan": pan, "document_id": document_id}, "timeline": []}
+
+
+def test_matching_document_passes(upload_dir):
+    document_id = documents.save_document("pan.txt", b"INCOME TAX DEPARTMENT\nARJUN KUMAR\nABCDE1234F\n")
+    loan = loan_with(document_id)
+    result = verify_kyc(loan)
+    assert result == {"pan_valid": True, "document_checked": True, "pan_in_document": True, "name_in_document": True}
+    assert "Document 'pan.txt' received" in loan["timeline"][0]["detail"]
+
+
+def test_name_mismatch_goes_to_review(upload_dir):
+    document_id = documents.save_document("pan.txt", b"INCOME TAX DEPARTMENT\nRAVI SHARMA\nABCDE1234F\n")
+    loan = loan_with(document_id)
+    result = verify_kyc(loan)
+    assert result["pan_in_document"] is True
+    assert result["name_in_document"] is False
+    assert result["pan_valid"] is False
+    assert "does not match" in loan["timeline"][-1]["detail"]
+
+
+def test_pan_mismatch_fails(upload_dir):
+    document_id = documents.save_document("pan.txt", b"ARJUN KUMAR\nZZZZZ9999Z\n")
+    assert verify_kyc(loan_with(document_id))["pan_valid"] is False
+
+
+def test_without_document_only_format_is_checked(upload_dir):
+    assert verify_kyc(loan_with(None))["pan_valid"] is True
+    assert verify_kyc(loan_with(None, pan="12345"))["pan_valid"] is False
+
+
+def test_unsupported_upload_is_rejected(upload_dir):
+    with pytest.raises(ValueError):
+        documents.save_document("pan.exe", b"")
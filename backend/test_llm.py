@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+import pytest
+import requests
+
+from backend.util.llm import AsyncLLMClient, LLMClient
+
+URL = "http://llm.test/v1/chat/completions"
+MESSAGES = [{"role": "user", "content": "hello"}]
+REPLY = {"choices": [{"message": {"content": "hi"}}], "usage": {"prompt_tokens": 1, "completion_tokens": 1}}
+
+
+class FakeResponse:
+    status_code = 200
+    ok = True
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return REPLY
+
+
+def sync_client(monkeypatch, failures):
+    """LLMClient whose POSTs raise each of failures in turn, then succeed"""
+    client = LLMClient(url=URL, max_retries=2, backoff_base=0)
+    calls = []
+
+    def post(*args, **kwargs):
+        calls.append(1)
+        if len(calls) <= len(failures):
+            raise failures[len(calls) - 1]
+        return FakeResponse()
+
+    monkeypatch.setattr(client.session, "post", post)
+    return client, calls
+
+
+def test_sync_client_retries_connect_failures(monkeypatch):
+    client, calls = sync_client(monkeypatch, [requests.ConnectionError(), requests.ConnectTimeout()])
+    assert client.chat(MESSAGES) == "hi"
+    assert len(calls) == 3
+
+
+def test_sync_client_gives_up_after_max_retries(monkeypatch):
+    client, calls = sync_client(monkeypatch, [requests.ConnectionError()] * 3)
+    with pytest.raises(requests.ConnectionError):
+        client.chat(MESSAGES)
+    assert len(calls) == 3
+
+
+def test_sync_client_does_not_resend_after_a_read_timeout(monkeypatch):
+    client, calls = sync_client(monkeypatch, [requests.ReadTimeout()])
+    with pytest.raises(requests.ReadTimeout):
+        client.chat(MESSAGES)
+    assert len(calls) == 1
+
+
+def async_client(failures):
+    client = AsyncLLMClient(url=URL, max_retries=2, backoff_base=0)
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        if len(calls) <= len(failures):
+            raise failures[len(calls) - 1]
+        return httpx.Response(200, json=REPLY)
+
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client, calls
+
+
+def test_async_client_retries_connect_failures():
+    client, calls = async_client([httpx.ConnectError("refused"), httpx.ConnectTimeout("slow")])
+    assert asyncio.run(client.chat(MESSAGES)) == "hi"
+    assert len(calls) == 3
+
+
+def test_async_client_does_not_resend_after_a_read_timeout():
+    client, calls = async_client([httpx.ReadTimeout("slow")])
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(client.chat(MESSAGES))
+    assert len(calls) == 1
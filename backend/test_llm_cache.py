@@ -0,0 +1,91 @@
+import pytest
+
+from backend.util import llm, llm_cache
+from backend.util.llm_cache import ResponseCache, cache_key
+
+MESSAGES = [{"role": "user", "content": "Explain   the\n decision"}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls time.time() as seen by the cache"""
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_miss_then_hit():
+    cache = ResponseCache(max_entries=4)
+    assert cache.get("k") is None
+    cache.put("k", "reply")
+    assert cache.get("k") == "reply"
+    assert cache.stats() == {"entries": 1, "hits": 1, "disk_hits": 0, "misses": 1, "evictions": 0, "hit_rate": 0.5}
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(ttl=60)
+    cache.put("k", "reply")
+    clock[0] += 60
+    assert cache.get("k") == "reply"
+    clock[0] += 1
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_a_restart_until_ttl(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(ttl=60, path=path).put("k", "reply")
+
+    restarted = ResponseCache(ttl=60, path=path)
+    assert restarted.get("k") == "reply"
+    assert restarted.stats()["disk_hits"] == 1
+
+    clock[0] += 61
+    assert ResponseCache(ttl=60, path=path).get("k") is None
+
+
+def test_key_ignores_whitespace_but_not_content():
+    key = cache_key("m", MESSAGES, 0.7)
+    assert key == cache_key("m", [{"role": "user", "content": "Explain the decision"}], 0.7)
+    assert key != cache_key("m", [{"role": "user", "content": "Explain the decisions"}], 0.7)
+    assert key != cache_key("m", MESSAGES, 0.2)
+
+
+class CountingClient:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+
+    def chat(self, messages, **kwargs):
+        self.calls += 1
+        return self.reply
+
+
+def test_cached_chat_calls_the_model_once_and_never_caches_the_fallback(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(llm, "get_response_cache", lambda: cache)
+
+    client = CountingClient("Approved.")
+    monkeypatch.setattr(llm, "get_llm_client", lambda: client)
+    assert llm.chat_with_grok(MESSAGES, cache=True) == "Approved."
+    assert llm.chat_with_grok(MESSAGES, cache=True) == "Approved."
+    assert client.calls == 1
+
+    def unreachable():
+        raise ConnectionError("down")
+
+    other = [{"role": "user", "content": "something else"}]
+    monkeypatch.setattr(llm, "get_llm_client", unreachable)
+    assert llm.chat_with_grok(other, cache=True) == llm.FALLBACK_REPLY
+    assert cache.get(cache_key("google/gemini-2.5-flash", other, llm.DEFAULT_TEMPERATURE)) is None
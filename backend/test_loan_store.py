@@ -0,0 +1,142 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from backend.util.loan_store import InMemoryLoanStore, SQLiteLoanStore
+
+
+def make_record(index, status="pending_manager_approval", amount=None, pipeline_state="finished"):
+    return {
+        "loan_id": f"loan-{index:03d}",
+        "data": {"name": f"Applicant {index}", "pan": "ABCDE1234F", "income": 75000.0, "amount": amount or 100000.0 + index, "purpose": "Home"},
+        "status": status,
+        "pipeline_state": pipeline_state,
+        "timeline": [{"step": "Submitted", "detail": "Application received", "time": f"2026-01-01T00:00:{index:02d}"}],
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = InMemoryLoanStore() if request.param == "memory" else SQLiteLoanStore(str(tmp_path / "loans.sqlite3"))
+    yield store
+    store.close()
+
+
+def fill(store, count=10, **kwargs):
+    for index in range(count):
+        record = make_record(index, **kwargs)
+        store.put(record["loan_id"], record)
+
+
+def all_pages(store, limit, **kwargs):
+    ids, cursor = [], None
+    while True:
+        rows, cursor = store.page("pending_manager_approval", limit=limit, cursor=cursor, **kwargs)
+        ids.extend(loan_id for loan_id, _ in rows)
+        if cursor is None:
+            return ids
+
+
+def test_page_walks_every_loan_once_in_order(store):
+    fill(store)
+    expected = [f"loan-{index:03d}" for index in range(10)]
+    assert all_pages(store, limit=3) == expected
+    assert all_pages(store, limit=3, descending=True) == expected[::-1]
+    assert all_pages(store, limit=10) == expected
+
+
+def test_page_by_amount_breaks_ties_by_loan_id(store):
+    fill(store, amount=250000.0)
+    expected = [f"loan-{index:03d}" for index in range(10)]
+    assert all_pages(store, limit=4, sort="amount") == expected
+    assert all_pages(store, limit=4, sort="amount", descending=True) == expected[::-1]
+
+
+def test_cursor_is_stable_when_earlier_rows_change(store):
+    fill(store)
+    rows, cursor = store.page("pending_manager_approval", limit=4)
+    assert [loan_id for loan_id, _ in rows] == ["loan-000", "loan-001", "loan-002", "loan-003"]
+
+    # Rows already seen leave the status; the next page still starts after loan-003
+    for loan_id, record in rows:
+        record["status"] = "approved"
+        store.put(loan_id, record)
+    rows, _ = store.page("pending_manager_approval", limit=2, cursor=cursor)
+    assert [loan_id for loan_id, _ in rows] == ["loan-004", "loan-005"]
+    assert store.count("pending_manager_approval") == 6
+    assert store.count("approved") == 4
+
+
+def test_page_rejects_unknown_sort_and_bad_cursor(store):
+    with pytest.raises(ValueError):
+        store.page("pending_manager_approval", sort="name")
+    with pytest.raises(ValueError):
+        store.page("pending_manager_approval", cursor="not-a-cursor")
+
+
+def test_scan_bounds_and_resume(store):
+    fill(store)
+    seen = list(store.scan(since="2026-01-01T00:00:03", until="2026-01-01T00:00:07", batch_size=2))
+    assert [loan_id for loan_id, _, _ in seen] == ["loan-003", "loan-004", "loan-005", "loan-006"]
+
+    resumed = [loan_id for loan_id, _, _ in store.scan(cursor=seen[1][2])]
+    assert resumed == [f"loan-{index:03d}" for index in range(5, 10)]
+
+
+def test_unfinished_and_delete(store):
+    fill(store, count=3)
+    queued = make_record(3, status="submitted", pipeline_state="queued")
+    store.put(queued["loan_id"], queued)
+    assert [loan_id for loan_id, _ in store.unfinished()] == ["loan-003"]
+
+    store.delete("loan-003")
+    store.delete("loan-404")
+    assert store.get("loan-003") is None
+    assert store.unfinished() == []
+    assert store.count() == 3
+
+
+def test_get_returns_a_copy(store):
+    fill(store, count=1)
+    record = store.get("loan-000")
+    record["status"] = "approved"
+    record["timeline"].append({"step": "Manager Approved", "detail": "ok", "time": "2026-01-02T00:00:00"})
+    assert store.get("loan-000")["status"] == "pending_manager_approval"
+    assert len(store.get("loan-000")["timeline"]) == 1
+
+
+def test_manager_pending_pages_through_the_queue(monkeypatch):
+    store = InMemoryLoanStore()
+    fill(store, count=5)
+    monkeypatch.setattr(main, "loan_store", store)
+
+    with TestClient(main.app) as client:
+        first = client.get("/manager/pending", params={"limit": 2}).json()
+        assert [loan["loan_id"] for loan in first["pending_loans"]] == ["loan-000", "loan-001"]
+        assert first["total"] == 5
+        assert "sanction_letter" not in first["pending_loans"][0]
+
+        rest = client.get("/manager/pending", params={"limit": 10, "cursor": first["next_cursor"]}).json()
+        assert [loan["loan_id"] for loan in rest["pending_loans"]] == ["loan-002", "loan-003", "loan-004"]
+        assert rest["next_cursor"] is None
+
+        newest = client.get("/manager/pending", params={"limit": 1, "sort": "amount", "order": "desc"}).json()
+        assert newest["pending_loans"][0]["loan_id"] == "loan-004"
+
+        assert client.get("/manager/pending", params={"cursor": "bogus"}).status_code == 400
+
+
+def test_packed_record_round_trips():
+    store = InMemoryLoanStore()
+    record = make_record(1)
+    letter = "Dear Applicant,\n\n" + "terms " * 200
+    kyc = {"pan_valid": True, "name_in_document": None}
+    record.update({"sanction_letter": letter, "kyc": kyc, "checkpoints": {"kyc": kyc, "sanction_letter": letter}, "note": ["x", 1]})
+    store.put("loan-001", record)
+
+    stored = store.get("loan-001")
+    assert stored == record
+    # Shared values come back as independent copies
+    stored["kyc"]["pan_valid"] = False
+    assert stored["checkpoints"]["kyc"]["pan_valid"] is True
+    assert store.financials() == [("loan-001", 75000.0, 100001.0)]
@@ -0,0 +1,57 @@
+import io
+import json
+import logging
+import sys
+
+import pytest
+
+from backend.util import log
+
+
+@pytest.fixture
+def emitted(monkeypatch):
+    """Reconfigures logging to write into a buffer; returns a function that flushes and parses it"""
+    buffer = io.StringIO()
+    log.stop_logging()
+    monkeypatch.setattr(sys, "stdout", buffer)
+    monkeypatch.setenv("LOG_FORMAT", "json")
+    monkeypatch.setenv("LOG_SAMPLE", "")
+    log.configure_logging()
+
+    def records():
+        log.stop_logging()
+        return [json.loads(line) for line in buffer.getvalue().splitlines()]
+
+    yield records
+    log.stop_logging()
+    monkeypatch.undo()
+    log.configure_logging()
+
+
+def test_secrets_are_redacted_in_the_emitted_record(emitted):
+    logger = log.get_logger("test")
+    logger.warning(
+        "KYC failed for PAN %s",
+        "ABCDE1234F",
+        extra={"pan": "ABCDE1234F", "income": 75000, "applicant": {"pan": "ABCDE1234F", "note": "pan ABCDE1234F"}},
+    )
+
+    [record] = emitted()
+    assert record["msg"] == "KYC failed for PAN XXXXX1234X"
+    assert record["pan"] == "[redacted]"
+    assert record["income"] == "[redacted]"
+    assert record["applicant"] == {"pan": "[redacted]", "note": "pan XXXXX1234X"}
+    assert "ABCDE1234F" not in json.dumps(record)
+    assert "75000" not in json.dumps(record)
+
+
+def test_sampling_drops_only_records_below_warning(monkeypatch):
+    monkeypatch.setattr(log.random, "random", lambda: 0.99)
+    sampler = log.SamplingFilter(log._parse_rates("llm=0.1"))
+
+    def record(name, level):
+        return logging.LogRecord(name, level, __file__, 0, "msg", (), None)
+
+    assert not sampler.filter(record("loanapp.llm.stream", logging.INFO))
+    assert sampler.filter(record("loanapp.llm", logging.WARNING))
+    assert sampler.filter(record("loanapp.pipeline", logging.INFO))
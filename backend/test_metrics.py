@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from backend.util import metrics
+from backend.util.metrics import Counter, Histogram
+
+THREADS = 8
+PER_THREAD = 5000
+
+
+def scrape(client, prefix):
+    """Sample lines from /metrics whose name starts with prefix, as {name+labels: value}"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    samples = {}
+    for line in response.text.splitlines():
+        if line.startswith(prefix):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def run_threads(target):
+    threads = [threading.Thread(target=target) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_metrics_totals_add_up_across_threads(monkeypatch):
+    monkeypatch.setattr(metrics, "REGISTRY", [])
+    requests = Counter("test_requests_total", "Requests", ["route"])
+    latency = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    start = threading.Barrier(THREADS)
+
+    def work():
+        child = requests.labels("/loans")
+        start.wait()
+        for i in range(PER_THREAD):
+            child.inc()
+            requests.labels("/metrics").inc(2)
+            latency.observe(0.05 if i % 2 else 0.5)
+
+    with TestClient(main.app) as client:
+        run_threads(work)
+        samples = scrape(client, "test_")
+
+    total = THREADS * PER_THREAD
+    assert samples['test_requests_total{route="/loans"}'] == total
+    assert samples['test_requests_total{route="/metrics"}'] == 2 * total
+    assert samples['test_latency_seconds_bucket{le="0.1"}'] == total / 2
+    assert samples['test_latency_seconds_bucket{le="1"}'] == total
+    assert samples['test_latency_seconds_bucket{le="+Inf"}'] == total
+    assert samples["test_latency_seconds_count"] == total
+    assert samples["test_latency_seconds_sum"] == pytest.approx(total / 2 * 0.55)
+
+
+def test_threads_that_exit_keep_their_counts(monkeypatch):
+    monkeypatch.setattr(metrics, "REGISTRY", [])
+    counter = Counter("test_exited_threads_total", "Counts from finished threads")
+    run_threads(lambda: counter.inc(3))
+    assert counter.labels().value() == 3 * THREADS
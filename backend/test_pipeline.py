@@ -0,0 +1,60 @@
+import json
+import threading
+import time
+
+import pipeline
+from backend.util.llm import FALLBACK_REPLY
+from kyc import log_step
+from models import LoanRequest
+
+LOAN = {"name": "Arjun Kumar", "pan": "ABCDE1234F", "income": 75000, "amount": 500000, "purpose": "Home"}
+APPLICATION = LoanRequest(**LOAN)
+
+
+def test_sanction_letter_falls_back_to_computed_terms(monkeypatch):
+    monkeypatch.setattr(pipeline, "chat_with_grok", lambda *args, **kwargs: FALLBACK_REPLY)
+    letter = pipeline.generate_sanction_letter(LOAN, "Income: 75000, EMI: 10624, Ratio: 7.06")
+    assert letter != FALLBACK_REPLY
+    assert "Arjun Kumar" in letter
+    assert "EMI: ₹" in letter and "months" in letter
+
+
+def test_sanction_letter_uses_llm_reply(monkeypatch):
+    monkeypatch.setattr(pipeline, "chat_with_grok", lambda *args, **kwargs: "Dear Arjun, your loan is sanctioned.")
+    assert pipeline.generate_sanction_letter(LOAN, "") == "Dear Arjun, your loan is sanctioned."
+
+
+def test_cancelled_sanction_letter_skips_llm(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pipeline, "chat_with_grok", lambda *args, **kwargs: calls.append(args) or "letter")
+    cancelled = threading.Event()
+    cancelled.set()
+    assert pipeline.generate_sanction_letter(LOAN, "", cancelled=cancelled) is None
+    assert calls == []
+
+
+def test_stages_never_change_the_record_while_on_update_reads_it(monkeypatch):
+    def slow_kyc(loan):
+        for step in range(20):
+            log_step(loan, f"KYC step {step}", "checking")
+            time.sleep(0.005)
+        return {"pan_valid": True, "document_checked": False}
+
+    monkeypatch.setattr(pipeline, "verify_kyc", slow_kyc)
+    monkeypatch.setattr(pipeline, "chat_with_grok", lambda *args, **kwargs: "Sanction letter")
+    changed = []
+
+    def on_update(record):
+        before = json.dumps(record)
+        time.sleep(0.01)
+        if json.dumps(record) != before:
+            changed.append(record["timeline"][-1]["step"])
+
+    record = pipeline.create_empty_loan_record(APPLICATION, "loan-3")
+    pipeline.run_pipeline(record, on_update=on_update)
+
+    assert changed == []
+    steps = [entry["step"] for entry in record["timeline"]]
+    assert [step for step in steps if step.startswith("KYC step")] == [f"KYC step {step}" for step in range(20)]
+    assert record["kyc"]["pan_valid"] is True
+    assert record["status"] == "pending_manager_approval"
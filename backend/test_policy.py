@@ -0,0 +1,80 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from backend.util.loan_store import InMemoryLoanStore, SQLiteLoanStore
+from policy import PolicyEngine
+
+
+def make_record(index, income=75000.0, amount=500000.0):
+    return {
+        "loan_id": f"loan-{index}",
+        "data": {"name": f"Applicant {index}", "income": income, "amount": amount},
+        "status": "pending_manager_approval",
+        "pipeline_state": "finished",
+        "timeline": [{"step": "Submitted", "detail": "Application received", "time": f"2026-01-01T00:00:0{index}"}],
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = InMemoryLoanStore() if request.param == "memory" else SQLiteLoanStore(str(tmp_path / "loans.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_revision_moves_on_every_real_change(store):
+    start = store.revision()
+    record = make_record(1)
+    store.put("loan-1", record)
+    assert store.revision() == start + 1
+
+    # Unchanged put: same version, same revision
+    store.put("loan-1", store.get("loan-1"))
+    assert store.revision() == start + 1
+
+    record = store.get("loan-1")
+    record["status"] = "approved"
+    store.put("loan-1", record)
+    assert store.revision() == start + 2
+
+    store.delete("loan-1")
+    store.delete("loan-1")
+    assert store.revision() == start + 3
+
+
+def test_snapshot_is_rebuilt_when_the_book_changes_without_the_count_changing(store):
+    engine = PolicyEngine(store)
+    store.put("loan-1", make_record(1, amount=500000.0))
+    store.put("loan-2", make_record(2, amount=500000.0))
+    first = engine.sweep([2.0], [0.12], [3])
+    assert first["approved_volume"] == [[[1000000.0]]]
+
+    # Replace one loan by another: the count is back to 2 but the book differs
+    store.delete("loan-2")
+    store.put("loan-3", make_record(3, amount=250000.0))
+    second = engine.sweep([2.0], [0.12], [3])
+    assert second["snapshot_version"] != first["snapshot_version"]
+    assert second["approved_volume"] == [[[750000.0]]]
+
+    # Nothing changed: the cached result is served
+    assert engine.sweep([2.0], [0.12], [3]) is second
+
+
+@pytest.mark.parametrize("body", [
+    {"years": [0]},
+    {"years": [-3]},
+    {"annual_rates": [-0.1]},
+    {"thresholds": [-1]},
+    {"years": []},
+])
+def test_policy_sweep_rejects_invalid_grids(body):
+    with TestClient(main.app) as client:
+        assert client.post("/analysis/policy-sweep", json=body).status_code == 422
+
+
+def test_policy_sweep_accepts_a_zero_rate():
+    with TestClient(main.app) as client:
+        response = client.post("/analysis/policy-sweep", json={"annual_rates": [0.0, 0.12], "years": [1, 3]})
+    assert response.status_code == 200
+    assert response.json()["grid"]["annual_rates"] == [0.0, 0.12]
@@ -0,0 +1,96 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from backend.util.loan_store import changes_since, stamp_version
+
+
+def make_record(loan_id):
+    return {
+        "loan_id": loan_id,
+        "data": {"name": "Arjun Kumar", "amount": 500000.0},
+        "status": "submitted",
+        # Not queued/running, so startup recovery leaves it alone
+        "pipeline_state": "finished",
+        "timeline": [{"step": "Submitted", "detail": "Application received", "time": "2026-01-01T00:00:00"}],
+    }
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_stamp_version_bumps_only_on_change():
+    record = make_record("poll-1")
+    state = stamp_version(record, None)
+    assert record["version"] == 1
+
+    state = stamp_version(record, state)
+    assert record["version"] == 1
+
+    record["status"] = "kyc_completed"
+    record["timeline"].append({"step": "KYC Check Complete", "detail": "done", "time": "2026-01-01T00:00:01"})
+    stamp_version(record, state)
+    assert record["version"] == 2
+    assert record["field_versions"]["status"] == 2
+    assert record["field_versions"]["data"] == 1
+    assert [entry["version"] for entry in record["timeline"]] == [1, 2]
+
+
+def test_changes_since_returns_only_newer_fields_and_entries():
+    record = make_record("poll-2")
+    state = stamp_version(record, None)
+    record["status"] = "kyc_completed"
+    record["timeline"].append({"step": "KYC Check Complete", "detail": "done", "time": "2026-01-01T00:00:01"})
+    stamp_version(record, state)
+
+    delta = changes_since(record, 1)
+    assert delta["version"] == 2
+    assert delta["changed"] == {"status": "kyc_completed"}
+    assert [entry["step"] for entry in delta["timeline"]] == ["KYC Check Complete"]
+    assert changes_since(record, 2)["changed"] == {}
+
+
+def test_get_loan_sends_etag_and_304_when_unchanged(client):
+    main.loan_store.put("poll-3", make_record("poll-3"))
+
+    first = client.get("/loans/poll-3")
+    assert first.status_code == 200
+    assert first.headers["ETag"] == '"1"'
+
+    cached = client.get("/loans/poll-3", headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    record = main.loan_store.get("poll-3")
+    record["status"] = "kyc_completed"
+    main.loan_store.put("poll-3", record)
+
+    changed = client.get("/loans/poll-3", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] == '"2"'
+    assert changed.json()["status"] == "kyc_completed"
+
+
+def test_get_loan_since_returns_the_delta(client):
+    main.loan_store.put("poll-4", make_record("poll-4"))
+    record = main.loan_store.get("poll-4")
+    record["explanation"] = "Processing..."
+    record["timeline"].append({"step": "PAN Verification", "detail": "ok", "time": "2026-01-01T00:00:02"})
+    main.loan_store.put("poll-4", record)
+
+    delta = client.get("/loans/poll-4", params={"since": 1}).json()
+    assert delta["version"] == 2
+    assert delta["changed"] == {"explanation": "Processing..."}
+    assert [entry["step"] for entry in delta["timeline"]] == ["PAN Verification"]
+
+    # A since ahead of the stored version falls back to the full record
+    full = client.get("/loans/poll-4", params={"since": 99}).json()
+    assert full["loan_id"] == "poll-4"
+    assert len(full["timeline"]) == 2
+
+
+def test_get_loan_404(client):
+    assert client.get("/loans/missing").status_code == 404
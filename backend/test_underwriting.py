@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from underwriting import calculate_emi, score_batch
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_score_batch_matches_the_single_loan_math():
+    scored = score_batch([75000, 10000], [500000, 900000], annual_rate=[0.12, 0.0], years=[3, 2])
+    assert scored["emi"][0] == pytest.approx(calculate_emi(500000, 0.12, 3))
+    assert scored["emi"][1] == pytest.approx(900000 / 24)
+    assert scored["decision"].tolist() == ["pre_approved", "manual_review"]
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"income": [1, 2], "amount": [1]}, "same length"),
+    ({"years": [3, 3, 3]}, "one per loan"),
+    ({"annual_rate": [0.1]}, "one per loan"),
+    ({"years": 0}, "years"),
+    ({"years": [3, 0]}, "years"),
+    ({"annual_rate": -0.01}, "annual_rate"),
+])
+def test_score_batch_rejects_bad_input(kwargs, message):
+    args = {"income": [75000, 50000], "amount": [500000, 400000]}
+    args.update(kwargs)
+    with pytest.raises(ValueError, match=message):
+        score_batch(**args)
+
+
+def test_batch_endpoint_scores_every_loan(client):
+    response = client.post("/underwriting/batch", json={"income": [75000, 10000], "amount": [500000, 900000], "years": [3, 2]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 2
+    assert body["decision"] == ["pre_approved", "manual_review"]
+
+
+@pytest.mark.parametrize("body, status", [
+    ({"income": [1, 2], "amount": [1]}, 400),
+    ({"income": [1, 2], "amount": [1, 2], "years": [3]}, 400),
+    ({"income": [1], "amount": [1], "years": 0}, 422),
+    ({"income": [1, 2], "amount": [1, 2], "years": [3, 0]}, 422),
+    ({"income": [1], "amount": [1], "annual_rate": -0.1}, 422),
+    ({"income": [-1], "amount": [1]}, 422),
+])
+def test_batch_endpoint_rejects_bad_input(client, body, status):
+    assert client.post("/underwriting/batch", json=body).status_code == status
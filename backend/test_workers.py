@@ -0,0 +1,76 @@
+import pytest
+
+from backend.util import broker
+from backend.util.chat_sessions import SQLiteChatSessionStore
+from backend.util.loan_store import SQLiteLoanStore, create_loan_store
+
+
+def clear_env(monkeypatch, *names):
+    for name in names:
+        # setenv first so the original value (or its absence) is restored afterwards
+        monkeypatch.setenv(name, "")
+        monkeypatch.delenv(name)
+
+
+@pytest.fixture
+def supervised(monkeypatch):
+    """A worker started by uvicorn --workers N: no worker count in the environment"""
+    clear_env(monkeypatch, "APP_WORKERS", "WEB_CONCURRENCY", "APP_SUPERVISED", "LOAN_STORE", "EVENT_BROKER")
+    monkeypatch.setattr(broker, "_supervised", lambda: True)
+
+
+def test_supervised_worker_assumes_several(supervised):
+    assert broker.multi_worker() is True
+
+
+def test_app_workers_overrides_detection(supervised, monkeypatch):
+    monkeypatch.setenv("APP_WORKERS", "1")
+    assert broker.multi_worker() is False
+    monkeypatch.setenv("APP_WORKERS", "3")
+    assert broker.multi_worker() is True
+
+
+def test_unsupervised_process_is_single(monkeypatch):
+    clear_env(monkeypatch, "APP_WORKERS", "WEB_CONCURRENCY", "APP_SUPERVISED")
+    monkeypatch.setattr(broker, "_supervised", lambda: False)
+    assert broker.multi_worker() is False
+
+
+def test_supervised_worker_defaults_to_shared_stores(supervised, monkeypatch, tmp_path):
+    monkeypatch.setenv("LOAN_STORE_PATH", str(tmp_path / "loans.sqlite3"))
+    store = create_loan_store()
+    assert isinstance(store, SQLiteLoanStore)
+    store.close()
+    monkeypatch.setenv("EVENT_BROKER_PATH", str(tmp_path / "events.sqlite3"))
+    assert isinstance(broker.create_event_broker(), broker.SQLiteEventBroker)
+
+
+def test_per_process_backends_fail_loudly_with_several_workers(supervised, monkeypatch):
+    monkeypatch.setenv("LOAN_STORE", "memory")
+    with pytest.raises(RuntimeError):
+        create_loan_store()
+    monkeypatch.setenv("EVENT_BROKER", "local")
+    with pytest.raises(RuntimeError):
+        broker.create_event_broker()
+
+
+def test_chat_session_continues_on_another_worker(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first, second = SQLiteChatSessionStore(path), SQLiteChatSessionStore(path)
+
+    session = first.create()
+    session.record_turn("My name is Arjun Kumar", "Thanks, Arjun!", "fullName", "Arjun Kumar")
+    first.save(session)
+
+    resumed = second.get(session.session_id)
+    assert resumed is not None
+    assert resumed.collected_data == {"fullName": "Arjun Kumar"}
+    assert list(resumed.history)[0]["text"] == "My name is Arjun Kumar"
+
+    second.delete(session.session_id)
+    assert first.get(session.session_id) is None
+
+
+def test_chat_sessions_expire(tmp_path):
+    store = SQLiteChatSessionStore(str(tmp_path / "sessions.sqlite3"), ttl=-1)
+    assert store.get(store.create().session_id) is None
@@ -0,0 +1,171 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from backend.util.log import get_logger
+
+Deliver = Callable[[str, Dict[str, Any]], None]
+
+logger = get_logger("broker")
+
+
+# Set on first use so processes started from an API worker reach the same answer
+_SUPERVISED_ENV = "APP_SUPERVISED"
+
+
+def _supervised() -> bool:
+    """
+    True when this process was started by a server supervisor: a uvicorn worker
+    under --workers or --reload runs in a multiprocessing child, and gunicorn
+    forks its workers. Neither tells the worker how many siblings it has.
+    """
+    return "gunicorn" in sys.modules or ("uvicorn" in sys.modules and multiprocessing.parent_process() is not None)
+
+
+def multi_worker() -> bool:
+    """
+    True unless this API process is provably the only worker. APP_WORKERS (or
+    WEB_CONCURRENCY, which uvicorn and gunicorn read but never set) states the
+    count; without it a supervised worker is assumed to be one of several.
+    """
+    workers = os.getenv("APP_WORKERS") or os.getenv("WEB_CONCURRENCY")
+    if workers:
+        return int(workers) > 1
+    if os.getenv(_SUPERVISED_ENV) is None:
+        os.environ[_SUPERVISED_ENV] = "1" if _supervised() else "0"
+        if os.environ[_SUPERVISED_ENV] == "1":
+            logger.warning(
+                "Started by a server supervisor without APP_WORKERS; assuming several workers and sharing state through SQLite",
+                extra={"pid": os.getpid()},
+            )
+    return os.environ[_SUPERVISED_ENV] == "1"
+
+
+def require_shared(setting: str, backend: str) -> None:
+    """Refuse a per-process backend when several workers would each get their own copy"""
+    if multi_worker():
+        raise RuntimeError(
+            f"{setting}={backend} keeps state inside one process, but this server may run several workers; "
+            f"use the sqlite backend, or set APP_WORKERS=1 if there is only one worker"
+        )
+
+
+class EventBroker:
+    """
+    Carries loan events between API worker processes. publish() hands an event
+    to the other processes; start(deliver) begins feeding events published
+    elsewhere into this process via deliver(loan_id, event). The base class is
+    the single-process broker: there is nobody else to tell.
+    """
+
+    def publish(self, loan_id: str, event: Dict[str, Any]) -> None:
+        pass
+
+    def start(self, deliver: Deliver) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class SQLiteEventBroker(EventBroker):
+    """
+    Shared-file broker for several workers on one box. Events are appended to a
+    WAL-mode SQLite log; each process that has subscribers polls for rows newer
+    than the last one it saw and skips its own. Rows older than `retention`
+    seconds are pruned, so the log only holds recent history.
+    """
+
+    def __init__(self, path: str = "loan_events.sqlite3", poll_interval: float = 0.05, retention: float = 300.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.origin = uuid.uuid4().hex
+        self._local = threading.local()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS loan_events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, loan_id TEXT NOT NULL,"
+            " event TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def publish(self, loan_id, event):
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO loan_events (origin, loan_id, event, created_at) VALUES (?, ?, ?, ?)",
+            (self.origin, loan_id, json.dumps(event, default=str), time.time()),
+        )
+        conn.commit()
+
+    def start(self, deliver):
+        # Only processes with live subscribers need to poll; pipeline worker
+        # processes just publish
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._poll, args=(deliver,), name="event-broker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _poll(self, deliver: Deliver):
+        conn = self._conn()
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM loan_events").fetchone()[0]
+        last_prune = time.monotonic()
+
+        while not self._stopping.wait(self.poll_interval):
+            try:
+                rows = conn.execute(
+                    "SELECT id, origin, loan_id, event FROM loan_events WHERE id > ? ORDER BY id", (last_id,)
+                ).fetchall()
+                for row_id, origin, loan_id, event in rows:
+                    last_id = row_id
+                    if origin != self.origin:
+                        deliver(loan_id, json.loads(event))
+
+                if time.monotonic() - last_prune > self.retention:
+                    conn.execute("DELETE FROM loan_events WHERE created_at < ?", (time.time() - self.retention,))
+                    conn.commit()
+                    last_prune = time.monotonic()
+            except sqlite3.Error as e:
+                logger.warning("Event poll failed", extra={"error": str(e)})
+
+
+def create_event_broker() -> EventBroker:
+    """
+    EVENT_BROKER=local or sqlite (EVENT_BROKER_PATH); defaults to sqlite unless
+    this is provably the only worker (see multi_worker).
+    """
+    backend = os.getenv("EVENT_BROKER", "sqlite" if multi_worker() else "local").lower()
+    if backend == "sqlite":
+        return SQLiteEventBroker(
+            os.getenv("EVENT_BROKER_PATH", "loan_events.sqlite3"),
+            poll_interval=float(os.getenv("EVENT_BROKER_POLL_MS", "50")) / 1000.0,
+        )
+    if backend == "local":
+        require_shared("EVENT_BROKER", backend)
+        return EventBroker()
+    raise ValueError(f"Unknown EVENT_BROKER '{backend}'")
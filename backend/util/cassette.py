@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Dict, Optional, Tuple
+
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(KeyError):
+    """Replay found no recording for a request"""
+
+
+class Cassette:
+    """
+    Recorded LLM replies keyed by request hash (llm_cache.cache_key).
+    The file is a single SQLite table indexed on (key, seq) with zlib-compressed
+    reply text, so a cassette for thousands of calls stays small and a lookup
+    is one index probe.
+
+    A request recorded several times (temperature > 0 gives different replies)
+    keeps every reply; replay hands them out in recorded order and wraps
+    around. Re-recording a request in a new process replaces its old replies.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency: Optional[str] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}'")
+        if mode == "replay" and not os.path.exists(path):
+            raise FileNotFoundError(f"LLM cassette '{path}' does not exist; record one first")
+
+        self.path = path
+        self.mode = mode
+        # None: replay at full speed; "recorded": sleep the recorded latency; a number: sleep that long
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS recordings ("
+            " key TEXT NOT NULL, seq INTEGER NOT NULL, model TEXT NOT NULL, prompt_type TEXT NOT NULL,"
+            " reply BLOB NOT NULL, latency REAL NOT NULL, prompt_tokens INTEGER, completion_tokens INTEGER,"
+            " PRIMARY KEY (key, seq)) WITHOUT ROWID"
+        )
+        self._db.commit()
+
+        self._recorded_keys = set()
+        self._next_seq: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    def record(self, key: str, model: str, prompt_type: str, reply: str, latency: float, usage: dict = None):
+        usage = usage or {}
+        with self._lock:
+            if key not in self._recorded_keys:
+                self._db.execute("DELETE FROM recordings WHERE key = ?", (key,))
+                self._recorded_keys.add(key)
+                self._next_seq[key] = 0
+            seq = self._next_seq[key]
+            self._next_seq[key] = seq + 1
+            self._db.execute(
+                "INSERT INTO recordings VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, seq, model, prompt_type, zlib.compress(reply.encode("utf-8")), latency,
+                 usage.get("prompt_tokens"), usage.get("completion_tokens")),
+            )
+            self._db.commit()
+            self.recorded += 1
+
+    def replay(self, key: str) -> Tuple[str, float, dict]:
+        """(reply, delay to simulate, usage) for the next recording of key; raises CassetteMiss"""
+        with self._lock:
+            seq = self._next_seq.get(key, 0)
+            row = self._fetch(key, seq)
+            if row is None and seq:
+                # Every recording has been used once; start over from the first
+                seq = 0
+                row = self._fetch(key, seq)
+            if row is None:
+                self.misses += 1
+                raise CassetteMiss(key)
+            self._next_seq[key] = seq + 1
+            self.hits += 1
+
+        reply, recorded_latency, prompt_tokens, completion_tokens = row
+        if self.latency is None:
+            delay = 0.0
+        elif self.latency == "recorded":
+            delay = recorded_latency
+        else:
+            delay = float(self.latency)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        return zlib.decompress(reply).decode("utf-8"), delay, usage
+
+    def _fetch(self, key: str, seq: int):
+        return self._db.execute(
+            "SELECT reply, latency, prompt_tokens, completion_tokens FROM recordings WHERE key = ? AND seq = ?",
+            (key, seq),
+        ).fetchone()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*), COUNT(DISTINCT key) FROM recordings").fetchone()
+            return {
+                "mode": self.mode,
+                "path": self.path,
+                "recordings": entries[0],
+                "requests": entries[1],
+                "hits": self.hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_cassette = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """
+    The shared Cassette, or None when LLM_CASSETTE is off (the default).
+    LLM_CASSETTE=record|replay, LLM_CASSETTE_PATH picks the file, and
+    LLM_CASSETTE_LATENCY=recorded or a number of seconds simulates latency on replay.
+    """
+    global _cassette, _cassette_loaded
+    if not _cassette_loaded:
+        with _cassette_lock:
+            if not _cassette_loaded:
+                mode = os.getenv("LLM_CASSETTE", "off").lower()
+                if mode not in CASSETTE_MODES:
+                    raise ValueError(f"LLM_CASSETTE must be one of {list(CASSETTE_MODES)}")
+                if mode != "off":
+                    _cassette = Cassette(
+                        os.getenv("LLM_CASSETTE_PATH", "llm_cassette.sqlite3"),
+                        mode,
+                        latency=os.getenv("LLM_CASSETTE_LATENCY") or None,
+                    )
+                _cassette_loaded = True
+    return _cassette
@@ -0,0 +1,179 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from backend.util.broker import multi_worker, require_shared
+
+
+class ChatSession:
+    """Server-held state for one chatbot conversation"""
+
+    __slots__ = ("session_id", "history", "collected_data", "last_seen")
+
+    def __init__(self, session_id: str, max_history: int, history=None, collected_data=None):
+        self.session_id = session_id
+        self.history = deque(history or [], maxlen=max_history)
+        self.collected_data = dict(collected_data or {})
+        self.last_seen = time.monotonic()
+
+    def record_turn(self, user_text: str, bot_text: str, collected_field=None, collected_value=None):
+        self.history.append({"sender": "user", "text": user_text})
+        self.history.append({"sender": "bot", "text": bot_text})
+        if collected_field and collected_value:
+            self.collected_data[collected_field] = collected_value
+
+
+class ChatSessionStore:
+    """
+    In-memory session store with LRU eviction once max_sessions is reached
+    and idle expiry after ttl seconds.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl: float = 3600.0, max_history: int = 20):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_history = max_history
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, history=None, collected_data=None) -> ChatSession:
+        session = ChatSession(str(uuid.uuid4()), self.max_history, history, collected_data)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._evict()
+        return session
+
+    def get(self, session_id: str):
+        """Return the live session or None if unknown or expired"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.monotonic() - session.last_seen > self.ttl:
+                del self._sessions[session_id]
+                return None
+            session.last_seen = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session: ChatSession):
+        """Persist a session after a turn; the in-memory session object already is the state"""
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict(self):
+        # Oldest-touched sessions sit at the front
+        now = time.monotonic()
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) > self.max_sessions or now - oldest.last_seen > self.ttl:
+                self._sessions.popitem(last=False)
+            else:
+                break
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteChatSessionStore(ChatSessionStore):
+    """
+    Sessions in a shared SQLite file (WAL mode), so a conversation started on
+    one uvicorn worker continues on whichever worker gets the next turn.
+    Idle expiry uses wall-clock time, since workers don't share a monotonic clock.
+    """
+
+    def __init__(self, path: str = "chat_sessions.sqlite3", max_sessions: int = 10000, ttl: float = 3600.0, max_history: int = 20):
+        super().__init__(max_sessions=max_sessions, ttl=ttl, max_history=max_history)
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            " session_id TEXT PRIMARY KEY, history TEXT NOT NULL, collected_data TEXT NOT NULL, last_seen REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_last_seen ON chat_sessions (last_seen)")
+        self._db.commit()
+
+    def create(self, history=None, collected_data=None) -> ChatSession:
+        session = ChatSession(str(uuid.uuid4()), self.max_history, history, collected_data)
+        with self._lock:
+            self._write(session)
+            self._evict()
+            self._db.commit()
+        return session
+
+    def get(self, session_id: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT history, collected_data FROM chat_sessions WHERE session_id = ? AND last_seen >= ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE chat_sessions SET last_seen = ? WHERE session_id = ?", (time.time(), session_id))
+            self._db.commit()
+        return ChatSession(session_id, self.max_history, json.loads(row[0]), json.loads(row[1]))
+
+    def save(self, session: ChatSession):
+        with self._lock:
+            self._write(session)
+            self._db.commit()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    def _write(self, session: ChatSession):
+        self._db.execute(
+            "INSERT OR REPLACE INTO chat_sessions VALUES (?, ?, ?, ?)",
+            (session.session_id, json.dumps(list(session.history)), json.dumps(session.collected_data), time.time()),
+        )
+
+    def _evict(self):
+        self._db.execute("DELETE FROM chat_sessions WHERE last_seen < ?", (time.time() - self.ttl,))
+        self._db.execute(
+            "DELETE FROM chat_sessions WHERE session_id IN"
+            " (SELECT session_id FROM chat_sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_chat_session_store() -> ChatSessionStore:
+    """
+    Return the shared ChatSessionStore, configured from the environment on first use.
+    CHATBOT_SESSION_STORE=memory or sqlite (CHATBOT_SESSION_PATH); defaults to
+    sqlite unless this is provably the only worker.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                settings = dict(
+                    max_sessions=int(os.getenv("CHATBOT_MAX_SESSIONS", "10000")),
+                    ttl=float(os.getenv("CHATBOT_SESSION_TTL", "3600")),
+                    max_history=int(os.getenv("CHATBOT_MAX_HISTORY", "20")),
+                )
+                backend = os.getenv("CHATBOT_SESSION_STORE", "sqlite" if multi_worker() else "memory").lower()
+                if backend == "sqlite":
+                    _store = SQLiteChatSessionStore(os.getenv("CHATBOT_SESSION_PATH", "chat_sessions.sqlite3"), **settings)
+                elif backend == "memory":
+                    require_shared("CHATBOT_SESSION_STORE", backend)
+                    _store = ChatSessionStore(**settings)
+                else:
+                    raise ValueError(f"Unknown CHATBOT_SESSION_STORE '{backend}'")
+    return _store
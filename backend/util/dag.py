@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class Stage:
+    """
+    One node of a pipeline graph.
+
+    fn(results, cancelled) runs once every stage in deps has settled; results maps
+    each finished stage name to its return value (None for skipped/cancelled
+    stages) and cancelled is a threading.Event a long-running stage may poll.
+
+    guard(results) decides at dispatch time whether the stage runs at all.
+    invalidated_by maps another stage's name to a predicate on its result; if
+    that stage finishes with a result the predicate accepts, this stage is
+    cancelled (or its result discarded if it already ran). That is what makes
+    speculative stages safe to start early.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Dict[str, Any], threading.Event], Any],
+        deps: Iterable[str] = (),
+        guard: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        invalidated_by: Optional[Dict[str, Callable[[Any], bool]]] = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.guard = guard
+        self.invalidated_by = invalidated_by or {}
+
+
+class StageRun:
+    """Outcome of one stage: state is finished, skipped, cancelled or failed"""
+
+    __slots__ = ("name", "state", "result", "error", "started_at", "finished_at")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = "pending"
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+
+def _validate(stages: Dict[str, Stage]):
+    for stage in stages.values():
+        for dep in list(stage.deps) + list(stage.invalidated_by):
+            if dep not in stages:
+                raise ValueError(f"Stage '{stage.name}' refers to unknown stage '{dep}'")
+
+    # Kahn's algorithm, just to reject cycles up front
+    indegree = {name: len(stage.deps) for name, stage in stages.items()}
+    ready = [name for name, count in indegree.items() if count == 0]
+    seen = 0
+    while ready:
+        name = ready.pop()
+        seen += 1
+        for other in stages.values():
+            if name in other.deps:
+                indegree[other.name] -= 1
+                if indegree[other.name] == 0:
+                    ready.append(other.name)
+    if seen != len(stages):
+        raise ValueError("Pipeline graph has a cycle")
+
+
+def run_graph(
+    stages: Iterable[Stage],
+    executor: ThreadPoolExecutor,
+    on_start: Optional[Callable[[StageRun], None]] = None,
+    on_end: Optional[Callable[[StageRun], None]] = None,
+    completed: Optional[Dict[str, Any]] = None,
+) -> Dict[str, StageRun]:
+    """
+    Run every stage as soon as its dependencies settle, in parallel on executor.
+    completed pre-seeds results for stages that already ran (they are not re-run).
+    Returns a StageRun per stage. Stage exceptions are re-raised after in-flight
+    stages drain.
+    """
+    stages = {stage.name: stage for stage in stages}
+    _validate(stages)
+
+    runs = {name: StageRun(name) for name in stages}
+    results: Dict[str, Any] = {}
+    cancel_events = {name: threading.Event() for name in stages}
+    running = {}
+
+    for name, result in (completed or {}).items():
+        if name in runs:
+            runs[name].state = "finished"
+            runs[name].result = result
+            results[name] = result
+
+    def settled(name):
+        return runs[name].state in ("finished", "skipped", "cancelled", "failed")
+
+    def skip(name, state="skipped"):
+        runs[name].state = state
+        results[name] = None
+        if on_end:
+            on_end(runs[name])
+
+    def apply_invalidations(finished_name):
+        result = runs[finished_name].result
+        for stage in stages.values():
+            predicate = stage.invalidated_by.get(finished_name)
+            if predicate is None or not predicate(result):
+                continue
+            run = runs[stage.name]
+            if run.state in ("pending", "running", "finished"):
+                cancel_events[stage.name].set()
+                future = running.pop(stage.name, None)
+                if future is not None:
+                    future.cancel()
+                skip(stage.name, "cancelled")
+
+    # A pre-seeded result can still invalidate later speculative stages
+    for name in list(results):
+        apply_invalidations(name)
+
+    error = None
+    while True:
+        if error is None:
+            for name, stage in stages.items():
+                run = runs[name]
+                if run.state != "pending" or not all(settled(dep) for dep in stage.deps):
+                    continue
+                if stage.guard is not None and not stage.guard(results):
+                    skip(name)
+                    continue
+
+                run.state = "running"
+                run.started_at = time.time()
+                if on_start:
+                    on_start(run)
+                view = {dep: results.get(dep) for dep in stage.deps}
+                running[name] = executor.submit(stage.fn, view, cancel_events[name])
+
+        if not running:
+            break
+
+        done, _ = wait(list(running.values()), return_when=FIRST_COMPLETED)
+        for name, future in list(running.items()):
+            if future not in done:
+                continue
+            del running[name]
+            run = runs[name]
+            run.finished_at = time.time()
+            try:
+                run.result = future.result()
+                run.state = "finished"
+                results[name] = run.result
+            except Exception as e:
+                run.state = "failed"
+                run.error = e
+                results[name] = None
+                error = error or e
+            if on_end:
+                on_end(run)
+            if run.state == "finished":
+                apply_invalidations(name)
+
+    if error is not None:
+        raise error
+    return runs
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_stage_executor() -> ThreadPoolExecutor:
+    """Shared thread pool for pipeline stages (PIPELINE_STAGE_WORKERS, default 16)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("PIPELINE_STAGE_WORKERS", "16")),
+                    thread_name_prefix="pipeline-stage",
+                )
+    return _executor
@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+UPLOAD_DIR = os.getenv("KYC_UPLOAD_DIR", "uploads")
+
+DOCUMENT_ID_PATTERN = re.compile(r"^[0-9a-f-]{36}$")
+ALLOWED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".txt"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tif", ".tiff"}
+
+
+def save_document(filename: str, content: bytes) -> str:
+    """Store an uploaded KYC document and return its document_id"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"Unsupported document type '{ext or filename}'")
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    document_id = str(uuid.uuid4())
+    with open(os.path.join(UPLOAD_DIR, document_id + ext), "wb") as f:
+        f.write(content)
+    # The stored file is named by id; keep the uploaded name for the KYC timeline
+    with open(os.path.join(UPLOAD_DIR, document_id + ".name"), "w", encoding="utf-8") as f:
+        f.write(os.path.basename(filename))
+    return document_id
+
+
+def document_path(document_id: str) -> Optional[str]:
+    """Resolve a document_id to its stored file, or None"""
+    if not document_id or not DOCUMENT_ID_PATTERN.match(document_id):
+        return None
+    for ext in ALLOWED_EXTENSIONS:
+        path = os.path.join(UPLOAD_DIR, document_id + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def document_filename(document_id: str) -> Optional[str]:
+    """The name a document was uploaded under, or None"""
+    if not document_path(document_id):
+        return None
+    try:
+        with open(os.path.join(UPLOAD_DIR, document_id + ".name"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _ocr_images(images) -> str:
+    import pytesseract
+    return "\n".join(pytesseract.image_to_string(image) for image in images)
+
+
+def extract_text(path: str) -> dict:
+    """
+    Pull text out of a document. Runs inside a worker process.
+    PDFs use their text layer (pypdf) and fall back to OCR for scanned pages when
+    pdf2image + pytesseract are installed; images need pytesseract + Pillow.
+    Returns {"text", "method", "pages"}; method is "unsupported" when no
+    extractor is available for the file.
+    """
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == ".txt":
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            return {"text": f.read(), "method": "plain_text", "pages": 1}
+
+    if ext == ".pdf":
+        text, pages = "", 0
+        try:
+            from pypdf import PdfReader
+            reader = PdfReader(path)
+            pages = len(reader.pages)
+            text = "\n".join(page.extract_text() or "" for page in reader.pages)
+        except ImportError:
+            pass
+        if text.strip():
+            return {"text": text, "method": "pdf_text_layer", "pages": pages}
+        try:
+            from pdf2image import convert_from_path
+            images = convert_from_path(path)
+            return {"text": _ocr_images(images), "method": "pdf_ocr", "pages": len(images)}
+        except ImportError:
+            return {"text": "", "method": "unsupported", "pages": pages}
+
+    if ext in IMAGE_EXTENSIONS:
+        try:
+            from PIL import Image
+            with Image.open(path) as image:
+                return {"text": _ocr_images([image]), "method": "image_ocr", "pages": 1}
+        except ImportError:
+            return {"text": "", "method": "unsupported", "pages": 1}
+
+    return {"text": "", "method": "unsupported", "pages": 0}
+
+
+def normalize_text(text: str) -> str:
+    """Uppercase and strip everything but letters/digits, for tolerant matching against OCR output"""
+    return re.sub(r"[^A-Z0-9]", "", (text or "").upper())
+
+
+def name_matches(name: str, text: str) -> bool:
+    """True when every part of the applicant's name appears in the document text"""
+    words = re.findall(r"[A-Z]+", (text or "").upper())
+    parts = [part for part in re.findall(r"[A-Z]+", (name or "").upper()) if len(part) > 1]
+    return bool(parts) and all(part in words for part in parts)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_document_pool() -> ProcessPoolExecutor:
+    """
+    Shared process pool for text extraction (KYC_WORKERS, default one per core).
+    Workers are spawned, not forked: the pool is created lazily from a pipeline
+    thread while the log listener, queue workers and event loop are running,
+    and a forked child could inherit one of their locks held.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = int(os.getenv("KYC_WORKERS", "0")) or os.cpu_count() or 2
+                _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from backend.util.broker import EventBroker, create_event_broker
+from backend.util.log import get_logger
+
+logger = get_logger("events")
+
+# Channel that receives every loan's events (manager dashboard)
+MANAGER_CHANNEL = "manager"
+
+# Event types that only matter in their latest form; a newer one replaces a queued one
+COALESCED_TYPES = {"loan_updated", "status"}
+
+
+class Subscription:
+    """
+    One connection's view of a channel. Events are pushed from any thread into a
+    bounded buffer; next_batch() hands them to the connection's asyncio sender.
+    Queued status/loan_updated events for the same loan collapse into the latest,
+    and once max_pending is reached the oldest events are dropped (and counted)
+    so a slow client can't grow server memory.
+    """
+
+    def __init__(self, channel: str, loop: asyncio.AbstractEventLoop, max_pending: int = 100):
+        self.channel = channel
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._loop = loop
+        self._ready = asyncio.Event()
+        self._pending: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def push(self, event: Dict[str, Any]) -> None:
+        if event["type"] in COALESCED_TYPES:
+            key = (event["type"], event.get("loan_id"))
+        else:
+            key = next(self._seq)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._pending[key] = event
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # loop already closed; the connection is gone
+
+    async def next_batch(self, window: float = 0.0) -> List[Dict[str, Any]]:
+        """Wait for events, give a burst `window` seconds to settle, then drain everything queued"""
+        await self._ready.wait()
+        if window:
+            await asyncio.sleep(window)
+        with self._lock:
+            self._ready.clear()
+            events = list(self._pending.values())
+            self._pending.clear()
+        return events
+
+
+class EventBus:
+    """
+    Pub/sub for loan progress. publish() is safe to call from pipeline worker
+    threads; every event goes to the loan's own channel and MANAGER_CHANNEL, and
+    through the broker to subscribers in other worker processes.
+    """
+
+    def __init__(self, max_pending: int = 100, coalesce_window: float = 0.05, broker: Optional[EventBroker] = None):
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+        self.broker = broker or EventBroker()
+        self._channels: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, channel: str) -> Subscription:
+        """Must be called from the event loop that will consume the subscription"""
+        subscription = Subscription(channel, asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        self.broker.start(self.deliver)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def publish(self, loan_id: str, event: Dict[str, Any]) -> None:
+        event = dict(event, loan_id=loan_id)
+        self.deliver(loan_id, event)
+        try:
+            self.broker.publish(loan_id, event)
+        except Exception as e:
+            logger.warning("Broker publish failed", extra={"loan_id": loan_id, "error": str(e)})
+
+    def deliver(self, loan_id: str, event: Dict[str, Any]) -> None:
+        """Hand an event to this process's subscribers only"""
+        with self._lock:
+            self.published += 1
+            targets = list(self._channels.get(loan_id, ())) + list(self._channels.get(MANAGER_CHANNEL, ()))
+        for subscription in targets:
+            subscription.push(event)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "channels": len(self._channels),
+                "subscribers": sum(len(subscribers) for subscribers in self._channels.values()),
+                "published": self.published,
+                "broker": type(self.broker).__name__,
+            }
+
+
+class QueueBroker(EventBroker):
+    """Broker of a pipeline worker process: events go onto a multiprocessing queue the parent relays"""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def publish(self, loan_id, event):
+        self.queue.put((loan_id, event))
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """Process-wide bus (EVENT_QUEUE_SIZE per connection, EVENT_COALESCE_MS burst window, EVENT_BROKER)"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = EventBus(
+                    max_pending=int(os.getenv("EVENT_QUEUE_SIZE", "100")),
+                    coalesce_window=float(os.getenv("EVENT_COALESCE_MS", "50")) / 1000.0,
+                    broker=create_event_broker(),
+                )
+    return _bus
+
+
+def forward_events(queue) -> None:
+    """In a worker process: send every event published here to the parent through queue"""
+    global _bus
+    with _bus_lock:
+        _bus = EventBus(broker=QueueBroker(queue))
+
+
+def relay_events(queue) -> threading.Thread:
+    """In the parent: publish events forwarded by worker processes until None is read from queue"""
+
+    def run():
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            loan_id, event = item
+            get_event_bus().publish(loan_id, event)
+
+    thread = threading.Thread(target=run, name="event-relay", daemon=True)
+    thread.start()
+    return thread
+
+
+def publish_event(loan: Dict[str, Any], event_type: str, **fields) -> None:
+    """Publish an event about a loan record; records without a loan_id are skipped"""
+    loan_id: Optional[str] = loan.get("loan_id")
+    if loan_id:
+        # Copy nested dicts (timeline entries) so later in-place edits don't race the sender
+        fields = {key: dict(value) if isinstance(value, dict) else value for key, value in fields.items()}
+        get_event_bus().publish(loan_id, dict(fields, type=event_type))
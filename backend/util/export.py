@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+# Columns exported when the caller doesn't pick any; dotted paths reach into the record
+DEFAULT_FIELDS = [
+    "loan_id",
+    "status",
+    "submitted_at",
+    "data.name",
+    "data.amount",
+    "data.income",
+    "data.purpose",
+    "explanation",
+]
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def parse_fields(fields: str) -> List[str]:
+    """Comma-separated field list from the query string, or the defaults"""
+    parsed = [field.strip() for field in (fields or "").split(",") if field.strip()]
+    return parsed or list(DEFAULT_FIELDS)
+
+
+def project(loan_id: str, record: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Pick the requested fields out of a loan record; missing paths come back as None"""
+    row = {}
+    for field in fields:
+        if field == "loan_id":
+            row[field] = loan_id
+        elif field == "submitted_at":
+            timeline = record.get("timeline") or []
+            row[field] = timeline[0]["time"] if timeline else ""
+        else:
+            value = record
+            for part in field.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            row[field] = value
+    return row
+
+
+def ndjson_rows(rows: Iterable[Tuple[str, Dict[str, Any], str]], fields: List[str]) -> Iterator[str]:
+    """One JSON object per line; each carries the cursor to resume after it"""
+    for loan_id, record, cursor in rows:
+        row = project(loan_id, record, fields)
+        row["cursor"] = cursor
+        yield json.dumps(row, default=str) + "\n"
+
+
+def csv_rows(rows: Iterable[Tuple[str, Dict[str, Any], str]], fields: List[str]) -> Iterator[str]:
+    """Header line then one CSV line per loan; nested values are JSON-encoded"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(fields + ["cursor"])
+    yield flush()
+    for loan_id, record, cursor in rows:
+        row = project(loan_id, record, fields)
+        writer.writerow([
+            json.dumps(value) if isinstance(value, (dict, list)) else ("" if value is None else value)
+            for value in row.values()
+        ] + [cursor])
+        yield flush()
@@ -0,0 +1,264 @@
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from backend.util.events import forward_events, relay_events
+from backend.util.log import get_logger
+
+# Lower rank is served first
+PRIORITY_LANES = {"high": 0, "normal": 1, "low": 2}
+
+logger = get_logger("queue")
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) would send CTRL_C_EVENT on Windows
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class QueueFullError(Exception):
+    """Raised by submit() when the queue is at max_depth"""
+
+
+def _save_payload(conn: sqlite3.Connection, job_id: str, payload: Dict[str, Any]) -> None:
+    conn.execute("UPDATE pipeline_jobs SET payload = ? WHERE job_id = ?", (json.dumps(payload), job_id))
+    conn.commit()
+
+
+def _run_in_process(handler, db_path: Optional[str], job_id: str, payload: Dict[str, Any]):
+    """Process-mode entry point: the checkpoint callback writes to the queue file itself"""
+
+    def checkpoint(new_payload):
+        if db_path:
+            conn = sqlite3.connect(db_path, timeout=30)
+            try:
+                _save_payload(conn, job_id, new_payload)
+            finally:
+                conn.close()
+
+    return handler(job_id, payload, checkpoint)
+
+
+class PipelineJobQueue:
+    """
+    Bounded, prioritised job queue with its own worker pool.
+
+    Jobs are (job_id, payload dict) pairs served highest lane first, FIFO within
+    a lane. In "thread" mode handler(job_id, payload, checkpoint) runs on one of
+    the queue's worker threads. In "process" mode it runs in a spawned process
+    (handler must be a picklable module-level function) and its return value is
+    passed to on_result(job_id, result) back in this process. Events the handler
+    publishes in the worker process are relayed to this process's event bus as
+    they happen, so WebSocket subscribers follow process-mode jobs too.
+
+    With db_path set, queued jobs are written to SQLite before submit() returns
+    and removed once they finish, so start() after a restart picks up anything
+    that was queued or mid-run when the process died. checkpoint(payload)
+    replaces the stored payload, so a recovered job resumes from the handler's
+    last checkpoint rather than from the original submission. Each job row
+    records the pid that owns it; when several API workers share the file,
+    start() only claims jobs whose owner is no longer running.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, Dict[str, Any]], Any],
+        workers: int = 4,
+        mode: str = "thread",
+        max_depth: int = 1000,
+        db_path: Optional[str] = None,
+        on_result: Optional[Callable[[str, Any], None]] = None,
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown worker mode '{mode}'")
+
+        self.handler = handler
+        self.workers = workers
+        self.mode = mode
+        self.max_depth = max_depth
+        self.on_result = on_result
+
+        self._heap = []
+        self._active = set()  # job ids queued or running
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = 0
+        self._threads = []
+        self._stopping = False
+        self._processes = None
+        self._events = None
+
+        self.db_path = db_path
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pipeline_jobs ("
+                " job_id TEXT PRIMARY KEY, lane INTEGER NOT NULL, seq INTEGER NOT NULL, payload TEXT NOT NULL,"
+                " owner INTEGER)"
+            )
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(pipeline_jobs)")]
+            if "owner" not in columns:
+                self._db.execute("ALTER TABLE pipeline_jobs ADD COLUMN owner INTEGER")
+            self._db.commit()
+
+    def start(self):
+        """Reload persisted jobs and start the workers"""
+        if self.mode == "process":
+            # Spawn, not fork: this process already has threads, SQLite connections
+            # and the logging listener, which a forked child would inherit mid-use
+            context = multiprocessing.get_context("spawn")
+            self._events = context.Queue()
+            relay_events(self._events)
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=forward_events,
+                initargs=(self._events,),
+            )
+
+        if self._db is not None:
+            with self._db_lock:
+                rows = self._claim_orphaned_jobs()
+            with self._cond:
+                for job_id, lane, payload in rows:
+                    heapq.heappush(self._heap, (lane, next(self._seq), job_id, json.loads(payload)))
+                    self._active.add(job_id)
+            if rows:
+                logger.info("Recovered pipeline jobs", extra={"jobs": len(rows)})
+
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"pipeline-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, wait: bool = True):
+        """Stop taking jobs; queued jobs stay persisted for the next start()"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait)
+        if self._events is not None:
+            self._events.put(None)
+
+    def submit(self, job_id: str, payload: Dict[str, Any], priority: str = "normal") -> int:
+        """Queue a job and return its position in the queue. Raises QueueFullError when full."""
+        if priority not in PRIORITY_LANES:
+            raise ValueError(f"Unknown priority '{priority}'")
+        lane = PRIORITY_LANES[priority]
+
+        with self._cond:
+            if len(self._heap) >= self.max_depth:
+                raise QueueFullError(f"Pipeline queue is full ({self.max_depth} jobs)")
+            seq = next(self._seq)
+            if self._db is not None:
+                with self._db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO pipeline_jobs (job_id, lane, seq, payload, owner) VALUES (?, ?, ?, ?, ?)",
+                        (job_id, lane, seq, json.dumps(payload), os.getpid()),
+                    )
+                    self._db.commit()
+            heapq.heappush(self._heap, (lane, seq, job_id, payload))
+            self._active.add(job_id)
+            self._cond.notify()
+            return sum(1 for entry in self._heap if entry[0] <= lane)
+
+    def checkpoint(self, job_id: str, payload: Dict[str, Any]) -> None:
+        """Replace a persisted job's payload; a no-op without db_path"""
+        if self._db is not None:
+            with self._db_lock:
+                _save_payload(self._db, job_id, payload)
+
+    def _claim_orphaned_jobs(self) -> list:
+        """Take over persisted jobs whose owning process is gone; returns (job_id, lane, payload) rows"""
+        me = os.getpid()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            owners = [owner for (owner,) in self._db.execute("SELECT DISTINCT owner FROM pipeline_jobs")]
+            # Our own pid here can only be left over from an earlier process that had it
+            orphaned = [owner for owner in owners if owner is None or owner == me or not _process_alive(owner)]
+            for owner in orphaned:
+                self._db.execute("UPDATE pipeline_jobs SET owner = ? WHERE owner IS ?", (me, owner))
+            rows = self._db.execute(
+                "SELECT job_id, lane, payload FROM pipeline_jobs WHERE owner = ? ORDER BY lane, seq", (me,)
+            ).fetchall()
+        except Exception:
+            self._db.rollback()
+            raise
+        self._db.commit()
+        return rows
+
+    def has_job(self, job_id: str) -> bool:
+        """True while job_id is queued or running on this queue"""
+        with self._cond:
+            return job_id in self._active
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queued": len(self._heap),
+                "running": self._running,
+                "max_depth": self.max_depth,
+                "workers": self.workers,
+                "mode": self.mode,
+            }
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                _, _, job_id, payload = heapq.heappop(self._heap)
+                self._running += 1
+
+            try:
+                if self._processes is not None:
+                    result = self._processes.submit(_run_in_process, self.handler, self.db_path, job_id, payload).result()
+                else:
+                    result = self.handler(job_id, payload, lambda new_payload: self.checkpoint(job_id, new_payload))
+                if self.on_result:
+                    self.on_result(job_id, result)
+            except Exception:
+                logger.exception("Pipeline job failed", extra={"job_id": job_id})
+            finally:
+                self._finish(job_id)
+
+    def _finish(self, job_id: str):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM pipeline_jobs WHERE job_id = ?", (job_id,))
+                self._db.commit()
+        with self._cond:
+            self._running -= 1
+            self._active.discard(job_id)
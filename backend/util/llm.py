@@ -1,43 +1,435 @@
+import asyncio
+import json
 import os
+import random
+import threading
+import time
+
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+from .cassette import Cassette, CassetteMiss, get_cassette
+from .llm_cache import cache_key, get_response_cache
+from .log import get_logger
+from .metrics import LLM_LATENCY, LLM_RESPONSES, LLM_TOKENS
+
 load_dotenv()
 
-def chat_with_grok(messages, model="google/gemini-2.5-flash"):
-    """Chat with Grok model via OpenRouter using requests"""
-    
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": model,
-        "messages": messages,
-        "temperature": 0.7,
-        "max_tokens": 1000
+logger = get_logger("llm")
+
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+DEFAULT_TEMPERATURE = 0.7
+
+# What the chat_with_grok helpers return instead of raising when the call fails
+FALLBACK_REPLY = "I'm having trouble connecting right now. Please try again."
+
+# Transient upstream failures worth retrying
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class _BaseLLMClient:
+    """Request building, retry policy and response parsing shared by the sync and async clients"""
+
+    def __init__(self, url, api_key, max_retries, backoff_base, backoff_max, cassette=None):
+        self.url = url
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Record/replay tape; None talks to OpenRouter as usual
+        self.cassette = cassette
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key or os.getenv('OPENROUTER_API_KEY')}",
+            "Content-Type": "application/json",
+        }
+
+    def _payload(self, messages, model, temperature, max_tokens) -> dict:
+        return {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _should_retry(self, status_code: int, attempt: int) -> bool:
+        return status_code in RETRY_STATUS_CODES and attempt < self.max_retries
+
+    @staticmethod
+    def _reply_text(result: dict) -> str:
+        return result["choices"][0]["message"]["content"]
+
+    @property
+    def replaying(self) -> bool:
+        return self.cassette is not None and self.cassette.mode == "replay"
+
+    def _replay(self, model, messages, temperature, prompt_type, started):
+        """(reply, delay, usage) from the cassette instead of the network"""
+        try:
+            return self.cassette.replay(cache_key(model, messages, temperature))
+        except CassetteMiss:
+            self._record(model, prompt_type, started, "cassette_miss")
+            raise
+
+    def _tape(self, model, messages, temperature, prompt_type, started, reply, usage=None):
+        """Save a successful reply when recording"""
+        if self.cassette is not None and self.cassette.mode == "record":
+            key = cache_key(model, messages, temperature)
+            self.cassette.record(key, model, prompt_type, reply, time.perf_counter() - started, usage)
+
+    @staticmethod
+    def _record(model: str, prompt_type: str, started: float, status, usage: dict = None):
+        """Latency, status code and token usage for one logical call (retries included)"""
+        LLM_LATENCY.labels(model, prompt_type).observe(time.perf_counter() - started)
+        LLM_RESPONSES.labels(model, status).inc()
+        if usage:
+            LLM_TOKENS.labels(model, prompt_type, "prompt").inc(usage.get("prompt_tokens") or 0)
+            LLM_TOKENS.labels(model, prompt_type, "completion").inc(usage.get("completion_tokens") or 0)
+
+
+class LLMClient(_BaseLLMClient):
+    """
+    Process-wide OpenRouter client.
+    Keeps a pooled keep-alive requests.Session so every call after the first
+    reuses an open TLS connection, applies connect/read timeouts and retries
+    transient failures with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        url: str = OPENROUTER_URL,
+        api_key: str = None,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        pool_size: int = 20,
+        cassette: Cassette = None,
+    ):
+        super().__init__(url, api_key, max_retries, backoff_base, backoff_max, cassette)
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def chat(
+        self,
+        messages,
+        model="google/gemini-2.5-flash",
+        temperature=DEFAULT_TEMPERATURE,
+        max_tokens=1000,
+        prompt_type="other",
+    ) -> str:
+        """Send a chat completion and return the reply text. Raises on failure."""
+        data = self._payload(messages, model, temperature, max_tokens)
+
+        logger.debug("LLM request", extra={"model": model, "prompt": prompt_type, "messages": len(messages)})
+
+        started = time.perf_counter()
+        if self.replaying:
+            reply, delay, usage = self._replay(model, messages, temperature, prompt_type, started)
+            if delay:
+                time.sleep(delay)
+            self._record(model, prompt_type, started, "replay", usage)
+            return reply
+
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.url, headers=self._headers(), json=data, timeout=self.timeout)
+                if self._should_retry(response.status_code, attempt):
+                    logger.warning("LLM call retrying", extra={"model": model, "status": response.status_code, "attempt": attempt})
+                    LLM_RESPONSES.labels(model, response.status_code).inc()
+                else:
+                    if not response.ok:
+                        self._record(model, prompt_type, started, response.status_code)
+                    response.raise_for_status()
+                    result = response.json()
+                    self._record(model, prompt_type, started, response.status_code, result.get("usage"))
+                    reply = self._reply_text(result)
+                    self._tape(model, messages, temperature, prompt_type, started, reply, result.get("usage"))
+                    return reply
+            # Only failures to connect are retried (ConnectTimeout is a ConnectionError).
+            # A read timeout means the request was sent, and a retry would pay for it twice.
+            except requests.ConnectionError as e:
+                if attempt >= self.max_retries:
+                    self._record(model, prompt_type, started, "error")
+                    raise
+                logger.warning("LLM call retrying", extra={"model": model, "error": e.__class__.__name__, "attempt": attempt})
+            except requests.Timeout:
+                self._record(model, prompt_type, started, "timeout")
+                raise
+
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncLLMClient(_BaseLLMClient):
+    """
+    asyncio counterpart of LLMClient for use inside FastAPI async endpoints.
+    Awaiting chat() never blocks the event loop, and cancelling the awaiting
+    task aborts the in-flight request. Connections are pooled by httpx.
+    """
+
+    def __init__(
+        self,
+        url: str = OPENROUTER_URL,
+        api_key: str = None,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        pool_size: int = 20,
+        cassette: Cassette = None,
+    ):
+        super().__init__(url, api_key, max_retries, backoff_base, backoff_max, cassette)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def chat(
+        self,
+        messages,
+        model="google/gemini-2.5-flash",
+        temperature=DEFAULT_TEMPERATURE,
+        max_tokens=1000,
+        prompt_type="other",
+    ) -> str:
+        """Send a chat completion and return the reply text. Raises on failure."""
+        data = self._payload(messages, model, temperature, max_tokens)
+
+        started = time.perf_counter()
+        if self.replaying:
+            reply, delay, usage = self._replay(model, messages, temperature, prompt_type, started)
+            if delay:
+                await asyncio.sleep(delay)
+            self._record(model, prompt_type, started, "replay", usage)
+            return reply
+
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.post(self.url, headers=self._headers(), json=data)
+                if self._should_retry(response.status_code, attempt):
+                    logger.warning("LLM call retrying", extra={"model": model, "status": response.status_code, "attempt": attempt})
+                    LLM_RESPONSES.labels(model, response.status_code).inc()
+                else:
+                    if response.is_error:
+                        self._record(model, prompt_type, started, response.status_code)
+                    response.raise_for_status()
+                    result = response.json()
+                    self._record(model, prompt_type, started, response.status_code, result.get("usage"))
+                    reply = self._reply_text(result)
+                    self._tape(model, messages, temperature, prompt_type, started, reply, result.get("usage"))
+                    return reply
+            # As in LLMClient, a read timeout is not retried; the request was already sent
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if attempt >= self.max_retries:
+                    self._record(model, prompt_type, started, "error")
+                    raise
+                logger.warning("LLM call retrying", extra={"model": model, "error": e.__class__.__name__, "attempt": attempt})
+            except httpx.TimeoutException:
+                self._record(model, prompt_type, started, "timeout")
+                raise
+
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def stream_chat(
+        self,
+        messages,
+        model="google/gemini-2.5-flash",
+        temperature=DEFAULT_TEMPERATURE,
+        max_tokens=1000,
+        prompt_type="other",
+    ):
+        """
+        Yield reply text deltas as OpenRouter streams them (server-sent events).
+        Only the connection attempt is retried; once tokens flow, errors propagate.
+        """
+        data = self._payload(messages, model, temperature, max_tokens)
+        data["stream"] = True
+
+        started = time.perf_counter()
+        if self.replaying:
+            reply, delay, usage = self._replay(model, messages, temperature, prompt_type, started)
+            if delay:
+                await asyncio.sleep(delay)
+            self._record(model, prompt_type, started, "replay", usage)
+            yield reply
+            return
+
+        attempt = 0
+        while True:
+            try:
+                async with self.client.stream("POST", self.url, headers=self._headers(), json=data) as response:
+                    if self._should_retry(response.status_code, attempt):
+                        logger.warning("LLM call retrying", extra={"model": model, "status": response.status_code, "attempt": attempt})
+                        LLM_RESPONSES.labels(model, response.status_code).inc()
+                    else:
+                        if response.is_error:
+                            self._record(model, prompt_type, started, response.status_code)
+                        response.raise_for_status()
+                        usage = None
+                        deltas = []
+                        async for line in response.aiter_lines():
+                            # Skip blank separators and ": keep-alive" comments
+                            if not line.startswith("data:"):
+                                continue
+                            payload = line[len("data:"):].strip()
+                            if payload == "[DONE]":
+                                break
+                            chunk = json.loads(payload)
+                            # OpenRouter reports usage on the final chunk
+                            usage = chunk.get("usage") or usage
+                            if not chunk.get("choices"):
+                                continue
+                            delta = chunk["choices"][0].get("delta", {}).get("content")
+                            if delta:
+                                deltas.append(delta)
+                                yield delta
+                        self._record(model, prompt_type, started, response.status_code, usage)
+                        self._tape(model, messages, temperature, prompt_type, started, "".join(deltas), usage)
+                        return
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if attempt >= self.max_retries:
+                    self._record(model, prompt_type, started, "error")
+                    raise
+                logger.warning("LLM stream retrying", extra={"model": model, "error": e.__class__.__name__, "attempt": attempt})
+
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def _client_settings() -> dict:
+    return {
+        "connect_timeout": float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+        "read_timeout": float(os.getenv("LLM_READ_TIMEOUT", "60")),
+        "max_retries": int(os.getenv("LLM_MAX_RETRIES", "2")),
+        "pool_size": int(os.getenv("LLM_POOL_SIZE", "20")),
+        "cassette": get_cassette(),
     }
-    
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Return the shared LLMClient, configured from the environment on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient(**_client_settings())
+    return _client
+
+
+_async_client = None
+
+
+def get_async_llm_client() -> AsyncLLMClient:
+    """Return the shared AsyncLLMClient. Must be called from the event loop that will use it."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncLLMClient(**_client_settings())
+    return _async_client
+
+
+async def close_async_llm_client():
+    """Release the async client's pooled connections (call on app shutdown)"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def _log_failure(e: Exception, model: str):
+    """Status and the head of the error body; reply bodies are never logged"""
+    response = getattr(e, "response", None)
+    extra = {"model": model, "error": e.__class__.__name__}
+    if response is not None:
+        extra["status"] = response.status_code
+        extra["body"] = response.text[:500]
+    logger.error("LLM call failed", extra=extra)
+
+
+def chat_with_grok(messages, model="google/gemini-2.5-flash", cache=False, prompt_type="other"):
+    """
+    Chat with Grok model via OpenRouter using the shared pooled client.
+    With cache=True, identical (model, messages, temperature) requests are
+    answered from the response cache. On failure returns FALLBACK_REPLY,
+    which is never cached.
+    prompt_type labels the call's latency and token metrics.
+    """
     try:
-        print(f"[DEBUG] Sending to OpenRouter: {model}")
-        print(f"[DEBUG] API Key exists: {bool(os.getenv('OPENROUTER_API_KEY'))}")
-        print(f"[DEBUG] Messages count: {len(messages)}")
-        
-        response = requests.post(url, headers=headers, json=data)
-        
-        print(f"[DEBUG] Response status: {response.status_code}")
-        print(f"[DEBUG] Response text: {response.text}")
-        
-        response.raise_for_status()
-        
-        result = response.json()
-        return result["choices"][0]["message"]["content"]
-        
+        client = get_llm_client()
+        if not cache:
+            return client.chat(messages, model=model, prompt_type=prompt_type)
+
+        response_cache = get_response_cache()
+        key = cache_key(model, messages, DEFAULT_TEMPERATURE)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+
+        reply = client.chat(messages, model=model, temperature=DEFAULT_TEMPERATURE, prompt_type=prompt_type)
+        response_cache.put(key, reply)
+        return reply
+    except Exception as e:
+        _log_failure(e, model)
+        return FALLBACK_REPLY
+
+
+async def achat_with_grok(messages, model="google/gemini-2.5-flash", prompt_type="other"):
+    """Awaitable chat_with_grok for async endpoints; same fallback text on failure"""
+    try:
+        return await get_async_llm_client().chat(messages, model=model, prompt_type=prompt_type)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        _log_failure(e, model)
+        return FALLBACK_REPLY
+
+
+class StreamInterrupted(RuntimeError):
+    """The LLM stream failed after part of the reply had already been yielded"""
+
+
+async def astream_chat_with_grok(messages, model="google/gemini-2.5-flash", prompt_type="other"):
+    """
+    Yield reply text as it streams. If the call fails before any text arrives,
+    yields the usual fallback text; once text has been yielded, a failure raises
+    StreamInterrupted instead, since the fallback would be appended mid-answer.
+    """
+    streamed = False
+    try:
+        async for delta in get_async_llm_client().stream_chat(messages, model=model, prompt_type=prompt_type):
+            streamed = True
+            yield delta
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
-        print(f"OpenRouter API error: {e}")
-        if hasattr(e, 'response') and e.response:
-            print(f"Error response: {e.response.text}")
-        return "I'm having trouble connecting right now. Please try again."
+        _log_failure(e, model)
+        if streamed:
+            raise StreamInterrupted(str(e)) from e
+        yield FALLBACK_REPLY
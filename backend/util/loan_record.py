@@ -0,0 +1,148 @@
+import sys
+import threading
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+# Marks a known field the record doesn't have
+_ABSENT = object()
+
+# Key tuples shared by every packed dict with the same keys (timeline entries,
+# applicant data, KYC results). Keys are field and stage names, so this stays
+# small; past the limit new key sets are simply not shared.
+_KEY_LIMIT = 4096
+_keys: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+_keys_lock = threading.Lock()
+
+
+# Text longer than this (sanction letters) is kept zlib-compressed
+_COMPRESS_OVER = 512
+
+
+class _Packed(tuple):
+    """A dict stored as (shared key tuple, *values)"""
+
+    __slots__ = ()
+
+
+class _Text(bytes):
+    """zlib-compressed UTF-8 text"""
+
+    __slots__ = ()
+
+
+def _shared_keys(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    found = _keys.get(keys)
+    if found is not None:
+        return found
+    with _keys_lock:
+        if len(_keys) >= _KEY_LIMIT:
+            return keys
+        return _keys.setdefault(keys, keys)
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def pack(value: Any, seen: Optional[dict] = None) -> Any:
+    """
+    Immutable, compact form of a JSON-shaped value: dicts become _Packed, lists
+    become tuples and long text is compressed. Within one record a value
+    reached twice (the same KYC dict under kyc and checkpoints, an equal letter
+    under sanction_letter and checkpoints, a stage's time and finished_at) is
+    stored once.
+    """
+    if seen is None:
+        seen = {}
+    if isinstance(value, str):
+        found = seen.get(value)
+        if found is None:
+            found = seen[value] = _Text(zlib.compress(value.encode("utf-8"))) if len(value) > _COMPRESS_OVER else value
+        return found
+    if isinstance(value, (dict, list)):
+        found = seen.get(id(value))
+        if found is not None:
+            return found[1]
+        if isinstance(value, dict):
+            packed = _Packed((_shared_keys(tuple(value)),) + tuple(pack(item, seen) for item in value.values()))
+        else:
+            packed = tuple(pack(item, seen) for item in value)
+        # Keep the original alive so its id can't be reused while packing
+        seen[id(value)] = (value, packed)
+        return packed
+    return value
+
+
+def unpack(value: Any) -> Any:
+    """Fresh dicts and lists from a packed value"""
+    if type(value) is _Packed:
+        return {key: unpack(value[index]) for index, key in enumerate(value[0], 1)}
+    if type(value) is tuple:
+        return [unpack(item) for item in value]
+    if type(value) is _Text:
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+
+def packed_get(value: Any, key: str, default: Any = None) -> Any:
+    """A key of a packed dict, without unpacking it"""
+    if type(value) is not _Packed:
+        return default
+    try:
+        return value[value[0].index(key) + 1]
+    except ValueError:
+        return default
+
+
+class CompactLoan:
+    """
+    A loan record as it sits in InMemoryLoanStore. Top-level fields are slots
+    and nested values are packed into tuples that start with a shared key
+    tuple, so a timeline entry or KYC result costs one tuple instead of a dict, and a value
+    stored under two fields is kept once. Packed values are immutable, so a
+    change becomes visible only when the record is put back. Only the
+    low-cardinality strings (status, pipeline state, timeline step names) are
+    interned; free text is kept per record and goes away with it.
+    """
+
+    FIELDS = (
+        "loan_id", "data", "status", "explanation", "pipeline_state", "checkpoints",
+        "timeline", "kyc", "sanction_letter", "version", "field_versions",
+    )
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, record: Dict[str, Any]):
+        record = dict(record)
+        seen: dict = {}
+        for field in self.FIELDS:
+            setattr(self, field, pack(record.pop(field, _ABSENT), seen))
+        self.status = _intern(self.status)
+        self.pipeline_state = _intern(self.pipeline_state)
+        if type(self.timeline) is tuple:
+            self.timeline = tuple(self._intern_step(entry) for entry in self.timeline)
+        self.extra = pack(record, seen) if record else None
+
+    @staticmethod
+    def _intern_step(entry: Any) -> Any:
+        if type(entry) is not _Packed or "step" not in entry[0]:
+            return entry
+        index = entry[0].index("step") + 1
+        return _Packed(entry[:index] + (_intern(entry[index]),) + entry[index + 1:])
+
+    def data_value(self, key: str) -> Any:
+        return unpack(packed_get(self.data, key))
+
+    def submitted_at(self) -> str:
+        timeline = self.timeline if type(self.timeline) is tuple else None
+        return unpack(packed_get(timeline[0], "time", "")) if timeline else ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        """A fresh record dict; changing it doesn't touch the stored loan"""
+        record = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not _ABSENT:
+                record[field] = unpack(value)
+        if self.extra is not None:
+            record.update(unpack(self.extra))
+        return record
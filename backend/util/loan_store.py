@@ -0,0 +1,520 @@
+import base64
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from backend.util.broker import multi_worker, require_shared
+from backend.util.loan_record import CompactLoan
+
+LoanRecord = Dict[str, Any]
+
+# Columns the status index can be ordered by
+SORT_FIELDS = ("submitted_at", "amount")
+
+# pipeline_state values of a pipeline that was queued or mid-run
+UNFINISHED_STATES = ("queued", "running")
+
+# Bookkeeping fields written by the store itself; never fingerprinted
+VERSION_FIELDS = ("version", "field_versions")
+
+
+def encode_cursor(sort_value, loan_id: str) -> str:
+    """Opaque keyset cursor: the sort value and id of the last row on the page"""
+    raw = json.dumps([sort_value, loan_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        sort_value, loan_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return sort_value, loan_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class LoanStore:
+    """
+    Storage interface for loan records (the dicts built by create_empty_loan_record).
+    Records are keyed by loan_id; status, amount and submission time are
+    indexed so the manager queue doesn't scan the whole book.
+    """
+
+    def get(self, loan_id: str) -> Optional[LoanRecord]:
+        raise NotImplementedError
+
+    def put(self, loan_id: str, record: LoanRecord) -> None:
+        """Insert or replace a record, bumping its version when anything changed"""
+        raise NotImplementedError
+
+    def delete(self, loan_id: str) -> None:
+        """Remove a record; a missing loan_id is ignored"""
+        raise NotImplementedError
+
+    def update(self, loan_id: str, changes: Dict[str, Any]) -> Optional[LoanRecord]:
+        """Merge top-level fields into a record; returns the updated record or None if missing"""
+        record = self.get(loan_id)
+        if record is None:
+            return None
+        record.update(changes)
+        self.put(loan_id, record)
+        return record
+
+    def query(self, status: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, LoanRecord]]:
+        """(loan_id, record) pairs in submission order, optionally filtered by status"""
+        raise NotImplementedError
+
+    def count(self, status: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    def revision(self) -> int:
+        """Counter bumped by every put that changes a record and by every delete"""
+        raise NotImplementedError
+
+    def financials(self) -> List[Tuple[str, float, float]]:
+        """(loan_id, monthly income, amount) for every loan, for columnar analysis"""
+        raise NotImplementedError
+
+    def unfinished(self) -> List[Tuple[str, LoanRecord]]:
+        """(loan_id, record) for loans whose pipeline is queued or running, from an index of just those"""
+        raise NotImplementedError
+
+    def page(
+        self,
+        status: str,
+        sort: str = "submitted_at",
+        descending: bool = False,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Tuple[str, LoanRecord]], Optional[str]]:
+        """
+        One page of loans with the given status, ordered by sort (ties broken by
+        loan_id), served from the status index. Returns (rows, next_cursor);
+        next_cursor is None on the last page.
+        """
+        raise NotImplementedError
+
+    def scan(
+        self,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> Iterator[Tuple[str, LoanRecord, str]]:
+        """
+        Yield (loan_id, record, cursor) for every matching loan in submission order,
+        fetching batch_size rows at a time so memory stays flat. since/until bound
+        the submission time (ISO strings, until exclusive); cursor resumes after
+        the row it was issued for.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+def _fingerprints(record: LoanRecord) -> Dict[str, int]:
+    # 64-bit ints rather than hex strings: the in-memory store keeps one set per loan
+    return {
+        field: int.from_bytes(hashlib.blake2b(json.dumps(value, sort_keys=True, default=str).encode("utf-8"), digest_size=8).digest(), "big")
+        for field, value in record.items()
+        if field not in VERSION_FIELDS and field != "timeline"
+    }
+
+
+def version_state(record: LoanRecord) -> tuple:
+    """(version, field fingerprints, field_versions, timeline entry versions) of a stored record"""
+    return (
+        record.get("version", 0),
+        _fingerprints(record),
+        dict(record.get("field_versions") or {}),
+        [entry.get("version", 0) for entry in record.get("timeline") or []],
+    )
+
+
+def stamp_version(record: LoanRecord, previous: Optional[tuple]) -> tuple:
+    """
+    Bump record["version"] if anything changed since the previous state and note
+    which top-level fields and timeline entries changed in that version, so
+    pollers can ask for just the delta. Returns the new state to pass next time.
+    """
+    version, old_prints, field_versions, timeline_versions = previous or (0, {}, {}, [])
+    prints = _fingerprints(record)
+    timeline = record.get("timeline") or []
+    changed = [field for field, digest in prints.items() if old_prints.get(field) != digest]
+    if len(timeline) > len(timeline_versions):
+        changed.append("timeline")
+
+    if changed or previous is None:
+        version += 1
+        for field in changed:
+            field_versions[field] = version
+    # Entries the store has already seen keep their version, even if the record
+    # came back from a worker process without them
+    for index, entry in enumerate(timeline):
+        entry["version"] = timeline_versions[index] if index < len(timeline_versions) else version
+
+    record["version"] = version
+    record["field_versions"] = dict(field_versions)
+    return version, prints, field_versions, [entry["version"] for entry in timeline]
+
+
+def changes_since(record: LoanRecord, since: int) -> Dict[str, Any]:
+    """Fields and timeline entries changed after version since"""
+    field_versions = record.get("field_versions") or {}
+    return {
+        "version": record.get("version", 0),
+        "since": since,
+        "changed": {
+            field: record[field]
+            for field, version in field_versions.items()
+            if version > since and field != "timeline" and field in record
+        },
+        "timeline": [entry for entry in record.get("timeline") or [] if entry.get("version", 0) > since],
+    }
+
+
+def submitted_at(record: LoanRecord) -> str:
+    timeline = record.get("timeline") or []
+    return timeline[0]["time"] if timeline else ""
+
+
+def loan_amount(record: LoanRecord) -> float:
+    return float(record.get("data", {}).get("amount") or 0)
+
+
+def sort_value(record: LoanRecord, sort: str):
+    return loan_amount(record) if sort == "amount" else submitted_at(record)
+
+
+class InMemoryLoanStore(LoanStore):
+    """
+    Single-process store holding each record as a slotted CompactLoan. Like the
+    SQLite store, get() returns a fresh dict and changes become visible when
+    they are put back; the pipeline and manager actions already save after
+    every change.
+    """
+
+    def __init__(self):
+        self._loans: Dict[str, CompactLoan] = {}
+        self._lock = threading.RLock()
+        # Secondary index: status -> sort field -> sorted [(sort_value, loan_id)]
+        self._by_status: Dict[str, Dict[str, list]] = {}
+        self._indexed: Dict[str, tuple] = {}
+        # All loans as sorted [(submitted_at, loan_id)] for exports
+        self._all: list = []
+        self._unfinished = set()
+        self._versions: Dict[str, tuple] = {}
+        self._revision = 0
+
+    def get(self, loan_id):
+        stored = self._loans.get(loan_id)
+        return stored.to_dict() if stored is not None else None
+
+    def put(self, loan_id, record):
+        with self._lock:
+            previous = self._versions.get(loan_id)
+            self._versions[loan_id] = stamp_version(record, previous)
+            if previous is None or previous[0] != record["version"]:
+                self._revision += 1
+            compact = CompactLoan(record)
+            self._loans[loan_id] = compact
+            self._reindex(loan_id, compact)
+
+    def _reindex(self, loan_id: str, record: CompactLoan):
+        if record.pipeline_state in UNFINISHED_STATES:
+            self._unfinished.add(loan_id)
+        else:
+            self._unfinished.discard(loan_id)
+
+        amount = float(record.data_value("amount") or 0)
+        status = record.status if isinstance(record.status, (str, type(None))) else ""
+        # Same order as SORT_FIELDS
+        entry = (status, record.submitted_at(), amount)
+        previous = self._indexed.get(loan_id)
+        if previous == entry:
+            return
+
+        if previous is not None:
+            self._unindex(loan_id, previous, keep_submitted=previous[1] == entry[1])
+        if previous is None or previous[1] != entry[1]:
+            bisect.insort(self._all, (entry[1], loan_id))
+
+        columns = self._by_status.setdefault(entry[0], {sort: [] for sort in SORT_FIELDS})
+        for sort, value in zip(SORT_FIELDS, entry[1:]):
+            bisect.insort(columns[sort], (value, loan_id))
+        self._indexed[loan_id] = entry
+
+    def _unindex(self, loan_id: str, entry: tuple, keep_submitted: bool = False):
+        columns = self._by_status[entry[0]]
+        for sort, value in zip(SORT_FIELDS, entry[1:]):
+            keys = columns[sort]
+            del keys[bisect.bisect_left(keys, (value, loan_id))]
+        if not keep_submitted:
+            del self._all[bisect.bisect_left(self._all, (entry[1], loan_id))]
+
+    def delete(self, loan_id):
+        with self._lock:
+            if self._loans.pop(loan_id, None) is not None:
+                self._unindex(loan_id, self._indexed.pop(loan_id))
+                self._unfinished.discard(loan_id)
+                self._versions.pop(loan_id, None)
+                self._revision += 1
+
+    def query(self, status=None, limit=None):
+        with self._lock:
+            if status is None:
+                items = list(self._loans.items())
+            else:
+                keys = self._by_status.get(status, {}).get("submitted_at", [])
+                items = [(loan_id, self._loans[loan_id]) for _, loan_id in keys]
+        items = items[:limit] if limit is not None else items
+        return [(loan_id, record.to_dict()) for loan_id, record in items]
+
+    def financials(self):
+        with self._lock:
+            records = list(self._loans.items())
+        return [
+            (loan_id, float(record.data_value("income") or 0), float(record.data_value("amount") or 0))
+            for loan_id, record in records
+        ]
+
+    def unfinished(self):
+        with self._lock:
+            records = [(loan_id, self._loans[loan_id]) for loan_id in self._unfinished]
+        return [(loan_id, record.to_dict()) for loan_id, record in records]
+
+    def revision(self):
+        return self._revision
+
+    def count(self, status=None):
+        if status is None:
+            return len(self._loans)
+        with self._lock:
+            columns = self._by_status.get(status)
+            return len(columns[SORT_FIELDS[0]]) if columns else 0
+
+    def page(self, status, sort="submitted_at", descending=False, limit=50, cursor=None):
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of {SORT_FIELDS}")
+        after = tuple(decode_cursor(cursor)) if cursor else None
+
+        with self._lock:
+            keys = self._by_status.get(status, {}).get(sort, [])
+            if descending:
+                end = bisect.bisect_left(keys, after) if after else len(keys)
+                window = keys[max(0, end - limit):end][::-1]
+                more = end - limit > 0
+            else:
+                start = bisect.bisect_right(keys, after) if after else 0
+                window = keys[start:start + limit]
+                more = start + limit < len(keys)
+            rows = [(loan_id, self._loans[loan_id]) for _, loan_id in window]
+        rows = [(loan_id, record.to_dict()) for loan_id, record in rows]
+
+        next_cursor = encode_cursor(*window[-1]) if more and window else None
+        return rows, next_cursor
+
+    def scan(self, status=None, since=None, until=None, cursor=None, batch_size=500):
+        position = tuple(decode_cursor(cursor)) if cursor else ((since, "") if since else None)
+        while True:
+            with self._lock:
+                keys = self._all if status is None else self._by_status.get(status, {}).get("submitted_at", [])
+                start = bisect.bisect_right(keys, position) if position else 0
+                batch = [(key, self._loans[key[1]]) for key in keys[start:start + batch_size]]
+            if not batch:
+                return
+            for key, record in batch:
+                if until and key[0] >= until:
+                    return
+                yield key[1], record.to_dict(), encode_cursor(*key)
+            position = batch[-1][0]
+
+
+class SQLiteLoanStore(LoanStore):
+    """
+    Embedded SQLite store in WAL mode, so several threads or uvicorn workers can
+    read while one writes. The record is stored as JSON next to indexed status,
+    amount and submission-time columns. Each thread gets its own connection, and
+    statements are fixed parameterised SQL so sqlite3 reuses them from its
+    prepared-statement cache.
+    """
+
+    GET_SQL = "SELECT record FROM loans WHERE loan_id = ?"
+    DELETE_SQL = "DELETE FROM loans WHERE loan_id = ?"
+    REVISION_SQL = "SELECT value FROM revision"
+    BUMP_REVISION_SQL = "UPDATE revision SET value = value + 1"
+    PUT_SQL = (
+        "INSERT INTO loans (loan_id, status, amount, submitted_at, record) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(loan_id) DO UPDATE SET status = excluded.status, amount = excluded.amount, "
+        "submitted_at = excluded.submitted_at, record = excluded.record"
+    )
+    QUERY_SQL = "SELECT loan_id, record FROM loans ORDER BY submitted_at, loan_id LIMIT ?"
+    QUERY_STATUS_SQL = "SELECT loan_id, record FROM loans WHERE status = ? ORDER BY submitted_at, loan_id LIMIT ?"
+    COUNT_SQL = "SELECT COUNT(*) FROM loans"
+    COUNT_STATUS_SQL = "SELECT COUNT(*) FROM loans WHERE status = ?"
+    FINANCIALS_SQL = "SELECT loan_id, COALESCE(json_extract(record, '$.data.income'), 0), COALESCE(amount, 0) FROM loans"
+    # Same expression as the partial index below, so only unfinished rows are visited
+    UNFINISHED_WHERE = "json_extract(record, '$.pipeline_state') IN ({})".format(", ".join(f"'{state}'" for state in UNFINISHED_STATES))
+    UNFINISHED_SQL = f"SELECT loan_id, record FROM loans WHERE {UNFINISHED_WHERE}"
+    # Keyset pagination over the (status, sort column, loan_id) indexes
+    PAGE_SQL = {
+        (sort, descending, bool(after)): (
+            f"SELECT loan_id, record, {sort} FROM loans WHERE status = ?"
+            + (f" AND ({sort}, loan_id) {'<' if descending else '>'} (?, ?)" if after else "")
+            + f" ORDER BY {sort} {'DESC' if descending else 'ASC'}, loan_id {'DESC' if descending else 'ASC'} LIMIT ?"
+        )
+        for sort in SORT_FIELDS
+        for descending in (False, True)
+        for after in (False, True)
+    }
+
+    SCAN_SQL = (
+        "SELECT loan_id, record, submitted_at FROM loans"
+        " WHERE (submitted_at, loan_id) > (?, ?) AND (? IS NULL OR status = ?) AND (? IS NULL OR submitted_at < ?)"
+        " ORDER BY submitted_at, loan_id LIMIT ?"
+    )
+
+    def __init__(self, path: str = "loans.sqlite3"):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS loans (
+                loan_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                amount REAL,
+                submitted_at TEXT,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_loans_status_submitted ON loans (status, submitted_at, loan_id);
+            CREATE INDEX IF NOT EXISTS idx_loans_status_amount ON loans (status, amount, loan_id);
+            CREATE INDEX IF NOT EXISTS idx_loans_submitted ON loans (submitted_at);
+            CREATE TABLE IF NOT EXISTS revision (id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO revision VALUES (0, 0);
+            """
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_loans_unfinished ON loans (loan_id) WHERE {self.UNFINISHED_WHERE}")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, cached_statements=64)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def get(self, loan_id):
+        row = self._conn().execute(self.GET_SQL, (loan_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, loan_id, record):
+        conn = self._conn()
+        # Read-compare-write in one write transaction so concurrent puts can't reuse a version
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(self.GET_SQL, (loan_id,)).fetchone()
+            previous = version_state(json.loads(row[0])) if row else None
+            stamp_version(record, previous)
+            if previous is None or previous[0] != record["version"]:
+                conn.execute(self.BUMP_REVISION_SQL)
+            conn.execute(
+                self.PUT_SQL,
+                (
+                    loan_id,
+                    record.get("status", ""),
+                    loan_amount(record),
+                    submitted_at(record),
+                    json.dumps(record),
+                ),
+            )
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def delete(self, loan_id):
+        conn = self._conn()
+        if conn.execute(self.DELETE_SQL, (loan_id,)).rowcount:
+            conn.execute(self.BUMP_REVISION_SQL)
+        conn.commit()
+
+    def query(self, status=None, limit=None):
+        limit = -1 if limit is None else limit
+        if status is None:
+            rows = self._conn().execute(self.QUERY_SQL, (limit,))
+        else:
+            rows = self._conn().execute(self.QUERY_STATUS_SQL, (status, limit))
+        return [(loan_id, json.loads(record)) for loan_id, record in rows]
+
+    def financials(self):
+        # json_extract keeps the full records from being parsed in Python
+        return self._conn().execute(self.FINANCIALS_SQL).fetchall()
+
+    def unfinished(self):
+        return [(loan_id, json.loads(record)) for loan_id, record in self._conn().execute(self.UNFINISHED_SQL)]
+
+    def revision(self):
+        return self._conn().execute(self.REVISION_SQL).fetchone()[0]
+
+    def count(self, status=None):
+        if status is None:
+            return self._conn().execute(self.COUNT_SQL).fetchone()[0]
+        return self._conn().execute(self.COUNT_STATUS_SQL, (status,)).fetchone()[0]
+
+    def page(self, status, sort="submitted_at", descending=False, limit=50, cursor=None):
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of {SORT_FIELDS}")
+        sql = self.PAGE_SQL[(sort, descending, bool(cursor))]
+        params = (status,) + (decode_cursor(cursor) if cursor else ()) + (limit + 1,)
+
+        rows = self._conn().execute(sql, params).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][0]) if more else None
+        return [(loan_id, json.loads(record)) for loan_id, record, _ in rows], next_cursor
+
+    def scan(self, status=None, since=None, until=None, cursor=None, batch_size=500):
+        position = tuple(decode_cursor(cursor)) if cursor else (since or "", "")
+        while True:
+            rows = self._conn().execute(
+                self.SCAN_SQL, position + (status, status, until, until, batch_size)
+            ).fetchall()
+            for loan_id, record, submitted in rows:
+                yield loan_id, json.loads(record), encode_cursor(submitted, loan_id)
+            if len(rows) < batch_size:
+                return
+            position = (rows[-1][2], rows[-1][0])
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def create_loan_store() -> LoanStore:
+    """
+    LOAN_STORE=memory or sqlite; LOAN_STORE_PATH sets the SQLite file. Defaults
+    to sqlite unless this is provably the only worker, since each has its own memory.
+    """
+    backend = os.getenv("LOAN_STORE", "sqlite" if multi_worker() else "memory").lower()
+    if backend == "sqlite":
+        return SQLiteLoanStore(os.getenv("LOAN_STORE_PATH", "loans.sqlite3"))
+    if backend == "memory":
+        require_shared("LOAN_STORE", backend)
+        return InMemoryLoanStore()
+    raise ValueError(f"Unknown LOAN_STORE '{backend}'")
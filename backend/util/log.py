@@ -0,0 +1,167 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+ROOT_LOGGER = "loanapp"
+
+PAN_PATTERN = re.compile(r"\b[A-Z]{5}[0-9]{4}[A-Z]\b")
+# Structured fields that are always masked, wherever they appear
+REDACTED_FIELDS = {"pan", "income"}
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+def mask_pan(text: str) -> str:
+    """ABCDE1234F -> XXXXX1234X: keeps the digits support staff use to tell PANs apart"""
+    return PAN_PATTERN.sub(lambda match: "XXXXX" + match.group(0)[5:9] + "X", text)
+
+
+def _redact(value, key: Optional[str] = None):
+    if key in REDACTED_FIELDS:
+        return "[redacted]"
+    if isinstance(value, str):
+        return mask_pan(value)
+    if isinstance(value, dict):
+        return {k: _redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_redact(v) for v in value]
+    return value
+
+
+class RedactingFilter(logging.Filter):
+    """Masks PANs in the message and redacts pan/income fields. Runs on the listener thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = mask_pan(record.getMessage())
+        record.args = None
+        for key in set(vars(record)) - _RECORD_ATTRS:
+            setattr(record, key, _redact(getattr(record, key), key))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps roughly `rate` of the records below WARNING for loggers matching each
+    configured prefix; warnings and errors always pass. Runs on the calling
+    thread so dropped records cost one random() call.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest prefix first so "loanapp.llm.stream" beats "loanapp.llm"
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return rate >= 1.0 or random.random() < rate
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in set(vars(record)) - _RECORD_ATTRS:
+            entry[key] = getattr(record, key)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    The stock QueueHandler formats the message before enqueueing, which is the
+    work we want off the request thread. The queue never leaves this process,
+    so the record can go across as it is.
+    """
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        # A full queue drops the record rather than blocking the caller
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def _parse_rates(spec: str) -> Dict[str, float]:
+    """LOG_SAMPLE="llm=0.1,pipeline=0.5" -> {"loanapp.llm": 0.1, "loanapp.pipeline": 0.5}"""
+    rates = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            name, rate = part.split("=", 1)
+            rates[f"{ROOT_LOGGER}.{name.strip()}"] = float(rate)
+    return rates
+
+
+_listener = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging() -> None:
+    """
+    Route the "loanapp" loggers through a bounded queue to a listener thread that
+    redacts, formats and writes them. LOG_LEVEL sets the level, LOG_FORMAT picks
+    json (default) or text, and LOG_SAMPLE sets per-logger sampling rates. Safe
+    to call more than once, including in worker processes.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        output = logging.StreamHandler(sys.stdout)
+        if os.getenv("LOG_FORMAT", "json").lower() == "text":
+            output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        else:
+            output.setFormatter(JSONFormatter())
+        output.addFilter(RedactingFilter())
+
+        records = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        handler = _InProcessQueueHandler(records)
+        handler.addFilter(SamplingFilter(_parse_rates(os.getenv("LOG_SAMPLE", ""))))
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        root.handlers[:] = [handler]
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush whatever is queued and stop the listener thread"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the "loanapp" root, e.g. get_logger("llm")"""
+    configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
@@ -0,0 +1,217 @@
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond local work up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Sharded:
+    """
+    Per-thread value slots. A thread only ever writes its own shard, so
+    recording needs no lock; collect() adds the shards up at scrape time.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def shard(self) -> List[float]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = [0.0] * self._size
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def collect(self) -> List[float]:
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(values) for values in zip(*shards)] if shards else [0.0] * self._size
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        """Child for one label combination; keep a reference to it on hot paths"""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, values: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            yield from self._render_child(values, child)
+
+    def _render_child(self, values, child) -> Iterable[str]:
+        yield f"{self.name}{self._label_text(values)} {_number(child.value())}"
+
+
+class _CounterChild:
+    __slots__ = ("_values",)
+
+    def __init__(self):
+        self._values = _Sharded(1)
+
+    def inc(self, amount: float = 1.0):
+        self._values.shard()[0] += amount
+
+    def dec(self, amount: float = 1.0):
+        self._values.shard()[0] -= amount
+
+    def value(self) -> float:
+        return self._values.collect()[0]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """inc/dec gauge, or one computed at scrape time when fn is given"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set_function(self, fn: Callable[[], float]):
+        self.fn = fn
+
+    def render(self) -> Iterable[str]:
+        if self.fn is None:
+            yield from super().render()
+            return
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        try:
+            yield f"{self.name} {_number(self.fn())}"
+        except Exception:
+            pass  # a failing gauge callback must not break the whole scrape
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_values")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # one slot per bucket, then +Inf, then the running sum
+        self._values = _Sharded(len(bounds) + 2)
+
+    def observe(self, value: float):
+        shard = self._values.shard()
+        shard[bisect.bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        values = self._values.collect()
+        return values[:-1], values[-1]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_child(self, values, child) -> Iterable[str]:
+        counts, total = child.snapshot()
+        cumulative = 0.0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = "+Inf" if bound == math.inf else _number(bound)
+            yield f"{self.name}_bucket{self._label_text(values, ('le', le))} {_number(cumulative)}"
+        yield f"{self.name}_sum{self._label_text(values)} {_number(total)}"
+        yield f"{self.name}_count{self._label_text(values)} {_number(cumulative)}"
+
+
+def _number(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in list(REGISTRY):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Shared metrics. Modules record into these; main.py serves them at /metrics.
+# Process-mode pipeline workers record into their own copies, which are not scraped.
+STAGE_DURATION = Histogram(
+    "loan_pipeline_stage_duration_seconds", "Wall time of each pipeline stage", ["stage", "state"]
+)
+KYC_STEP_DURATION = Histogram(
+    "loan_kyc_step_duration_seconds", "Wall time of KYC sub-steps", ["step"]
+)
+PIPELINES_IN_FLIGHT = Gauge("loan_pipelines_in_flight", "Pipelines currently running in this process")
+PIPELINES_COMPLETED = Counter("loan_pipelines_completed_total", "Pipelines that ended, by outcome", ["state"])
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds", "OpenRouter call latency including retries", ["model", "prompt"]
+)
+LLM_RESPONSES = Counter("llm_responses_total", "OpenRouter responses by HTTP status", ["model", "status"])
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by OpenRouter", ["model", "prompt", "kind"])
+QUEUE_DEPTH = Gauge("loan_pipeline_queue_depth", "Jobs waiting in the pipeline queue")
+QUEUE_RUNNING = Gauge("loan_pipeline_queue_running", "Jobs being run by queue workers")
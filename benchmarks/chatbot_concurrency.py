@@ -0,0 +1,58 @@
+# benchmarks/chatbot_concurrency.py
+"""
+Fires N simultaneous /chatbot turns at the app against a fake LLM with a
+fixed latency. With the async LLM path the batch should finish in roughly
+one LLM latency; a blocking call would take about N latencies.
+
+Usage: python benchmarks/chatbot_concurrency.py --turns 20 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_llm import start_fake_llm
+
+
+async def run(turns: int):
+    import httpx
+    from main import app
+
+    payload = {"message": "My name is Test User", "conversation_history": [], "collected_data": {}}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.post("/chatbot", json=payload) for _ in range(turns)))
+        elapsed = time.perf_counter() - start
+
+    ok = sum(1 for r in responses if r.status_code == 200 and r.json().get("collected_field"))
+    return elapsed, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    # Must be set before backend.util.llm is imported
+    os.environ["OPENROUTER_URL"] = start_fake_llm(args.latency)
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+    os.environ.setdefault("LLM_POOL_SIZE", str(max(args.turns, 20)))
+    # Every turn has to reach the LLM; a locally extracted answer would measure nothing
+    os.environ["CHATBOT_LOCAL_EXTRACTION"] = "0"
+
+    elapsed, ok = asyncio.run(run(args.turns))
+
+    print(f"{args.turns} concurrent chatbot turns, LLM latency {args.latency:.2f}s")
+    print(f"  completed: {ok}/{args.turns}")
+    print(f"  wall time: {elapsed:.2f}s ({elapsed / args.latency:.1f}x one LLM latency, serial would be {args.turns}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/fake_llm.py
+"""
+Local stand-in for the OpenRouter chat completions API.
+Replies after a configurable delay so benchmarks can measure our own
+overhead without network access or paid tokens.
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+DEFAULT_REPLY = "COLLECTED: fullName: Test User\nThanks! What's your email?"
+
+
+def create_fake_llm_app(latency: float = 0.5, reply: str = DEFAULT_REPLY, token_delay: float = 0.0) -> FastAPI:
+    """
+    latency is the time to first token; with stream=True the reply is then
+    sent in small chunks token_delay seconds apart.
+    """
+    app = FastAPI()
+
+    async def stream_reply():
+        await asyncio.sleep(latency)
+        for start in range(0, len(reply), 4):
+            chunk = {"choices": [{"index": 0, "delta": {"content": reply[start:start + 4]}}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            if token_delay:
+                await asyncio.sleep(token_delay)
+        yield "data: [DONE]\n\n"
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if body.get("stream"):
+            return StreamingResponse(stream_reply(), media_type="text/event-stream")
+
+        await asyncio.sleep(latency + token_delay * (len(reply) // 4))
+        return {
+            "id": "fake",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_llm(latency: float = 0.5, port: int = None, token_delay: float = 0.0) -> str:
+    """Run the fake server in a daemon thread and return its completions URL"""
+    port = port or free_port()
+    config = uvicorn.Config(create_fake_llm_app(latency, token_delay=token_delay), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+
+    while not server.started:
+        time.sleep(0.01)
+
+    return f"http://127.0.0.1:{port}/api/v1/chat/completions"
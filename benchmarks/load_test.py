@@ -0,0 +1,351 @@
+# benchmarks/load_test.py
+"""
+Load test for the API against a local fake LLM. Starts the fake OpenRouter
+server and the app under uvicorn, then, for each concurrency level, drives
+every scenario for a fixed duration:
+
+  create_loan      POST /loans (pipeline completion tracked on /ws/manager)
+  get_loan         GET /loans/{id} for a seeded loan
+  chatbot          POST /chatbot
+  manager_pending  GET /manager/pending
+  websocket        connect to /ws/{id}, ask for the record, close
+
+Reports p50/p95/p99 latency and requests per second per scenario, plus
+end-to-end pipeline completion times, and saves everything as JSON.
+Pass --compare with an earlier results file to print the change.
+
+Every loan and chatbot turn is distinct, and the chatbot's local extractor and
+the LLM response cache are off unless --local-extraction / --llm-cache ask for
+them, so each request that should reach the fake LLM does.
+
+Usage: python benchmarks/load_test.py --concurrency 1,10,50 --duration 10 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import string
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_llm import free_port, start_fake_llm
+
+SCENARIOS = ("create_loan", "get_loan", "chatbot", "manager_pending", "websocket")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+FIRST_NAMES = ("Arjun", "Priya", "Ravi", "Anita", "Vikram", "Meera", "Rahul", "Kavya", "Suresh", "Divya")
+LAST_NAMES = ("Kumar", "Sharma", "Iyer", "Reddy", "Patel", "Nair", "Gupta", "Singh", "Das", "Menon")
+PURPOSES = ("Home renovation", "Education", "Wedding", "Medical", "Business expansion", "Vehicle")
+
+_request_numbers = itertools.count()
+
+
+def loan_payload() -> Dict[str, Any]:
+    """A different applicant every call, so no two pipelines send the LLM the same prompt"""
+    letters = string.ascii_uppercase
+    return {
+        "name": f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}",
+        "pan": "".join(random.choices(letters, k=5)) + f"{random.randrange(10000):04d}" + random.choice(letters),
+        "income": random.randrange(40000, 200000, 500),
+        "amount": random.randrange(100000, 1500000, 10000),
+        "purpose": random.choice(PURPOSES),
+    }
+
+
+def chatbot_payload() -> Dict[str, Any]:
+    number = next(_request_numbers)
+    return {
+        "message": f"Before I apply, what documents do I need for a {random.choice(PURPOSES).lower()} loan? (question {number})",
+        "conversation_history": [],
+        "collected_data": {},
+    }
+
+
+def latency_summary(latencies: List[float], elapsed: float) -> Dict[str, Any]:
+    """Count, throughput and p50/p95/p99/max in milliseconds"""
+    ordered = sorted(latencies)
+
+    def pct(p):
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))] * 1000, 2)
+
+    return {
+        "requests": len(ordered),
+        "rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+    }
+
+
+def start_app(port: int):
+    """Run main:app under uvicorn in a daemon thread; returns the server"""
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+class CompletionTracker:
+    """Listens on /ws/manager and notes when each loan's pipeline_finished arrives"""
+
+    def __init__(self, ws_url: str):
+        self.ws_url = ws_url
+        self.finished: Dict[str, float] = {}
+        self.dropped = 0
+        self._task = None
+
+    async def start(self):
+        import websockets
+
+        ready = asyncio.Event()
+
+        async def listen():
+            async with websockets.connect(self.ws_url, max_size=None) as ws:
+                ready.set()
+                async for raw in ws:
+                    message = json.loads(raw)
+                    self.dropped += message.get("dropped", 0)
+                    for event in message.get("events", []):
+                        if event.get("type") == "pipeline_finished":
+                            self.finished[event["loan_id"]] = time.perf_counter()
+
+        self._task = asyncio.create_task(listen())
+        await ready.wait()
+
+    async def wait_for(self, loan_ids, timeout: float):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline and any(loan_id not in self.finished for loan_id in loan_ids):
+            await asyncio.sleep(0.05)
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+
+async def drive(request: Callable[[int], Awaitable[int]], concurrency: int, duration: float) -> Dict[str, Any]:
+    """Run `concurrency` workers calling request(worker) back to back for `duration` seconds"""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def worker(index):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await request(index)
+            except Exception as e:
+                statuses[e.__class__.__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[str(status)] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    result = latency_summary(latencies, time.perf_counter() - started)
+    result["statuses"] = dict(statuses)
+    result["errors"] = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return result
+
+
+async def run_level(client, ws_base: str, tracker: CompletionTracker, seeded: List[str],
+                    concurrency: int, args) -> Dict[str, Any]:
+    import websockets
+
+    submitted: Dict[str, float] = {}
+
+    async def create_loan(_):
+        started = time.perf_counter()
+        response = await client.post("/loans", json=loan_payload())
+        if response.status_code == 200:
+            submitted[response.json()["loan_id"]] = started
+        return response.status_code
+
+    async def get_loan(_):
+        return (await client.get(f"/loans/{random.choice(seeded)}")).status_code
+
+    async def chatbot(_):
+        return (await client.post("/chatbot", json=chatbot_payload())).status_code
+
+    async def manager_pending(_):
+        return (await client.get("/manager/pending")).status_code
+
+    async def websocket(_):
+        async with websockets.connect(f"{ws_base}/ws/{random.choice(seeded)}", max_size=None) as ws:
+            await ws.send("get")
+            # Skip any event batches until the record itself comes back
+            while "events" in json.loads(await ws.recv()):
+                pass
+        return 200
+
+    requests_by_name = {
+        "create_loan": create_loan,
+        "get_loan": get_loan,
+        "chatbot": chatbot,
+        "manager_pending": manager_pending,
+        "websocket": websocket,
+    }
+
+    scenarios = {}
+    for name in args.scenarios:
+        scenarios[name] = await drive(requests_by_name[name], concurrency, args.duration)
+        print(f"  c={concurrency:<4} {name:<16} {scenarios[name]['rps']:>9.1f} rps  "
+              f"p50 {scenarios[name]['p50_ms']} ms  p95 {scenarios[name]['p95_ms']} ms  "
+              f"p99 {scenarios[name]['p99_ms']} ms  errors {scenarios[name]['errors']}")
+
+    level = {"concurrency": concurrency, "scenarios": scenarios}
+    if submitted:
+        await tracker.wait_for(submitted, args.drain_timeout)
+        done = [tracker.finished[loan_id] - started for loan_id, started in submitted.items() if loan_id in tracker.finished]
+        last = max((tracker.finished[loan_id] for loan_id in submitted if loan_id in tracker.finished), default=None)
+        span = last - min(submitted.values()) if last else 0.0
+        pipeline = latency_summary(done, span)
+        pipeline["submitted"] = len(submitted)
+        pipeline["completed"] = pipeline.pop("requests")
+        pipeline["completed_per_s"] = pipeline.pop("rps")
+        level["pipeline"] = pipeline
+        print(f"  c={concurrency:<4} pipeline         {pipeline['completed']}/{pipeline['submitted']} done  "
+              f"p50 {pipeline['p50_ms']} ms  p95 {pipeline['p95_ms']} ms  p99 {pipeline['p99_ms']} ms")
+    return level
+
+
+async def run(args, base_url: str) -> List[Dict[str, Any]]:
+    import httpx
+
+    ws_base = base_url.replace("http://", "ws://", 1)
+    tracker = CompletionTracker(f"{ws_base}/ws/manager")
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 10, max_keepalive_connections=max(args.concurrency) + 10)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        await tracker.start()
+
+        # Seed loans for the read scenarios and let them reach the manager queue
+        seeded = []
+        for _ in range(args.seed_loans):
+            response = await client.post("/loans", json=loan_payload())
+            response.raise_for_status()
+            seeded.append(response.json()["loan_id"])
+        await tracker.wait_for(seeded, args.drain_timeout)
+
+        levels = []
+        for concurrency in args.concurrency:
+            levels.append(await run_level(client, ws_base, tracker, seeded, concurrency, args))
+
+        await tracker.stop()
+
+    if tracker.dropped:
+        print(f"  warning: /ws/manager dropped {tracker.dropped} event(s); some completions were not timed")
+    return levels
+
+
+def _as_rps(pipeline: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(pipeline, rps=pipeline["completed_per_s"])
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print rps and p95 change per level and scenario against an earlier run"""
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    print(f"\nCompared with {baseline.get('started_at')}:")
+    for level in current["levels"]:
+        before = previous.get(level["concurrency"])
+        if before is None:
+            continue
+        pairs = [(name, now, before["scenarios"].get(name)) for name, now in level["scenarios"].items()]
+        if "pipeline" in level and "pipeline" in before:
+            pairs.append(("pipeline", _as_rps(level["pipeline"]), _as_rps(before["pipeline"])))
+        for name, now, then in pairs:
+            if not then or not then.get("rps") or not then.get("p95_ms") or now.get("p95_ms") is None:
+                continue
+            print(f"  c={level['concurrency']:<4} {name:<16} rps {100.0 * (now['rps'] / then['rps'] - 1):+6.1f}%  "
+                  f"p95 {100.0 * (now['p95_ms'] / then['p95_ms'] - 1):+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario per level")
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=list(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="fake LLM token rate; 0 = instant")
+    parser.add_argument("--seed-loans", type=int, default=20)
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="seconds to wait for queued pipelines")
+    parser.add_argument("--output", help=f"results file (default: {RESULTS_DIR}/load_<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--local-extraction", action="store_true", help="let the chatbot answer plain replies without the LLM")
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache on")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios {sorted(unknown)}; choose from {list(SCENARIOS)}")
+
+    token_delay = 1.0 / args.tokens_per_second if args.tokens_per_second else 0.0
+
+    # Must be set before main (and backend.util.llm) is imported
+    os.environ["OPENROUTER_URL"] = start_fake_llm(args.latency, token_delay=token_delay)
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+    os.environ.setdefault("LLM_POOL_SIZE", str(max(max(args.concurrency), 20)))
+    os.environ.setdefault("PIPELINE_QUEUE_DB", "")
+    os.environ.setdefault("EVENT_QUEUE_SIZE", "100000")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["CHATBOT_LOCAL_EXTRACTION"] = "1" if args.local_extraction else "0"
+    if not args.llm_cache:
+        # A zero-entry memory tier and no disk tier: every lookup misses
+        os.environ["LLM_CACHE_SIZE"] = "0"
+        os.environ.pop("LLM_CACHE_PATH", None)
+
+    started_at = datetime.now(timezone.utc)
+    port = free_port()
+    start_app(port)
+    levels = asyncio.run(run(args, f"http://127.0.0.1:{port}"))
+
+    results = {
+        "started_at": started_at.isoformat(),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "scenarios": args.scenarios,
+            "llm_latency": args.latency,
+            "tokens_per_second": args.tokens_per_second,
+            "seed_loans": args.seed_loans,
+            "local_extraction": args.local_extraction,
+            "llm_cache": args.llm_cache,
+            "env": {name: os.getenv(name) for name in (
+                "LOAN_STORE", "PIPELINE_WORKERS", "PIPELINE_WORKER_MODE", "PIPELINE_STAGE_WORKERS",
+                "LLM_POOL_SIZE", "EXPLANATION_MODE", "CHATBOT_LOCAL_EXTRACTION", "LLM_CACHE_SIZE", "LLM_CACHE_PATH",
+            ) if os.getenv(name) is not None},
+        },
+        "levels": levels,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load_{started_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# benchmarks/loan_store_memory.py
+"""
+Measures what InMemoryLoanStore holds per loan, against keeping the record
+dicts as they are (what the store did before it used slotted records), plus
+put() and get() latency. Loans are synthetic finished applications with a
+full timeline, checkpoints and a sanction letter; the seed is fixed so runs
+are comparable. Each loan is built inside the trace and then dropped, so
+both stores are charged for everything they keep, strings included.
+
+Usage: python benchmarks/loan_store_memory.py --loans 20000
+"""
+
+import argparse
+import copy
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.util.loan_store import InMemoryLoanStore, stamp_version
+
+WORDS = (
+    "loan sanction amount tenure interest rate monthly installment approved subject verification "
+    "documents applicant income repayment schedule bank terms conditions processing fee principal "
+    "disbursement account agreement manager review eligibility credit the of and to for your"
+).split()
+
+STAGES = [
+    ("kyc", "KYC"), ("underwriting", "Underwriting"), ("sanction_letter", "Sanction Letter"),
+    ("decision", "Decision"), ("finalize", "Manager Handoff"),
+]
+
+
+def build_loan(index: int, rng: random.Random) -> dict:
+    start = datetime(2026, 1, 1) + timedelta(seconds=index, microseconds=rng.randrange(1_000_000))
+    pan = "ABCDE%04dF" % (index % 10000)
+    letter = "Dear Applicant,\n\n" + " ".join(rng.choice(WORDS) for _ in range(220)) + f"\nReference {index}\n"
+    kyc = {"pan_valid": True, "document_checked": False, "pan_in_document": None, "name_in_document": None}
+    timeline = [
+        {"step": "Submitted", "detail": "Application received", "time": start.isoformat()},
+        {"step": "PAN Verification", "detail": f"PAN {pan} format valid.", "time": start.isoformat()},
+        {"step": "KYC Check Complete", "detail": "KYC completed – PAN format verified.", "time": start.isoformat()},
+    ]
+    for offset, (name, label) in enumerate(STAGES):
+        began = start + timedelta(milliseconds=10 * offset)
+        ended = began + timedelta(milliseconds=offset * 7 + 1)
+        timeline.append({
+            "step": f"{label} Stage",
+            "detail": f"{label} finished in {offset * 7 + 1} ms",
+            "time": ended.isoformat(),
+            "stage": name,
+            "started_at": began.isoformat(),
+            "finished_at": ended.isoformat(),
+        })
+    return {
+        "loan_id": "%08x-0000-4000-8000-%012x" % (index, index),
+        "data": {
+            "name": f"Applicant {index}", "pan": pan, "income": 50000.0 + index % 997,
+            "amount": 100000.0 + index, "purpose": "Home renovation", "document_name": None, "document_id": None,
+        },
+        "status": "pending_manager_approval",
+        "explanation": "Your application has been processed and is now pending manager approval.",
+        "pipeline_state": "finished",
+        "checkpoints": {"kyc": kyc, "sanction_letter": letter, "decision": "pre_approved"},
+        "timeline": timeline,
+        "kyc": kyc,
+        "sanction_letter": letter,
+    }
+
+
+class DictStore:
+    """The records kept as plain dicts, one private copy each"""
+
+    def __init__(self):
+        self._loans = {}
+        self._versions = {}
+
+    def put(self, loan_id, record):
+        self._versions[loan_id] = stamp_version(record, self._versions.get(loan_id))
+        self._loans[loan_id] = copy.deepcopy(record)
+
+
+def measure(store, count, seed):
+    """Bytes the store keeps per loan; each record is built inside the trace and dropped after put()"""
+    rng = random.Random(seed)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for index in range(count):
+        loan = build_loan(index, rng)
+        store.put(loan["loan_id"], loan)
+    del loan
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return held / count
+
+
+def timed(fn, loans):
+    start = time.perf_counter()
+    for loan in loans:
+        fn(loan)
+    return (time.perf_counter() - start) / len(loans) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    dict_bytes = measure(DictStore(), args.loans, args.seed)
+    store_bytes = measure(InMemoryLoanStore(), args.loans, args.seed)
+
+    rng = random.Random(args.seed)
+    loans = [build_loan(index, rng) for index in range(args.loans)]
+
+    store = InMemoryLoanStore()
+    put_us = timed(lambda loan: store.put(loan["loan_id"], loan), loans)
+    get_us = timed(lambda loan: store.get(loan["loan_id"]), loans)
+
+    print(f"loans={args.loans}")
+    print(f"dict records:   {dict_bytes / 1024:.2f} KB/loan")
+    print(f"InMemoryLoanStore: {store_bytes / 1024:.2f} KB/loan (incl. indexes), {dict_bytes / store_bytes:.2f}x smaller")
+    print(f"put: {put_us:.1f} us/loan  get: {get_us:.1f} us/loan")
+
+
+if __name__ == "__main__":
+    main()
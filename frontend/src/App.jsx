@@ -11,7 +11,7 @@ import SimpleManagerTest from "./components/SimpleManagerTest";
 import LiveStatus from "./components/LiveStatus";
 import ResultCard from "./components/ResultCard";
 import ChatInterface from "./components/ChatInterface";
-import { submitLoanApplication, checkLoanStatus } from "./api";
+import { submitLoanApplication, checkLoanStatus, subscribeToLoanEvents } from "./api";
 
 // Main Application Component with Status Tracking
 function ApplicationStatus() {
@@ -40,36 +40,56 @@ function ApplicationStatus() {
     }
   };
 
-  // 2. Polling Logic (The heartbeat of the app)
+  // 2. Live updates (The heartbeat of the app)
+  // The server pushes an event whenever a new version of the loan is saved; we
+  // then fetch just the delta. Interval polling is only a fallback for when the
+  // socket drops.
   useEffect(() => {
+    if (!loanId) return;
+
     let intervalId;
+    let finished = false;
+
+    const refresh = async () => {
+      try {
+        const data = await checkLoanStatus(loanId);
+        setStatusData(data);
+
+        // Done once a final state is reached AND explanation is not placeholder
+        const hasRealExplanation =
+          data.explanation &&
+          !data.explanation.includes("analyzing") &&
+          !data.explanation.includes("Processing");
 
-    if (loanId) {
-      intervalId = setInterval(async () => {
-        try {
-          const data = await checkLoanStatus(loanId);
-          setStatusData(data);
-
-          // Stop polling if final state reached AND explanation is not placeholder
-          const hasRealExplanation =
-            data.explanation &&
-            !data.explanation.includes("analyzing") &&
-            !data.explanation.includes("Processing");
-
-          if (
-            ["pre_approved", "rejected", "manual_review"].includes(data.status) &&
-            hasRealExplanation
-          ) {
-            setLoading(false);
-            clearInterval(intervalId);
-          }
-        } catch (error) {
-          console.error("Polling error", error);
+        if (
+          ["pre_approved", "rejected", "manual_review"].includes(data.status) &&
+          hasRealExplanation
+        ) {
+          finished = true;
+          setLoading(false);
+          clearInterval(intervalId);
         }
-      }, 1000); // Poll every 1 second for faster updates
-    }
+      } catch (error) {
+        console.error("Status refresh error", error);
+      }
+    };
+
+    const unsubscribe = subscribeToLoanEvents(
+      loanId,
+      (events, dropped) => {
+        if (dropped || events.some((event) => event.type === "loan_updated")) refresh();
+      },
+      () => {
+        if (!finished) intervalId = setInterval(refresh, 1000);
+      }
+    );
+    // Catch anything saved before the socket opened
+    refresh();
 
-    return () => clearInterval(intervalId);
+    return () => {
+      unsubscribe();
+      clearInterval(intervalId);
+    };
   }, [loanId]);
 
   // Convert timeline to live status steps
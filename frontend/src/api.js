@@ -1,4 +1,19 @@
 const API_BASE_URL = "http://127.0.0.1:8000";
+const WS_BASE_URL = API_BASE_URL.replace(/^http/, "ws");
+
+// Subscribe to pushed {"events": [...]} batches for a loan (or "manager")
+export const subscribeToLoanEvents = (channel, onEvents, onClose) => {
+  const socket = new WebSocket(`${WS_BASE_URL}/ws/${channel}`);
+  socket.onmessage = (message) => {
+    const batch = JSON.parse(message.data);
+    if (batch.events) onEvents(batch.events, batch.dropped || 0);
+  };
+  socket.onclose = () => onClose && onClose();
+  return () => {
+    socket.onclose = null;
+    socket.close();
+  };
+};
 
 export const submitLoanApplication = async (formData) => {
   const response = await fetch(`${API_BASE_URL}/loans`, {
@@ -12,10 +27,47 @@ export const submitLoanApplication = async (formData) => {
   return response.json();
 };
 
+export const uploadDocument = async (file) => {
+  const body = new FormData();
+  body.append("file", file);
+  const response = await fetch(`${API_BASE_URL}/documents`, {
+    method: "POST",
+    body,
+  });
+  if (!response.ok) throw new Error("Document upload failed");
+  return response.json();
+};
+
+// Last full record per loan, so polls only fetch what changed since its version
+const loanSnapshots = {};
+
 export const checkLoanStatus = async (loanId) => {
-  const response = await fetch(`${API_BASE_URL}/loans/${loanId}`);
+  const cached = loanSnapshots[loanId];
+  const url = cached
+    ? `${API_BASE_URL}/loans/${loanId}?since=${cached.version}`
+    : `${API_BASE_URL}/loans/${loanId}`;
+  const response = await fetch(url, {
+    headers: cached ? { "If-None-Match": `"${cached.version}"` } : {},
+  });
+  if (response.status === 304) return cached;
   if (!response.ok) throw new Error("Status check failed");
-  return response.json();
+
+  const body = await response.json();
+  const record =
+    cached && body.changed
+      ? {
+          ...cached,
+          ...body.changed,
+          version: body.version,
+          // Entries appended mid-stage have no version yet; the delta resends them
+          timeline: [
+            ...cached.timeline.filter((entry) => entry.version <= body.since),
+            ...body.timeline,
+          ],
+        }
+      : body;
+  loanSnapshots[loanId] = record;
+  return record;
 };
 
 export const sendChatMessage = async (loanId, message) => {
@@ -47,4 +99,55 @@ export const sendChatbotMessage = async (message, conversationHistory, collected
   });
   if (!response.ok) throw new Error("Chatbot message failed");
   return response.json();
-};
\ No newline at end of file
+};
+
+// Streams the chatbot reply over server-sent events. onToken is called with
+// the text received so far; resolves with the same payload as /chatbot.
+// History and collected fields live server-side under sessionId (null on the
+// first turn; the server returns one in the final payload).
+export const streamChatbotMessage = async (message, sessionId, onToken) => {
+  const response = await fetch(`${API_BASE_URL}/chatbot/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      message: message,
+      session_id: sessionId,
+    }),
+  });
+  if (!response.ok || !response.body) throw new Error("Chatbot message failed");
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let text = "";
+  let result = null;
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) >= 0) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      const eventName = rawEvent.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(rawEvent.match(/^data: (.*)$/m)?.[1] || "{}");
+      if (eventName === "token") {
+        text += data.text;
+        onToken?.(text);
+      } else if (eventName === "done") {
+        result = data;
+      } else if (eventName === "error") {
+        // The reply broke off partway; the text so far is incomplete
+        throw new Error(data.message || "Chatbot stream failed");
+      }
+    }
+  }
+
+  if (!result) throw new Error("Chatbot stream ended early");
+  return result;
+};
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from "react";
 import { useNavigate, useLocation } from "react-router-dom";
 import DocumentUpload from "./DocumentUpload";
+import { uploadDocument } from "../api";
 
 const ApplicationForm = ({ onSubmit, isLoading }) => {
   const navigate = useNavigate();
@@ -73,7 +74,7 @@ const ApplicationForm = ({ onSubmit, isLoading }) => {
     }
   };
 
-  const handleSubmit = (e) => {
+  const handleSubmit = async (e) => {
     e.preventDefault();
 
     if (!formData.agreeToTerms) {
@@ -95,13 +96,23 @@ const ApplicationForm = ({ onSubmit, isLoading }) => {
       uploadedDocuments.salarySlips ? `Salary Slips: ${uploadedDocuments.salarySlips.name}` : null,
     ].filter(Boolean).join(", ");
 
+    // The PAN card is uploaded so KYC can read it and cross-check the PAN
+    let documentId = null;
+    try {
+      const uploaded = await uploadDocument(uploadedDocuments.pan);
+      documentId = uploaded.document_id;
+    } catch (error) {
+      console.error("PAN document upload failed", error);
+    }
+
     const submissionData = {
       name: formData.fullName,
       pan: formData.pan,
       income: parseFloat(formData.income),
       amount: parseFloat(formData.amount),
       purpose: formData.purpose,
-      document_name: documentSummary || "Documents uploaded"
+      document_name: documentSummary || "Documents uploaded",
+      document_id: documentId,
     };
 
     console.log("Submitting application with documents:", submissionData);
@@ -1,5 +1,5 @@
 import React, { useState, useRef, useEffect } from "react";
-import { sendChatbotMessage } from "../api";
+import { streamChatbotMessage } from "../api";
 
 /*
  * ChatbotAssistant - Full conversational loan application assistant
@@ -17,6 +17,7 @@ const ChatbotAssistant = ({ onComplete, onBack }) => {
   ]);
   const [inputMessage, setInputMessage] = useState("");
   const [isTyping, setIsTyping] = useState(false);
+  const [sessionId, setSessionId] = useState(null);
   const [collectedData, setCollectedData] = useState({
     fullName: "",
     email: "",
@@ -97,23 +98,28 @@ const ChatbotAssistant = ({ onComplete, onBack }) => {
     setIsTyping(true);
 
     try {
-      // Call Gemini-powered chatbot
-      const response = await sendChatbotMessage(
+      // Call Gemini-powered chatbot, showing the reply as it streams in
+      const botMessageId = messages.length + 2;
+      const showBotText = (text, timestamp = new Date().toISOString()) => {
+        setIsTyping(false);
+        setMessages((prev) => {
+          const botMessage = { id: botMessageId, sender: "bot", text, timestamp };
+          const exists = prev.some((m) => m.id === botMessageId);
+          return exists
+            ? prev.map((m) => (m.id === botMessageId ? botMessage : m))
+            : [...prev, botMessage];
+        });
+      };
+
+      const response = await streamChatbotMessage(
         messageText,
-        messages,
-        collectedData
+        sessionId,
+        (partialText) => showBotText(partialText)
       );
+      setSessionId(response.session_id);
 
-      setIsTyping(false);
-
-      // Add bot response
-      const botMessage = {
-        id: messages.length + 2,
-        sender: "bot",
-        text: response.response,
-        timestamp: response.timestamp,
-      };
-      setMessages((prev) => [...prev, botMessage]);
+      // Final text (falls back to the server's default when only a field was collected)
+      showBotText(response.response, response.timestamp);
 
       // If Gemini collected data, update state
       if (response.collected_field && response.collected_value) {
@@ -4,63 +4,110 @@ import time
 from datetime import datetime
 from typing import Dict, Any
 
+from backend.util.documents import document_path, document_filename, extract_text, get_document_pool, normalize_text, name_matches
+from backend.util.events import publish_event
+from backend.util.log import get_logger
+from backend.util.metrics import KYC_STEP_DURATION
+
+logger = get_logger("kyc")
+
 PAN_REGEX = r"^[A-Z]{5}[0-9]{4}[A-Z]$"
 
 def now_iso() -> str:
     return datetime.utcnow().isoformat()
 
-def run_kyc_check(loan: Dict[str, Any]) -> None:
+def log_step(loan: Dict[str, Any], step: str, detail: str) -> None:
+    entry = {"step": step, "detail": detail, "time": now_iso()}
+    loan["timeline"].append(entry)
+    publish_event(loan, "timeline", entry=entry)
+
+def verify_kyc(loan: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Enhanced KYC with OCR simulation and live status updates
+    KYC against the uploaded document.
+    Text extraction (PDF text layer / OCR) runs in the shared process pool while
+    the PAN format is checked here; each step is logged to the timeline as it
+    actually finishes. Returns the result without touching the loan status.
     """
-    # Step 1: Document Upload Received
-    loan["timeline"].append({
-        "step": "Document Received",
-        "detail": "Document uploaded successfully. Starting verification...",
-        "time": now_iso(),
-    })
-    time.sleep(0.5)  # Simulate processing time
-    
-    # Step 2: OCR Processing
-    doc_name = loan["data"].get("document_name", "document.pdf")
-    loan["timeline"].append({
-        "step": "OCR Processing",
-        "detail": f"Extracting text from '{doc_name}' using OCR...",
-        "time": now_iso(),
-    })
-    time.sleep(1)  # Simulate OCR processing
-    
-    # Step 3: PAN Validation
+    document_id = loan["data"].get("document_id")
+    path = document_path(document_id)
+    doc_name = document_filename(document_id) or loan["data"].get("document_name") or "document.pdf"
+
+    # Step 1: Document Upload Received - start extraction straight away
+    extraction = None
+    started = time.perf_counter()
+    if path:
+        extraction = get_document_pool().submit(extract_text, path)
+        log_step(loan, "Document Received", f"Document '{doc_name}' received. Starting verification...")
+    else:
+        log_step(loan, "Document Received", "No document file uploaded; verifying application details only.")
+
+    # Step 2: PAN format validation (runs while the document is being read)
+    step_started = time.perf_counter()
     pan = loan["data"]["pan"].upper().strip()
-    pan_valid = bool(re.match(PAN_REGEX, pan))
-    
-    loan["timeline"].append({
-        "step": "PAN Verification",
-        "detail": f"Verifying PAN number: {pan}...",
-        "time": now_iso(),
-    })
-    time.sleep(0.8)
-    
+    pan_format_valid = bool(re.match(PAN_REGEX, pan))
+    KYC_STEP_DURATION.labels("pan_format").observe(time.perf_counter() - step_started)
+    log_step(
+        loan,
+        "PAN Verification",
+        f"PAN {pan} format {'valid' if pan_format_valid else 'invalid'}.",
+    )
+
+    # Step 3: Text extraction result
+    text = ""
+    if extraction is not None:
+        try:
+            extracted = extraction.result()
+            text = extracted["text"]
+            if extracted["method"] == "unsupported":
+                log_step(loan, "OCR Processing", f"No text extractor available for '{doc_name}'.")
+            else:
+                log_step(
+                    loan,
+                    "OCR Processing",
+                    f"Extracted {len(text)} characters from {extracted['pages']} page(s) via {extracted['method'].replace('_', ' ')}.",
+                )
+        except Exception as e:
+            logger.warning("KYC text extraction failed", extra={"loan_id": loan.get("loan_id"), "document": doc_name, "error": str(e)})
+            log_step(loan, "OCR Processing", f"Could not read '{doc_name}'.")
+        # Measured from submission, so it includes time queued for a pool process
+        KYC_STEP_DURATION.labels("text_extraction").observe(time.perf_counter() - started)
+
+    # Step 4: Cross-check the document against the application
+    pan_in_document = None
+    name_in_document = None
+    if text.strip():
+        step_started = time.perf_counter()
+        pan_in_document = normalize_text(pan) in normalize_text(text)
+        name_in_document = name_matches(loan["data"]["name"], text)
+        KYC_STEP_DURATION.labels("document_match").observe(time.perf_counter() - step_started)
+        log_step(
+            loan,
+            "Document Verification",
+            f"PAN {'found' if pan_in_document else 'not found'} in document; "
+            f"name {'matches' if name_in_document else 'does not match'}.",
+        )
+
+    # Step 5: Final KYC Status. A document that contradicts the PAN or the
+    # applicant's name fails KYC; without readable text only the PAN format can be checked.
+    pan_valid = pan_format_valid and pan_in_document is not False and name_in_document is not False
     if pan_valid:
-        pan_msg = "PAN verified successfully"
+        pan_msg = "PAN verified successfully" if pan_in_document else "PAN format verified"
+    elif pan_format_valid and pan_in_document and name_in_document is False:
+        pan_msg = "Name on the document does not match the application (proceeding with manual review)"
     else:
-        pan_msg = "PAN format invalid (proceeding with manual review)"
-    
-    # Step 4: Document Authenticity Check
-    loan["timeline"].append({
-        "step": "Document Verification",
-        "detail": "Checking document authenticity and extracting details...",
-        "time": now_iso(),
-    })
-    time.sleep(1)
-    
-    # Step 5: Final KYC Status
-    detail = f"KYC completed – {pan_msg}. Document '{doc_name}' verified."
-    
-    loan["timeline"].append({
-        "step": "KYC Check Complete",
-        "detail": detail,
-        "time": now_iso(),
-    })
+        pan_msg = "PAN could not be verified (proceeding with manual review)"
 
+    log_step(loan, "KYC Check Complete", f"KYC completed – {pan_msg}.")
+
+    return {
+        "pan_valid": pan_valid,
+        "document_checked": bool(text.strip()),
+        "pan_in_document": pan_in_document,
+        "name_in_document": name_in_document,
+    }
+
+def run_kyc_check(loan: Dict[str, Any]) -> None:
+    """Run KYC and mark the loan kyc_completed"""
+    loan["kyc"] = verify_kyc(loan)
     loan["status"] = "kyc_completed"
+    publish_event(loan, "status", status=loan["status"])
@@ -1,44 +1,91 @@
 # main.py
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Union
+import asyncio
+import copy
+import itertools
+import json
+import os
 import uuid
 
-# Import BackgroundTasks and WebSocket
-from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
+# Import WebSocket
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 
 from models import LoanRequest
-from pipeline import create_empty_loan_record, run_pipeline
-from pydantic import BaseModel
-from backend.util.llm import chat_with_grok
+from pipeline import create_empty_loan_record, run_pipeline, run_pipeline_job
+from underwriting import score_batch, DEFAULT_ANNUAL_RATE, DEFAULT_YEARS, DEFAULT_RATIO_THRESHOLD
+from policy import PolicyEngine
+from amortization import amortization_rows, SCHEDULE_FIELDS
+from pydantic import BaseModel, confloat, conlist
+from backend.util.llm import achat_with_grok, astream_chat_with_grok, close_async_llm_client, StreamInterrupted
+from backend.agents.chatbot import build_chatbot_messages, parse_collected, CollectedLineFilter, COLLECTED_MARKER
+from backend.agents.extractors import local_reply, local_extraction_enabled
+from backend.util.llm_cache import get_response_cache
+from backend.util.cassette import get_cassette
+from backend.util.chat_sessions import get_chat_session_store
+from backend.util.documents import save_document
+from backend.util.job_queue import PipelineJobQueue, QueueFullError, PRIORITY_LANES
+from backend.util.loan_store import SQLiteLoanStore, create_loan_store, decode_cursor, changes_since
+from backend.util.export import EXPORT_FORMATS, parse_fields, ndjson_rows, csv_rows
+from backend.util.events import get_event_bus, publish_event, MANAGER_CHANNEL
+from backend.util.broker import multi_worker
+from backend.util.metrics import render_metrics, QUEUE_DEPTH, QUEUE_RUNNING
+from backend.util.log import get_logger, stop_logging
 
 class ChatMessage(BaseModel):
     loan_id: str
     message: str
 
 app = FastAPI()
+logger = get_logger("api")
 
 # WebSocket connection manager
 class ConnectionManager:
+    """
+    Bridges WebSockets to the event bus. Every socket gets its own subscription,
+    so any number of tabs can follow the same loan (or the manager channel).
+    """
+
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+        self.bus = get_event_bus()
 
-    async def connect(self, websocket: WebSocket, loan_id: str):
+    async def stream(self, websocket: WebSocket, channel: str, on_message=None):
+        """Push coalesced event batches to the socket until it disconnects"""
         await websocket.accept()
-        self.active_connections[loan_id] = websocket
-
-    def disconnect(self, loan_id: str):
-        if loan_id in self.active_connections:
-            del self.active_connections[loan_id]
-
-    async def send_update(self, loan_id: str, message: dict):
-        if loan_id in self.active_connections:
+        subscription = self.bus.subscribe(channel)
+        sender = asyncio.create_task(self._send_events(websocket, subscription))
+        try:
+            while True:
+                text = await websocket.receive_text()
+                if on_message:
+                    await on_message(text)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
+            self.bus.unsubscribe(subscription)
+
+    async def _send_events(self, websocket: WebSocket, subscription):
+        dropped = 0
+        while True:
+            events = await subscription.next_batch(self.bus.coalesce_window)
+            message = {"events": events}
+            if subscription.dropped != dropped:
+                # Tell the client it missed events so it can refetch the record
+                message["dropped"] = subscription.dropped - dropped
+                dropped = subscription.dropped
             try:
-                await self.active_connections[loan_id].send_json(message)
-            except:
-                self.disconnect(loan_id)
+                await websocket.send_json(message)
+            except Exception:
+                return
 
 manager = ConnectionManager()
 
+@app.on_event("shutdown")
+async def shutdown_llm_client():
+    await close_async_llm_client()
+
 # Add CORS middleware to allow frontend to communicate with backend
 app.add_middleware(
     CORSMiddleware,
@@ -48,70 +95,244 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-LOANS: Dict[str, Dict[str, Any]] = {}
+# All loan state goes through the store (LOAN_STORE=memory|sqlite)
+loan_store = create_loan_store()
+policy_engine = PolicyEngine(loan_store)
 
-@app.post("/loans")
-def create_loan(req: LoanRequest, background_tasks: BackgroundTasks):
+def save_loan(loan_id: str, loan_record: Dict[str, Any]) -> None:
+    """Persist a record and tell subscribers which version is now readable"""
+    loan_store.put(loan_id, loan_record)
+    get_event_bus().publish(
+        loan_id,
+        {"type": "loan_updated", "status": loan_record["status"], "version": loan_record.get("version", 0)},
+    )
+
+def process_loan_job(loan_id: str, payload: Dict[str, Any], checkpoint) -> None:
     """
-    Now accepts background_tasks to run AI without blocking.
+    Thread-mode job handler; a recovered job resumes from the stored record's
+    checkpoints. The memory store doesn't survive a restart, so with it the
+    record is also checkpointed into the job queue's file.
     """
-    loan_id = str(uuid.uuid4())
-    loan_record = create_empty_loan_record(req)
-
-    LOANS[loan_id] = loan_record
+    loan_record = loan_store.get(loan_id)
+    if loan_record is None:
+        loan_record = payload["record"]
+        save_loan(loan_id, loan_record)
+
+    def on_update(record):
+        save_loan(loan_id, record)
+        if not isinstance(loan_store, SQLiteLoanStore):
+            checkpoint({"record": record})
+
+    run_pipeline(loan_record, on_update=on_update)
+
+def store_loan_job_result(loan_id: str, loan_record: Optional[Dict[str, Any]]) -> None:
+    # Process workers hand back the finished record; thread workers save as they go
+    if loan_record is not None:
+        save_loan(loan_id, loan_record)
+
+def build_pipeline_queue() -> PipelineJobQueue:
+    mode = os.getenv("PIPELINE_WORKER_MODE", "thread")
+    return PipelineJobQueue(
+        handler=run_pipeline_job if mode == "process" else process_loan_job,
+        workers=int(os.getenv("PIPELINE_WORKERS", "4")),
+        mode=mode,
+        max_depth=int(os.getenv("PIPELINE_QUEUE_MAX", "1000")),
+        db_path=os.getenv("PIPELINE_QUEUE_DB", "pipeline_jobs.sqlite3") or None,
+        on_result=store_loan_job_result,
+    )
+
+pipeline_queue = build_pipeline_queue()
+QUEUE_DEPTH.set_function(pipeline_queue.depth)
+QUEUE_RUNNING.set_function(lambda: pipeline_queue.stats()["running"])
+
+def recover_interrupted_pipelines() -> int:
+    """
+    Re-queue stored loans whose pipeline never finished and that the durable job
+    queue didn't already recover; they resume from their checkpoints. Under
+    several workers only the job queue's claim-by-owner recovery is used, so
+    two workers can't both pick up the same loan.
+    """
+    if multi_worker():
+        return 0
+    recovered = 0
+    for loan_id, record in loan_store.unfinished():
+        if pipeline_queue.has_job(loan_id):
+            continue
+        try:
+            pipeline_queue.submit(loan_id, {"record": record}, priority="high")
+        except QueueFullError:
+            logger.warning("Queue full during recovery; the rest wait for the next start", extra={"recovered": recovered})
+            return recovered
+        recovered += 1
+    if recovered:
+        logger.info("Re-queued interrupted pipelines", extra={"recovered": recovered})
+    return recovered
+
+@app.on_event("startup")
+def start_pipeline_queue():
+    if pipeline_queue.db_path is None and not isinstance(loan_store, SQLiteLoanStore):
+        logger.warning("Neither the loan store nor the job queue is on disk; pipelines interrupted by a restart are lost")
+    pipeline_queue.start()
+    recover_interrupted_pipelines()
+
+@app.on_event("shutdown")
+def stop_pipeline_queue():
+    pipeline_queue.stop(wait=False)
+    loan_store.close()
+    stop_logging()
 
-    # --- THE CHANGE ---
-    # Instead of running it NOW, we schedule it for immediately after return.
-    background_tasks.add_task(run_pipeline, loan_record)
+@app.post("/loans")
+def create_loan(req: LoanRequest, priority: str = "normal"):
+    """
+    Queues the AI pipeline on the dedicated worker pool instead of running it here.
+    Returns 429 when the queue is full so a burst can't starve the API itself.
+    """
+    if priority not in PRIORITY_LANES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {list(PRIORITY_LANES)}")
 
-    return {
+    loan_id = str(uuid.uuid4())
+    loan_record = create_empty_loan_record(req, loan_id)
+    # Saved before the job exists, and the job gets its own copy: a worker
+    # mutating the record can't race the version stamp or this response
+    save_loan(loan_id, loan_record)
+    response = {
         "loan_id": loan_id,
         "status": "processing", # Initial status is processing
         "explanation": "Our AI agents are analyzing your file...",
-        "timeline": loan_record["timeline"],
+        "timeline": copy.deepcopy(loan_record["timeline"]),
     }
 
+    try:
+        response["queue_position"] = pipeline_queue.submit(loan_id, {"record": copy.deepcopy(loan_record)}, priority=priority)
+    except QueueFullError as e:
+        loan_store.delete(loan_id)
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(e), "status": "queue_full"},
+            headers={"Retry-After": "5"},
+        )
+
+    return response
+
+@app.get("/debug/queue")
+def debug_queue():
+    """Pipeline job queue depth and worker usage"""
+    return pipeline_queue.stats()
+
+@app.post("/documents")
+async def upload_document(file: UploadFile = File(...)):
+    """Store a KYC document; pass the returned document_id in POST /loans"""
+    try:
+        document_id = save_document(file.filename, await file.read())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"document_id": document_id, "document_name": file.filename}
+
+@app.get("/loans/export")
+def export_loans(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[str] = None,
+    batch_size: int = Query(500, ge=1, le=5000),
+):
+    """
+    Stream the loan book in submission order as NDJSON or CSV.
+    fields picks columns (dotted paths such as data.amount), status/since/until
+    filter by status and submission time (ISO, until exclusive). Every row carries
+    a cursor; pass the last one received to resume an interrupted export.
+    """
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    rows = loan_store.scan(status=status, since=since, until=until, cursor=cursor, batch_size=batch_size)
+    render = csv_rows if format == "csv" else ndjson_rows
+    return StreamingResponse(
+        render(rows, parse_fields(fields)),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=loans.{format}"},
+    )
+
 @app.get("/loans/{loan_id}")
-def get_loan(loan_id: str):
-    print(f"GET /loans/{loan_id} - Available loans: {list(LOANS.keys())}")
-    loan = LOANS.get(loan_id)
+def get_loan(loan_id: str, request: Request, since: Optional[int] = Query(None, ge=0)):
+    """
+    Loan record with an ETag of its version; If-None-Match with the current
+    version gets an empty 304. With since=<version> only the fields and timeline
+    entries changed after that version are returned.
+    """
+    loan = loan_store.get(loan_id)
     if not loan:
-        print(f"Loan {loan_id} not found in {list(LOANS.keys())}")
         raise HTTPException(status_code=404, detail="Loan not found")
-    
-    print(f"GET /loans/{loan_id} - Returning: {loan}")
-    return loan
+
+    etag = f'"{loan.get("version", 0)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    # A since newer than the record (e.g. the store was reset) gets the full record
+    if since is not None and since <= loan.get("version", 0):
+        return JSONResponse(changes_since(loan, since), headers=headers)
+    return JSONResponse(loan, headers=headers)
+
+@app.get("/loans/{loan_id}/schedule")
+def get_repayment_schedule(
+    loan_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    annual_rate: float = Query(DEFAULT_ANNUAL_RATE, ge=0, le=1),
+    years: float = Query(DEFAULT_YEARS, gt=0, le=30),
+):
+    """Month-by-month repayment schedule, streamed as it is computed"""
+    loan = loan_store.get(loan_id)
+    if not loan:
+        raise HTTPException(status_code=404, detail="Loan not found")
+
+    rows = amortization_rows(float(loan["data"]["amount"]), annual_rate, years)
+    if format == "csv":
+        lines = (",".join(str(row[field]) for field in SCHEDULE_FIELDS) + "\n" for row in rows)
+        body = itertools.chain([",".join(SCHEDULE_FIELDS) + "\n"], lines)
+    else:
+        body = (json.dumps(row) + "\n" for row in rows)
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[format])
+
+@app.websocket("/ws/manager")
+async def manager_websocket(websocket: WebSocket):
+    """Every loan's events, for the manager dashboard"""
+    await manager.stream(websocket, MANAGER_CHANNEL)
 
 @app.websocket("/ws/{loan_id}")
 async def websocket_endpoint(websocket: WebSocket, loan_id: str):
-    await manager.connect(websocket, loan_id)
-    try:
-        while True:
-            # Keep connection alive and send updates when loan status changes
-            data = await websocket.receive_text()
-            
-            # Send current loan status
-            loan = LOANS.get(loan_id)
-            if loan:
-                await websocket.send_json(loan)
-    except WebSocketDisconnect:
-        manager.disconnect(loan_id)
+    """
+    Pushes {"events": [...]} batches as the pipeline and manager act on the loan.
+    loan_updated events carry the stored version to fetch with GET /loans/{id}?since=.
+    Sending any message still returns the current record.
+    """
+    async def send_current(_text):
+        loan = loan_store.get(loan_id)
+        if loan:
+            await websocket.send_json(loan)
+
+    await manager.stream(websocket, loan_id, on_message=send_current)
 
 @app.post("/chat")
 async def chat_with_manager(chat_msg: ChatMessage):
     """
     Chat endpoint for user to communicate with AI manager
     """
-    loan = LOANS.get(chat_msg.loan_id)
+    loan = loan_store.get(chat_msg.loan_id)
     if not loan:
         raise HTTPException(status_code=404, detail="Loan not found")
     
     # Import manager agent
     try:
-        from backend.agents.manager import generate_manager_response
+        from backend.agents.manager import agenerate_manager_response
         
-        # Generate AI manager response
-        response_text = generate_manager_response(
+        # Generate AI manager response without blocking the event loop
+        response_text = await agenerate_manager_response(
             loan_data=loan["data"],
             user_message=chat_msg.message,
             chat_history=[]  # TODO: Implement chat history storage
@@ -121,8 +342,8 @@ async def chat_with_manager(chat_msg: ChatMessage):
             "response": response_text,
             "timestamp": datetime.utcnow().isoformat()
         }
-    except Exception as e:
-        print(f"Chat error: {e}")
+    except Exception:
+        logger.exception("Manager chat failed", extra={"loan_id": chat_msg.loan_id})
         return {
             "response": "Thank you for your message. I'm reviewing your application and will respond shortly.",
             "timestamp": datetime.utcnow().isoformat()
@@ -130,8 +351,22 @@ async def chat_with_manager(chat_msg: ChatMessage):
 
 class ChatbotMessage(BaseModel):
     message: str
-    conversation_history: list
-    collected_data: dict
+    # New clients send only session_id (omitted on the first turn);
+    # legacy clients keep sending the full history and collected data.
+    session_id: Optional[str] = None
+    conversation_history: Optional[list] = None
+    collected_data: Optional[dict] = None
+
+def open_chat_session(msg: ChatbotMessage):
+    """Return (session, history, collected_data) for this turn; session is None for legacy clients"""
+    if msg.session_id is None and msg.conversation_history is not None:
+        return None, msg.conversation_history, msg.collected_data or {}
+    
+    store = get_chat_session_store()
+    session = store.get(msg.session_id) if msg.session_id else None
+    if session is None:
+        session = store.create(msg.conversation_history, msg.collected_data)
+    return session, list(session.history), session.collected_data
 
 @app.post("/chatbot")
 async def chatbot_assistant(msg: ChatbotMessage):
@@ -139,129 +374,164 @@ async def chatbot_assistant(msg: ChatbotMessage):
     Chatbot assistant for loan application
     Uses Gemini to intelligently guide users through the application
     """
+    session, history, collected_data = open_chat_session(msg)
+    session_id = session.session_id if session else None
+    
     try:
+        # Plain answers (email, phone, PAN, amounts, tenure...) are handled locally
+        local = local_reply(msg.message, collected_data) if local_extraction_enabled() else None
         
-        # Build context
-        context = f"""
-You are a helpful AI loan application assistant for OpenCred, a digital lending platform. Your role is to ease the entire loan application process and minimize the time customers spend on paperwork.
-
-INTRODUCTION (if this is the first interaction):
-- Introduce yourself as OpenCred's AI loan assistant
-- Explain that you'll guide them through a simple, automated loan application process
-- Mention that this will save them time compared to traditional bank visits
-- Ask about their loan needs and reassure them that the process is secure and fast
-
-PERSONALITY & APPROACH:
-- Be warm, professional, and genuinely helpful
-- Show enthusiasm about helping them achieve their financial goals
-- Be persuasive about the benefits of digital lending (speed, convenience, transparency)
-- Address concerns proactively but never be pushy or forceful
-- Use encouraging language and celebrate small wins during the process
-- If they seem hesitant, gently explain how you can help and the advantages
-
-INFORMATION TO COLLECT (in natural conversation flow):
-1. Full Name (accept any format)
-2. Email Address 
-3. Phone Number
-4. PAN Number (accept ANY format - no validation needed)
-5. Complete Address (accept any address format)
-6. Employment Type (Salaried/Self-Employed/Business Owner)
-7. Monthly Income (in rupees)
-8. Loan Amount Needed (in rupees)
-9. Loan Purpose (be supportive of their goals)
-10. Loan Tenure (12/24/36/48/60 months)
-11. Document Confirmation (ONLY ask this AFTER collecting ALL above information)
-
-Already collected: {msg.collected_data}
-
-Conversation so far:
-{format_conversation(msg.conversation_history)}
-
-User's message: {msg.message}
-
-RESPONSE GUIDELINES:
-1. If collecting information, respond with: "COLLECTED: field_name: value" followed by encouraging next steps
-2. For PAN: Accept ANY format without validation
-3. For document confirmation (ONLY ask after collecting ALL 10 pieces of information above):
-   - Ask: "Great! Now I need to confirm - do you have all 4 required documents ready? (PAN Card, Aadhaar Card, Bank Statement for last 3 months, Salary Slips for last 3 months)"
-   - If YES: respond EXACTLY with "COLLECTED: documentsConfirmed: yes" followed by "Perfect! I'll redirect you to the document upload page now."
-   - If NO: Explain why each document is needed and encourage them to gather documents first
-   - NEVER provide links or URLs. The system will handle the redirect automatically.
-4. Answer questions thoroughly and relate back to how it helps their application
-5. Be conversational - use their name when you have it
-6. Show progress ("Great! We're halfway through" etc.)
-7. Extract numbers from natural language (e.g., "50000 rupees" → 50000)
-8. If they express doubts, address them with benefits: speed, security, transparency, no branch visits needed
-
-CRITICAL: NEVER mention links, URLs, placeholders, or external pages. When documents are confirmed, just say you'll redirect them and the system will handle it automatically.
-
-Remember: You're here to make their loan journey smooth and stress-free. Be their trusted guide through this important financial decision.
-"""
-        
-        # Send to Grok via OpenRouter
-        messages = [{"role": "system", "content": context}]
-        
-        # Add conversation history (last 2 messages to save tokens)
-        recent_history = msg.conversation_history[-2:] if len(msg.conversation_history) > 2 else msg.conversation_history
-        for hist_msg in recent_history:
-            role = "user" if hist_msg.get("sender") == "user" else "assistant"
-            messages.append({"role": role, "content": hist_msg.get("text", "")})
-        
-        # Add current message
-        messages.append({"role": "user", "content": msg.message})
-        
-        response_text = chat_with_grok(messages, model="google/gemini-2.5-flash")
-        
-        print(f"[Chatbot] User: {msg.message}")
-        print(f"[Chatbot] Grok response: {response_text}")
-        
-        # Parse if Gemini collected data
-        collected_field = None
-        collected_value = None
+        if local:
+            response_text, collected_field, collected_value = local
+        else:
+            messages = build_chatbot_messages(msg.message, history, collected_data)
+            
+            response_text = await achat_with_grok(messages, model="google/gemini-2.5-flash", prompt_type="chatbot")
+            
+            logger.debug("Chatbot reply", extra={"session_id": session_id, "chars": len(response_text)})
+            
+            # Parse if Gemini collected data
+            response_text, collected_field, collected_value = parse_collected(response_text)
         
-        if "COLLECTED:" in response_text:
-            try:
-                parts = response_text.split("COLLECTED:", 1)[1].split("\n", 1)
-                if len(parts) > 0:
-                    field_value = parts[0].strip()
-                    if ":" in field_value:
-                        collected_field, collected_value = field_value.split(":", 1)
-                        collected_field = collected_field.strip()
-                        collected_value = collected_value.strip()
-                        print(f"[Chatbot] Collected {collected_field} = {collected_value}")
-                        # Remove the COLLECTED line from response
-                        response_text = parts[1].strip() if len(parts) > 1 else "Got it! What's next?"
-            except Exception as e:
-                print(f"[Chatbot] Parse error: {e}")
-                pass
+        if session:
+            session.record_turn(msg.message, response_text, collected_field, collected_value)
+            get_chat_session_store().save(session)
         
         return {
             "response": response_text.strip(),
             "collected_field": collected_field,
             "collected_value": collected_value,
+            "session_id": session_id,
             "timestamp": datetime.utcnow().isoformat()
         }
         
-    except Exception as e:
-        print(f"Chatbot error: {e}")
+    except Exception:
+        logger.exception("Chatbot turn failed", extra={"session_id": session_id})
         return {
             "response": "I'm having trouble processing that. Could you please try again?",
             "collected_field": None,
             "collected_value": None,
+            "session_id": session_id,
             "timestamp": datetime.utcnow().isoformat()
         }
 
-def format_conversation(history):
-    if not history or len(history) == 0:
-        return "No previous conversation"
-    
-    formatted = []
-    # Only last 2 messages to minimize API calls
-    for msg in history[-2:]:
-        sender = "User" if msg.get('sender') == 'user' else "Assistant"
-        formatted.append(f"{sender}: {msg.get('text', '')}")
-    
-    return "\n".join(formatted)
+@app.delete("/chatbot/sessions/{session_id}")
+def end_chatbot_session(session_id: str):
+    """Drop a finished chatbot session"""
+    get_chat_session_store().delete(session_id)
+    return {"message": "Session closed"}
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chatbot/stream")
+async def chatbot_assistant_stream(msg: ChatbotMessage):
+    """
+    Streaming variant of /chatbot (server-sent events).
+    Emits "token" events as the model generates, a "collected" event when a
+    COLLECTED line is detected (the line itself is never forwarded), and a
+    final "done" event carrying the same payload /chatbot would return. If the
+    model stream breaks partway, an "error" event ends the stream instead and
+    the turn is not recorded.
+    """
+    session, history, collected_data = open_chat_session(msg)
+    session_id = session.session_id if session else None
+    local = local_reply(msg.message, collected_data) if local_extraction_enabled() else None
+    messages = None if local else build_chatbot_messages(msg.message, history, collected_data)
+
+    async def local_stream():
+        # Replay the locally built reply in the streamed shape
+        text, field, value = local
+        yield f"{COLLECTED_MARKER} {field}: {value}\n{text}"
+
+    async def events():
+        line_filter = CollectedLineFilter()
+        shown = []
+        collected_field = None
+        collected_value = None
+        deltas = local_stream() if local else astream_chat_with_grok(messages, model="google/gemini-2.5-flash", prompt_type="chatbot")
+
+        try:
+            async for delta in deltas:
+                text = line_filter.feed(delta)
+                collected = line_filter.take_collected()
+                if collected:
+                    collected_field, collected_value = collected
+                    yield sse_event("collected", {"field": collected_field, "value": collected_value})
+                if text:
+                    shown.append(text)
+                    yield sse_event("token", {"text": text})
+        except StreamInterrupted:
+            yield sse_event("error", {"message": "The reply was interrupted. Please try again.", "session_id": session_id})
+            return
+
+        text = line_filter.finish()
+        collected = line_filter.take_collected()
+        if collected:
+            collected_field, collected_value = collected
+            yield sse_event("collected", {"field": collected_field, "value": collected_value})
+        if text:
+            shown.append(text)
+            yield sse_event("token", {"text": text})
+
+        response_text = "".join(shown).strip()
+        if not response_text and collected_field:
+            response_text = "Got it! What's next?"
+
+        if session:
+            session.record_turn(msg.message, response_text, collected_field, collected_value)
+            get_chat_session_store().save(session)
+
+        yield sse_event("done", {
+            "response": response_text,
+            "collected_field": collected_field,
+            "collected_value": collected_value,
+            "session_id": session_id,
+            "timestamp": datetime.utcnow().isoformat(),
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+class UnderwritingBatch(BaseModel):
+    income: List[confloat(ge=0)]  # monthly income per loan
+    amount: List[confloat(ge=0)]
+    annual_rate: Union[confloat(ge=0, le=1), List[confloat(ge=0, le=1)]] = DEFAULT_ANNUAL_RATE
+    years: Union[confloat(gt=0, le=30), List[confloat(gt=0, le=30)]] = DEFAULT_YEARS
+    ratio_threshold: confloat(ge=0) = DEFAULT_RATIO_THRESHOLD
+
+@app.post("/underwriting/batch")
+def underwrite_batch(batch: UnderwritingBatch):
+    """
+    Score many loans in one vectorized pass. annual_rate and years can be one
+    value for the whole batch or one per loan.
+    """
+    try:
+        scored = score_batch(batch.income, batch.amount, batch.annual_rate, batch.years, batch.ratio_threshold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "count": len(batch.income),
+        "emi": scored["emi"].round(2).tolist(),
+        "ratio": scored["ratio"].round(4).tolist(),
+        "decision": scored["decision"].tolist(),
+    }
+
+class PolicySweep(BaseModel):
+    thresholds: conlist(confloat(ge=0), min_length=1) = [DEFAULT_RATIO_THRESHOLD]
+    annual_rates: conlist(confloat(ge=0, le=1), min_length=1) = [DEFAULT_ANNUAL_RATE]
+    years: conlist(confloat(gt=0, le=30), min_length=1) = [DEFAULT_YEARS]
+
+@app.post("/analysis/policy-sweep")
+def policy_sweep(sweep: PolicySweep):
+    """
+    What-if: approvals, approved volume and EMI spread across the stored book for
+    every combination of ratio threshold, rate and tenure. Results are cached
+    until a loan is added, changed or deleted.
+    """
+    try:
+        return policy_engine.sweep(sweep.thresholds, sweep.annual_rates, sweep.years)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 class ManagerDecision(BaseModel):
     loan_id: str
@@ -270,36 +540,83 @@ class ManagerDecision(BaseModel):
 
 @app.get("/debug/loans")
 def debug_loans():
-    """Debug endpoint to see all loans"""
-    return {"total_loans": len(LOANS), "loan_ids": list(LOANS.keys()), "loans": LOANS}
+    """Loan counts by status; use /loans/export for the records themselves"""
+    statuses = ("submitted", "kyc_completed", "pending_manager_approval", "manual_review", "approved", "rejected")
+    return {
+        "total_loans": loan_store.count(),
+        "by_status": {status: loan_store.count(status) for status in statuses},
+        "export": "/loans/export",
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint (text exposition format 0.0.4)"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/events")
+def debug_events():
+    """Live WebSocket subscriptions on this worker"""
+    return get_event_bus().stats()
+
+@app.get("/debug/llm-cache")
+def debug_llm_cache():
+    """Hit/miss counters for the LLM response cache, and the cassette's when one is loaded"""
+    cassette = get_cassette()
+    return dict(get_response_cache().stats(), cassette=cassette.stats() if cassette else None)
+
+def pending_loan_view(loan_id: str, loan_data: Dict[str, Any], include_letter: bool) -> Dict[str, Any]:
+    """Dashboard projection of a pending loan; the sanction letter is only sent on request"""
+    view = {
+        "loan_id": loan_id,
+        "data": {
+            "name": loan_data["data"]["name"],
+            "amount": loan_data["data"]["amount"],
+            "purpose": loan_data["data"]["purpose"],
+            "pan": loan_data["data"]["pan"],
+            "income": loan_data["data"]["income"],
+        },
+        "submitted_at": loan_data["timeline"][0]["time"] if loan_data["timeline"] else "",
+        "ai_suggestion": "APPROVED",  # Since it reached manager, AI suggested approval
+        "ai_confidence": 85,  # Mock confidence for display
+        "ai_explanation": "Application meets all criteria and has been recommended for approval.",
+    }
+    if include_letter:
+        view["sanction_letter"] = loan_data.get("sanction_letter", "")
+    return view
 
 @app.get("/manager/pending")
-def get_pending_loans():
-    """Get all loans pending manager approval"""
-    pending_loans = []
-    for loan_id, loan_data in LOANS.items():
-        if loan_data.get("status") == "pending_manager_approval":
-            pending_loans.append({
-                "loan_id": loan_id,
-                "data": {
-                    "name": loan_data["data"]["name"],
-                    "amount": loan_data["data"]["amount"],
-                    "purpose": loan_data["data"]["purpose"],
-                    "pan": loan_data["data"]["pan"],
-                    "income": loan_data["data"]["income"],
-                },
-                "sanction_letter": loan_data.get("sanction_letter", ""),
-                "submitted_at": loan_data["timeline"][0]["time"] if loan_data["timeline"] else "",
-                "ai_suggestion": "APPROVED",  # Since it reached manager, AI suggested approval
-                "ai_confidence": 85,  # Mock confidence for display
-                "ai_explanation": "Application meets all criteria and has been recommended for approval.",
-            })
-    return {"pending_loans": pending_loans}
+def get_pending_loans(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: str = Query("submitted_at", pattern="^(submitted_at|amount)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    include_letter: bool = False,
+):
+    """
+    Loans pending manager approval, one page at a time from the status index.
+    Pass next_cursor back as cursor to fetch the following page.
+    """
+    try:
+        rows, next_cursor = loan_store.page(
+            "pending_manager_approval",
+            sort=sort,
+            descending=order == "desc",
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "pending_loans": [pending_loan_view(loan_id, loan_data, include_letter) for loan_id, loan_data in rows],
+        "next_cursor": next_cursor,
+        "total": loan_store.count("pending_manager_approval"),
+    }
 
 @app.post("/manager/decision")
 def manager_decision(decision: ManagerDecision):
     """Manager approves or rejects a loan"""
-    loan = LOANS.get(decision.loan_id)
+    loan = loan_store.get(decision.loan_id)
     if not loan:
         raise HTTPException(status_code=404, detail="Loan not found")
     
@@ -315,11 +632,16 @@ def manager_decision(decision: ManagerDecision):
         loan["explanation"] = f"We regret to inform you that your loan application has been rejected. Reason: {decision.comments}"
     
     # Add timeline entry
-    loan["timeline"].append({
+    entry = {
         "step": "Manager Decision",
         "detail": f"Manager {decision.decision} the application: {decision.comments}",
         "time": datetime.utcnow().isoformat(),
-    })
+    }
+    loan["timeline"].append(entry)
+    loan.setdefault("loan_id", decision.loan_id)
+    publish_event(loan, "status", status=loan["status"])
+    publish_event(loan, "timeline", entry=entry)
+    save_loan(decision.loan_id, loan)
     
     return {"message": f"Loan {decision.decision} successfully", "loan_status": loan["status"]}
 
@@ -10,3 +10,5 @@ class LoanRequest(BaseModel):
     purpose: str
     # fake "document upload" – just send a name/string in v1
     document_name: Optional[str] = None
+    # id returned by POST /documents; KYC reads this file when present
+    document_id: Optional[str] = None
@@ -1,18 +1,37 @@
 # pipeline.py
+import threading
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Callable
 
 from models import LoanRequest
-from kyc import run_kyc_check
-from underwriting import run_underwriting
+from kyc import verify_kyc
+from underwriting import assess_underwriting, DEFAULT_ANNUAL_RATE, DEFAULT_YEARS
+from amortization import schedule_summary
 from backend.agents.explain import generate_explanation# <--- IMPORT YOUR AI AGENT
-from backend.util.llm import chat_with_grok
+from backend.util.llm import chat_with_grok, FALLBACK_REPLY
+from backend.util.dag import Stage, StageRun, run_graph, get_stage_executor
+from backend.util.events import publish_event
+from backend.util.loan_store import SQLiteLoanStore, create_loan_store
+from backend.util.log import get_logger
+from backend.util.metrics import STAGE_DURATION, PIPELINES_IN_FLIGHT, PIPELINES_COMPLETED
+
+logger = get_logger("pipeline")
 
 def now_iso() -> str:
     return datetime.utcnow().isoformat()
 
-def generate_sanction_letter(loan_data: dict, math_details: str) -> str:
-    """Generate AI-powered sanction letter for manager review"""
+def to_iso(ts: float) -> str:
+    return datetime.utcfromtimestamp(ts).isoformat()
+
+def generate_sanction_letter(loan_data: dict, math_details: str, cancelled: Optional[threading.Event] = None) -> Optional[str]:
+    """
+    Generate AI-powered sanction letter for manager review; the repayment terms are computed, not left to the LLM.
+    Returns None without calling the LLM if cancelled is already set.
+    """
+    terms = schedule_summary(float(loan_data["amount"]), DEFAULT_ANNUAL_RATE, DEFAULT_YEARS)
+    yearly = ", ".join(
+        f"year {year}: ₹{balance:,.2f}" for year, balance in enumerate(terms["yearly_balance"], start=1)
+    )
     
     prompt = f"""
     Generate a professional loan sanction letter based on the following information:
@@ -26,10 +45,18 @@ def generate_sanction_letter(loan_data: dict, math_details: str) -> str:
     
     AI Analysis: {math_details}
     
+    Repayment Terms (use these figures exactly; do not recalculate):
+    - Tenure: {terms['tenure_months']} months
+    - Interest Rate: {terms['annual_rate'] * 100:.2f}% per annum (reducing balance)
+    - Monthly EMI: ₹{terms['emi']:,.2f}
+    - Total Interest: ₹{terms['total_interest']:,.2f}
+    - Total Payable: ₹{terms['total_payable']:,.2f}
+    - Outstanding balance at the end of each year: {yearly}
+    
     Create a formal sanction letter that includes:
     1. Loan approval recommendation
     2. Approved amount and tenure
-    3. Interest rate (suggest market rate 10-12%)
+    3. Interest rate and EMI as given above
     4. Key terms and conditions
     5. Required documents for final disbursement
     
@@ -42,79 +69,291 @@ def generate_sanction_letter(loan_data: dict, math_details: str) -> str:
             {"role": "user", "content": prompt}
         ]
         
-        sanction_letter = chat_with_grok(messages, model="google/gemini-2.5-flash")
+        # The letter is drafted speculatively; a failed KYC may already have cancelled it
+        if cancelled is not None and cancelled.is_set():
+            return None
+        sanction_letter = chat_with_grok(messages, model="google/gemini-2.5-flash", prompt_type="sanction_letter")
+        if sanction_letter == FALLBACK_REPLY:
+            raise RuntimeError("LLM unavailable")
         return sanction_letter
         
     except Exception as e:
-        print(f"Error generating sanction letter: {e}")
-        return f"Loan Sanction Letter for {loan_data['name']} - Amount: ₹{loan_data['amount']} - Pending Manager Review"
+        logger.warning("Sanction letter generation failed", extra={"loan_id": loan_data.get("loan_id"), "error": str(e)})
+        return (
+            f"Loan Sanction Letter for {loan_data['name']} - Amount: ₹{loan_data['amount']} - "
+            f"EMI: ₹{terms['emi']:,.2f} for {terms['tenure_months']} months - Pending Manager Review"
+        )
 
-def create_empty_loan_record(req: LoanRequest) -> Dict[str, Any]:
+def create_empty_loan_record(req: LoanRequest, loan_id: Optional[str] = None) -> Dict[str, Any]:
     # (Keep your friend's existing code here, it's fine)
     data = req.dict()
     record: Dict[str, Any] = {
+        "loan_id": loan_id,
         "data": data,
         "status": "submitted",
         "explanation": "Processing...", # Placeholder
+        # queued -> running -> finished/failed; finished stage outputs go in checkpoints
+        "pipeline_state": "queued",
+        "checkpoints": {},
         "timeline": [
             {"step": "Submitted", "detail": "Application received", "time": now_iso()}
         ],
     }
     return record
 
-def run_pipeline(loan_record: Dict[str, Any]) -> None:
+STAGE_LABELS = {
+    "kyc": "KYC",
+    "underwriting": "Underwriting",
+    "sanction_letter": "Sanction Letter",
+    "decision": "Decision",
+    "explanation": "Explanation",
+    "finalize": "Manager Handoff",
+}
+
+def stage_on_copy(loan_record: Dict[str, Any], lock: threading.Lock, fn: Callable) -> Callable:
     """
-    The Multi-Agent Workflow:
-    1. KYC Agent
-    2. Underwriting Agent (Math)
-    3. AI Agent (Explanation)
+    Wrap fn(record, results, cancelled) so it works on its own copy of the loan
+    record. Top-level keys the stage reassigns and timeline entries it appends
+    are merged back under lock when it returns; a cancelled stage's changes
+    are dropped. Parallel stages then never write the record while on_update
+    is serializing it.
+    """
+    def run(results, cancelled):
+        with lock:
+            before = dict(loan_record)
+            working = dict(before, timeline=list(loan_record["timeline"]))
+        appended = len(working["timeline"])
+        result = fn(working, results, cancelled)
+        if cancelled.is_set():
+            return result
+        with lock:
+            for key, value in working.items():
+                if key != "timeline" and before.get(key) is not value:
+                    loan_record[key] = value
+            loan_record["timeline"].extend(working["timeline"][appended:])
+        return result
+
+    return run
+
+def build_pipeline_stages(loan_record: Dict[str, Any], lock: Optional[threading.Lock] = None) -> List[Stage]:
     """
-    print("--- Starting Pipeline ---")
+    The Multi-Agent Workflow as a dependency graph:
+
+        kyc ──────────────┐
+                          ├─> decision ─┬─> explanation      (not pre-approved)
+        underwriting ─────┤             └─> finalize         (pre-approved)
+                          └─> sanction_letter ──┘ (speculative)
+
+    KYC and underwriting are independent, so they run side by side. The sanction
+    letter is drafted as soon as underwriting pre-approves, without waiting for
+    KYC; if KYC then fails PAN verification the draft is cancelled and the loan
+    goes to manual review instead.
+
+    Every stage runs on a copy of loan_record (see stage_on_copy) and merges
+    its changes under lock; whoever reads the record mid-run takes the same lock.
+    """
+    lock = lock or threading.Lock()
     
-    # 1. Run KYC
-    run_kyc_check(loan_record)
+    def kyc_stage(record, results, cancelled):
+        kyc_result = verify_kyc(record)
+        record["kyc"] = kyc_result
+        record["status"] = "kyc_completed"
+        publish_event(record, "status", status="kyc_completed")
+        return kyc_result
     
-    # 2. Run Underwriting (Math)
-    # We capture the 'math_summary' string returned by the function
-    math_summary = run_underwriting(loan_record)
+    def underwriting_stage(record, results, cancelled):
+        decision, math_summary = assess_underwriting(record)
+        return {"decision": decision, "math_summary": math_summary}
     
-    # 3. Generate Sanction Letter for Manager Review
-    print("--- Generating Sanction Letter ---")
+    def sanction_letter_stage(record, results, cancelled):
+        return generate_sanction_letter(
+            loan_data=record["data"],
+            math_details=results["underwriting"]["math_summary"],
+            cancelled=cancelled,
+        )
     
-    # Only generate sanction letter if pre-approved by AI
-    if loan_record["status"] == "pre_approved":
-        sanction_letter = generate_sanction_letter(
-            loan_data=loan_record["data"],
-            math_details=math_summary
+    def decision_stage(record, results, cancelled):
+        status = results["underwriting"]["decision"]
+        if not results["kyc"]["pan_valid"]:
+            status = "manual_review"
+        record["status"] = status
+        publish_event(record, "status", status=status)
+        return status
+
+    def explanation_stage(record, results, cancelled):
+        ai_text = generate_explanation(
+            loan_data=record["data"],
+            status=results["decision"],
+            math_details=results["underwriting"]["math_summary"],
+            kyc_passed=results["kyc"]["pan_valid"],
         )
         
+        record["explanation"] = ai_text
+        entry = {
+            "step": "AI Decision",
+            "detail": f"Application {record['status']}",
+            "time": now_iso(),
+        }
+        record["timeline"].append(entry)
+        publish_event(record, "timeline", entry=entry)
+        return ai_text
+
+    def finalize_stage(record, results, cancelled):
+        sanction_letter = results["sanction_letter"]
+        
         # Set status to pending manager approval
-        loan_record["status"] = "pending_manager_approval"
-        loan_record["sanction_letter"] = sanction_letter
-        loan_record["explanation"] = "Your application has been processed and is now pending manager approval."
+        record["status"] = "pending_manager_approval"
+        record["sanction_letter"] = sanction_letter
+        record["explanation"] = "Your application has been processed and is now pending manager approval."
         
-        loan_record["timeline"].append({
+        entry = {
             "step": "Sanction Generated",
             "detail": "AI generated sanction letter, awaiting manager approval.",
             "time": now_iso(),
-        })
+        }
+        record["timeline"].append(entry)
+        publish_event(record, "status", status="pending_manager_approval")
+        publish_event(record, "timeline", entry=entry)
         
-        print(f"Sanction Letter Generated: {sanction_letter}")
+        logger.info("Sanction letter generated", extra={"loan_id": record.get("loan_id"), "chars": len(sanction_letter)})
+        return sanction_letter
         
+    def pre_approved(results):
+        return results.get("decision") == "pre_approved"
+
+    return [
+        Stage("kyc", stage_on_copy(loan_record, lock, kyc_stage)),
+        Stage("underwriting", stage_on_copy(loan_record, lock, underwriting_stage)),
+        Stage(
+            "sanction_letter",
+            stage_on_copy(loan_record, lock, sanction_letter_stage),
+            deps=("underwriting",),
+            guard=lambda results: results["underwriting"]["decision"] == "pre_approved",
+            invalidated_by={"kyc": lambda kyc_result: not kyc_result["pan_valid"]},
+        ),
+        Stage("decision", stage_on_copy(loan_record, lock, decision_stage), deps=("kyc", "underwriting")),
+        Stage(
+            "explanation",
+            stage_on_copy(loan_record, lock, explanation_stage),
+            deps=("decision", "kyc", "underwriting"),
+            guard=lambda results: not pre_approved(results),
+        ),
+        Stage(
+            "finalize",
+            stage_on_copy(loan_record, lock, finalize_stage),
+            deps=("decision", "sanction_letter"),
+            guard=lambda results: pre_approved(results) and results.get("sanction_letter") is not None,
+        ),
+    ]
+
+def record_stage_timing(loan_record: Dict[str, Any], run: StageRun) -> None:
+    """Log a finished or cancelled stage's start/end times to the timeline"""
+    if run.started_at is None:
+        return
+    label = STAGE_LABELS.get(run.name, run.name)
+    finished_at = run.finished_at or run.started_at
+    entry = {
+        "step": f"{label} Stage",
+        "detail": f"{label} {run.state} in {int(run.duration * 1000)} ms",
+        "time": to_iso(finished_at),
+        "stage": run.name,
+        "started_at": to_iso(run.started_at),
+        "finished_at": to_iso(finished_at),
+    }
+    loan_record["timeline"].append(entry)
+    publish_event(loan_record, "stage", stage=run.name, state=run.state, entry=entry)
+
+def run_pipeline(loan_record: Dict[str, Any], on_update: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+    """
+    The Multi-Agent Workflow:
+    1. KYC Agent                 } in parallel
+    2. Underwriting Agent (Math) }
+    3. AI Agent (Sanction letter or Explanation)
+    End-to-end time is the critical path rather than the sum of the stages.
+    on_update(loan_record) is called after every stage so a store can persist progress.
+    
+    Each finished stage's output is checkpointed into loan_record["checkpoints"]
+    before on_update, so a record saved mid-run resumes from its last finished
+    stages instead of repeating KYC and LLM calls.
+    """
+    checkpoints = loan_record.setdefault("checkpoints", {})
+    if checkpoints:
+        logger.info("Pipeline resuming", extra={"loan_id": loan_record.get("loan_id"), "checkpoints": list(checkpoints)})
+        entry = {
+            "step": "Pipeline Resumed",
+            "detail": f"Resumed after {', '.join(STAGE_LABELS.get(name, name) for name in checkpoints)}",
+            "time": now_iso(),
+        }
+        loan_record["timeline"].append(entry)
+        publish_event(loan_record, "timeline", entry=entry)
     else:
-        # If rejected or manual review, generate explanation as before
-        ai_text = generate_explanation(
-            loan_data=loan_record["data"],
-            status=loan_record["status"],
-            math_details=math_summary
+        logger.info("Pipeline started", extra={"loan_id": loan_record.get("loan_id")})
+    loan_record["pipeline_state"] = "running"
+    
+    # Stages merge their changes under this lock while other stages are still running
+    lock = threading.Lock()
+
+    def stage_ended(run: StageRun) -> None:
+        if run.started_at is not None:
+            STAGE_DURATION.labels(run.name, run.state).observe(run.duration)
+        with lock:
+            record_stage_timing(loan_record, run)
+            if run.state == "finished":
+                checkpoints[run.name] = run.result
+            if on_update:
+                on_update(loan_record)
+    
+    PIPELINES_IN_FLIGHT.inc()
+    try:
+        run_graph(
+            build_pipeline_stages(loan_record, lock),
+            get_stage_executor(),
+            on_end=stage_ended,
+            completed=dict(checkpoints),
         )
+    except Exception:
+        loan_record["pipeline_state"] = "failed"
+        PIPELINES_COMPLETED.labels("failed").inc()
+        if on_update:
+            on_update(loan_record)
+        raise
+    finally:
+        PIPELINES_IN_FLIGHT.dec()
         
-        loan_record["explanation"] = ai_text
-        loan_record["timeline"].append({
-            "step": "AI Decision",
-            "detail": f"Application {loan_record['status']}",
-            "time": now_iso(),
-        })
+    loan_record["pipeline_state"] = "finished"
+    PIPELINES_COMPLETED.labels("finished").inc()
+    if on_update:
+        on_update(loan_record)
+    logger.info("Pipeline finished", extra={"loan_id": loan_record.get("loan_id"), "status": loan_record["status"]})
+    publish_event(loan_record, "pipeline_finished", status=loan_record["status"])
     
-    print("--- Pipeline Finished ---")
-    print(f"Final status: {loan_record['status']}")
\ No newline at end of file
+
+_worker_store = None
+
+def worker_loan_store() -> Optional[SQLiteLoanStore]:
+    """The shared SQLite store, opened once per worker process; None for per-process stores"""
+    global _worker_store
+    if _worker_store is None:
+        store = create_loan_store()
+        _worker_store = store if isinstance(store, SQLiteLoanStore) else False
+    return _worker_store or None
+
+def run_pipeline_job(loan_id: str, payload: Dict[str, Any], checkpoint: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+    """
+    Job-queue entry point for process workers: runs the pipeline and returns the
+    finished record to the API process. With the shared SQLite store the worker
+    resumes from the stored checkpoints and saves progress itself; otherwise it
+    runs on the record carried in the payload and checkpoints it into the job
+    queue's file, so a restart doesn't repeat finished stages.
+    """
+    store = worker_loan_store()
+    loan_record = (store.get(loan_id) if store else None) or payload["record"]
+    if store:
+        def save(record):
+            store.put(loan_id, record)
+            publish_event(record, "loan_updated", status=record["status"], version=record["version"])
+
+        run_pipeline(loan_record, on_update=save)
+    else:
+        run_pipeline(loan_record, on_update=lambda record: checkpoint({"record": record}))
+    return loan_record
\ No newline at end of file
@@ -0,0 +1,126 @@
+# policy.py
+"""
+What-if analysis of underwriting policy over the whole loan book.
+
+assess_underwriting approves when income / EMI >= threshold, and EMI is
+amount * annuity_factor(rate, tenure). So a loan is approved exactly when
+income / amount >= threshold * annuity_factor. Sorting the book once by
+income / amount turns every (threshold, rate, tenure) grid point into a single
+searchsorted, and a cumulative sum of amounts in that order gives the approved
+volume for free.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+from underwriting import calculate_emi_batch
+
+EMI_PERCENTILES = (10, 50, 90, 99)
+MAX_GRID_POINTS = 1_000_000
+
+
+class BookSnapshot:
+    """Columnar, pre-sorted copy of the book's income and amount"""
+
+    def __init__(self, version: int, rows):
+        self.version = version
+        income = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+        amount = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+
+        # Zero-amount records can't be underwritten and are left out
+        valid = amount > 0
+        income, amount = income[valid], amount[valid]
+        self.skipped = int(len(valid) - valid.sum())
+
+        order = np.argsort(income / amount, kind="stable")
+        self.coverage = (income / amount)[order]
+        # cum_amount[i] = total amount of the i loans with the lowest coverage
+        self.cum_amount = np.concatenate(([0.0], np.cumsum(amount[order])))
+        self.amount_percentiles = np.percentile(amount, EMI_PERCENTILES) if len(amount) else np.zeros(len(EMI_PERCENTILES))
+
+    @property
+    def size(self) -> int:
+        return len(self.coverage)
+
+    def sweep(self, thresholds: Sequence[float], annual_rates: Sequence[float], years: Sequence[float]) -> Dict[str, Any]:
+        """
+        Approval counts, approved volume and EMI distribution for every
+        (rate, tenure, threshold) combination. Arrays are indexed
+        [rate][tenure][threshold]; EMI percentiles are [rate][tenure][percentile].
+        """
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        rates = np.asarray(annual_rates, dtype=np.float64)
+        tenures = np.asarray(years, dtype=np.float64)
+
+        factor = calculate_emi_batch(1.0, rates[:, None], tenures[None, :])
+        cutoff = factor[:, :, None] * thresholds[None, None, :]
+        below = np.searchsorted(self.coverage, cutoff, side="left")
+
+        approved = self.size - below
+        volume = self.cum_amount[-1] - self.cum_amount[below]
+        mean_emi = np.divide(volume * factor[:, :, None], approved, out=np.zeros(approved.shape), where=approved > 0)
+
+        return {
+            "snapshot_version": self.version,
+            "loans": self.size,
+            "skipped_loans": self.skipped,
+            "grid": {
+                "annual_rates": rates.tolist(),
+                "years": tenures.tolist(),
+                "thresholds": thresholds.tolist(),
+            },
+            "approved_count": approved.tolist(),
+            "approval_rate": (approved / self.size if self.size else np.zeros(approved.shape)).round(4).tolist(),
+            "approved_volume": volume.round(2).tolist(),
+            "mean_approved_emi": mean_emi.round(2).tolist(),
+            "emi_percentiles": {
+                "percentiles": list(EMI_PERCENTILES),
+                "values": (factor[:, :, None] * self.amount_percentiles[None, None, :]).round(2).tolist(),
+            },
+        }
+
+
+class PolicyEngine:
+    """
+    Runs sweeps against a snapshot of a LoanStore. The store's revision is the
+    snapshot version, so the snapshot is rebuilt, and cached sweeps dropped,
+    whenever a loan is added, changed or deleted.
+    """
+
+    def __init__(self, store, max_cached: int = 32):
+        self.store = store
+        self.max_cached = max_cached
+        self._snapshot = None
+        self._results: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> BookSnapshot:
+        version = self.store.revision()
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = BookSnapshot(version, self.store.financials())
+                self._results.clear()
+            return self._snapshot
+
+    def sweep(self, thresholds, annual_rates, years) -> Dict[str, Any]:
+        points = len(thresholds) * len(annual_rates) * len(years)
+        if not points:
+            raise ValueError("thresholds, annual_rates and years must each have at least one value")
+        if points > MAX_GRID_POINTS:
+            raise ValueError(f"Grid has {points} points; the limit is {MAX_GRID_POINTS}")
+
+        snapshot = self.snapshot()
+        key = (snapshot.version, tuple(thresholds), tuple(annual_rates), tuple(years))
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        result = snapshot.sweep(thresholds, annual_rates, years)
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_cached:
+                self._results.popitem(last=False)
+        return result
@@ -1,21 +1,78 @@
 # underwriting.py
 from datetime import datetime
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Tuple
+
+import numpy as np
+
+from backend.util.events import publish_event
+
+DEFAULT_ANNUAL_RATE = 0.12
+DEFAULT_YEARS = 3
+DEFAULT_RATIO_THRESHOLD = 2.0
+
+# Indexed by (ratio >= threshold); a lookup is much cheaper than np.where over strings
+DECISIONS = np.array(["manual_review", "pre_approved"])
 
 def now_iso() -> str:
     return datetime.utcnow().isoformat()
 
-def calculate_emi(principal: float, annual_rate: float = 0.12, years: int = 3) -> float:
+@lru_cache(maxsize=1024)
+def annuity_factor(annual_rate: float, years: float) -> float:
+    """EMI per rupee of principal; memoized since only a handful of (rate, tenure) pairs are ever used"""
     r = annual_rate / 12.0   
     n = years * 12           
-    if r == 0: return principal / n
-    emi = principal * r * (1 + r) ** n / ((1 + r) ** n - 1)
-    return emi
+    if r == 0: return 1.0 / n
+    return r * (1 + r) ** n / ((1 + r) ** n - 1)
+
+def calculate_emi(principal: float, annual_rate: float = DEFAULT_ANNUAL_RATE, years: int = DEFAULT_YEARS) -> float:
+    return principal * annuity_factor(annual_rate, years)
 
-def run_underwriting(loan: Dict[str, Any], ratio_threshold: float = 2.0) -> str:
+def calculate_emi_batch(principal, annual_rate=DEFAULT_ANNUAL_RATE, years=DEFAULT_YEARS) -> np.ndarray:
+    """calculate_emi over arrays; rate and years may be scalars or arrays that broadcast against principal"""
+    principal = np.asarray(principal, dtype=np.float64)
+    r = np.asarray(annual_rate, dtype=np.float64) / 12.0
+    n = np.asarray(years, dtype=np.float64) * 12.0
+    growth = np.power(1.0 + r, n)
+    # Zero-rate loans divide evenly; mask r == 0 so the annuity formula never sees 0/0
+    safe_r = np.where(r == 0, 1.0, r)
+    annuity = principal * safe_r * growth / np.where(r == 0, 1.0, growth - 1.0)
+    return np.where(r == 0, principal / n, annuity)
+
+def score_batch(
+    income,
+    amount,
+    annual_rate=DEFAULT_ANNUAL_RATE,
+    years=DEFAULT_YEARS,
+    ratio_threshold: float = DEFAULT_RATIO_THRESHOLD,
+) -> Dict[str, np.ndarray]:
     """
-    UPDATED: Performs Math, updates Status, and returns a 'Math Summary' string.
-    It does NOT write the final explanation (The LLM will do that).
+    Underwrite many loans in one vectorized pass, with the same rule as
+    assess_underwriting. Returns arrays "emi", "ratio" and "decision"
+    ("pre_approved" / "manual_review").
+    """
+    income = np.asarray(income, dtype=np.float64)
+    amount = np.asarray(amount, dtype=np.float64)
+    if income.shape != amount.shape:
+        raise ValueError("income and amount must have the same length")
+    for name, values in (("annual_rate", annual_rate), ("years", years)):
+        shape = np.shape(values)
+        if shape and shape != amount.shape:
+            raise ValueError(f"{name} must be one value or one per loan")
+    if np.any(np.asarray(annual_rate) < 0):
+        raise ValueError("annual_rate must be >= 0")
+    if np.any(np.asarray(years) <= 0):
+        raise ValueError("years must be > 0")
+
+    emi = calculate_emi_batch(amount, annual_rate, years)
+    ratio = np.divide(income, emi, out=np.zeros(np.broadcast(income, emi).shape), where=emi > 0)
+    decision = DECISIONS[(ratio >= ratio_threshold).view(np.int8)]
+    return {"emi": emi, "ratio": ratio, "decision": decision}
+
+def assess_underwriting(loan: Dict[str, Any], ratio_threshold: float = DEFAULT_RATIO_THRESHOLD) -> Tuple[str, str]:
+    """
+    Performs the Math and logs it to the timeline, without touching the loan status.
+    Returns (decision, math_summary) so the pipeline can combine it with KYC.
     """
     income = float(loan["data"]["income"])
     amount = float(loan["data"]["amount"])
@@ -30,13 +87,23 @@ def run_underwriting(loan: Dict[str, Any], ratio_threshold: float = 2.0) -> str:
         decision = "manual_review"
         short_result = "Needs manual review"
 
-    loan["status"] = decision
-    
-    loan["timeline"].append({
+    entry = {
         "step": "Underwriting",
         "detail": f"Underwriting math completed – result: {short_result}",
         "time": now_iso(),
-    })
+    }
+    loan["timeline"].append(entry)
+    publish_event(loan, "timeline", entry=entry)
     
     # Return the raw facts for the LLM to read
-    return f"Income: {income}, EMI: {int(emi)}, Ratio: {ratio:.2f} (Threshold: {ratio_threshold})"
\ No newline at end of file
+    return decision, f"Income: {income}, EMI: {int(emi)}, Ratio: {ratio:.2f} (Threshold: {ratio_threshold})"
+
+def run_underwriting(loan: Dict[str, Any], ratio_threshold: float = DEFAULT_RATIO_THRESHOLD) -> str:
+    """
+    UPDATED: Performs Math, updates Status, and returns a 'Math Summary' string.
+    It does NOT write the final explanation (The LLM will do that).
+    """
+    decision, math_summary = assess_underwriting(loan, ratio_threshold)
+    loan["status"] = decision
+    publish_event(loan, "status", status=decision)
+    return math_summary
\ No newline at end of file